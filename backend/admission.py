@@ -0,0 +1,166 @@
+"""
+Admission control for the expensive kinds of work (interactive and batch
+analyses, chat calls).
+
+Without it a burst of /analyze requests is accepted in full: every request
+holds its share of the LLM pool, all of them slow down together and they
+time out together - nothing completes. Each work class instead runs at most
+max_inflight requests; up to max_queue more wait in line (FIFO) for at most
+max_wait_seconds, and anything past that is rejected right away with
+Overloaded, which endpoints answer with 503 and a Retry-After estimated
+from the class's recent service time. A request whose expected wait already
+exceeds max_wait_seconds is rejected on arrival rather than after waiting.
+
+Admission is checked where the work starts, after cache lookups, so cheap
+requests (health, metrics, cached results) never count against the limits.
+Limits are per worker process; PDF renders are bounded by their RenderPool.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+from metrics import ADMISSION_DECISIONS, ADMISSION_INFLIGHT, ADMISSION_QUEUED, ADMISSION_QUEUE_WAIT_SECONDS
+
+
+class Overloaded(Exception):
+    """Raised when a work class is at capacity and the request was not admitted"""
+
+    def __init__(self, work: str, reason: str, retry_after: int):
+        super().__init__(f"Server is busy ({work}: {reason}), retry in {retry_after}s")
+        self.work = work
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_dict(self) -> Dict:
+        return {"work": self.work, "reason": self.reason, "retry_after": self.retry_after}
+
+
+class Slot:
+    """An admitted request's place in its work class; release() once the work is done"""
+
+    def __init__(self, work_class: "WorkClass"):
+        self._work_class = work_class
+        self._admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._work_class._release(time.monotonic() - self._admitted_at)
+
+
+class WorkClass:
+    """One kind of work: bounded in-flight requests behind a bounded FIFO queue (0 max_inflight: unlimited)"""
+
+    def __init__(self, name: str, max_inflight: int, max_queue: int, max_wait_seconds: float,
+                 expected_seconds: float = 10.0):
+        self.name = name
+        self.max_inflight = max(0, max_inflight)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_seconds = max_wait_seconds
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._avg_seconds = expected_seconds  # EWMA of service time, for Retry-After
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    def expected_wait(self, position: int) -> float:
+        """Seconds until the request at queue `position` (0-based) would be admitted"""
+        if not self.max_inflight:
+            return 0.0
+        return (position // self.max_inflight + 1) * self._avg_seconds
+
+    def _reject(self, reason: str) -> Overloaded:
+        ADMISSION_DECISIONS.inc(work=self.name, outcome=reason)
+        return Overloaded(self.name, reason, max(1, int(round(self.expected_wait(self.queued)))))
+
+    def _admit(self) -> Slot:
+        self.inflight += 1
+        ADMISSION_INFLIGHT.set(self.inflight, work=self.name)
+        return Slot(self)
+
+    async def acquire(self, wait: bool = True) -> Slot:
+        """A slot, after waiting in line if the class is busy; raises Overloaded instead of queueing too long"""
+        if not self.max_inflight or (self.inflight < self.max_inflight and not self.queued):
+            ADMISSION_DECISIONS.inc(work=self.name, outcome="admitted")
+            return self._admit()
+        if not wait:
+            raise self._reject("busy")
+        if self.queued >= self.max_queue:
+            raise self._reject("queue_full")
+        if self.max_wait_seconds and self.expected_wait(self.queued) > self.max_wait_seconds:
+            raise self._reject("wait_too_long")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        ADMISSION_QUEUED.set(self.queued, work=self.name)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait_seconds or None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self._release(None)  # handed a slot just as we gave up: pass it on
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise self._reject("timeout")
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            ADMISSION_QUEUED.set(self.queued, work=self.name)
+        ADMISSION_QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, work=self.name)
+        ADMISSION_DECISIONS.inc(work=self.name, outcome="queued")
+        return Slot(self)  # the releasing request's in-flight count was handed over
+
+    def _release(self, seconds: Optional[float]):
+        if seconds is not None:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                ADMISSION_QUEUED.set(self.queued, work=self.name)
+                return
+        self.inflight -= 1
+        ADMISSION_INFLIGHT.set(self.inflight, work=self.name)
+
+    def stats(self) -> Dict:
+        return {
+            "inflight": self.inflight,
+            "queued": self.queued,
+            "max_inflight": self.max_inflight,
+            "max_queue": self.max_queue,
+            "avg_seconds": round(self._avg_seconds, 2),
+        }
+
+
+class AdmissionController:
+    """Work classes by name; see the module docstring"""
+
+    def __init__(self):
+        self.classes: Dict[str, WorkClass] = {}
+
+    def add(self, name: str, max_inflight: int, max_queue: int, max_wait_seconds: float,
+            expected_seconds: float = 10.0) -> WorkClass:
+        self.classes[name] = WorkClass(name, max_inflight, max_queue, max_wait_seconds, expected_seconds)
+        return self.classes[name]
+
+    async def acquire(self, work: str, wait: bool = True) -> Slot:
+        return await self.classes[work].acquire(wait)
+
+    @asynccontextmanager
+    async def slot(self, work: str, wait: bool = True):
+        """`async with admission.slot("analysis"):` around the admitted work"""
+        slot = await self.acquire(work, wait)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: work_class.stats() for name, work_class in self.classes.items()}
+
@@ -6,45 +6,84 @@ Save as main.py and run with:
     uvicorn main:app --reload --port 8000
 """
 
+import asyncio
+import functools
+import hashlib
+import hmac
+import logging
 import os
 import re
+import time
+import uuid
+from dataclasses import asdict
 from pathlib import Path
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Callable, List, Dict, Optional
+from datetime import datetime, timezone
 
 import aiofiles
-from fastapi import FastAPI, UploadFile, File, Form, Query, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Import PDF generator
-from pdf_generator import generate_pdf_report
+from report_format import parse_timestamp, RENDER_VERSION
+from render_pool import RenderPool, RenderQueueFull
+from report_cache import PDFDiskCache, payload_hash
+from batch_export import stream_zip
+from report_store import IdempotencyConflict, ReportStore, ReportNotFound, ReportNotReady, REPORT_STATUSES
+from outbox import OutboxDispatcher, make_sink
 
-# ---- Optional: replace with your actual genai client import if different ----
-import google.generativeai as genai
+from cancellation import AnalysisCancelled, CancelToken, CancellableModel, run_cancellable
+from metrics import render_latest, register_collector, RETRIEVAL_INDEX_CHUNKS, UPLOAD_BYTES, UPLOAD_FILES, UPLOAD_REQUEST_BYTES
+from instrumentation import EventLoopLagMonitor, InstrumentedModel, RequestMetricsMiddleware, timed_phase
+from profiling import Profiler, ProfilingMiddleware
+import tracing
+from tracing import TracingMiddleware, tracer_span
+from retrieval import BM25Index, format_excerpts
+from streaming import stream_generation, stream_text
+from chat_cache import ChatAnswerCache
+from chat_memory import ChatSession, ChatSessionStore
+from tokens import estimate_tokens, truncate_to_tokens
+from usage import BudgetExceeded, TokenBudget, UsageLedger
+from workspace import scan_manifest, content_digest, configure as share_workspace_manifests
+from shared_state import InflightGuard, make_backend, DEFAULT_SOCKET
+from llm_client import LazyModel, ModelUnavailable
+from metrics import ANALYSIS_CACHE_LOOKUPS, COMPONENT_INIT_SECONDS
+import phase_engine
+import phase_specs
+from phase_engine import PhaseSpec, UnknownPhase, estimate_tokens_for, run_phase, select_phases
+import extraction
+import tabular_profile
+import code_condense
+import project_digest
+import dedup
+from speculation import DetachedRequest, Speculator
+from admission import AdmissionController, Overloaded
+from scheduler import PriorityExecutor
 
-# ---- Analyzer imports (assume these modules exist) ----
-from analyzers.requirements_analyzer import analyze_requirements
-from analyzers.design_analyzer import analyze_design
-from analyzers.implementation_analyzer import analyze_implementation
-from analyzers.testing_analyzer import analyze_testing
-from analyzers.deployment_analyzer import analyze_deployment
-from analyzers.maintenance_analyzer import analyze_maintenance
+logger = logging.getLogger("sdlc.app")
+
+# ---- Analysis phases: declared in phase_specs.py, run by phase_engine.py ----
+# Cached phase results are invalidated whenever the engine or the specs change
+PHASE_ENGINE_FINGERPRINT = hashlib.sha256(
+    Path(phase_engine.__file__).read_bytes() + Path(phase_specs.__file__).read_bytes()
+    + Path(extraction.__file__).read_bytes() + Path(tabular_profile.__file__).read_bytes()
+    + Path(code_condense.__file__).read_bytes() + Path(project_digest.__file__).read_bytes()
+    + Path(dedup.__file__).read_bytes()
+).hexdigest()
 
 # ---------------------------
 # Configuration & Constants
 # ---------------------------
 load_dotenv()
 
-if "GOOGLE_API_KEY" not in os.environ:
-    raise RuntimeError("ERROR: GOOGLE_API_KEY missing in .env")
-
-genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
-
-# Choose model as you had before
-model = genai.GenerativeModel(
+# Choose model as you had before. The Gemini client is created on first use
+# (or by the warm-up hook), so a missing GOOGLE_API_KEY no longer stops the
+# app from starting; /readyz reports it and model calls answer 503.
+model = LazyModel(
     model_name="gemini-2.5-flash",
     generation_config={"temperature": 0.2}
 )
@@ -57,6 +96,160 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 MAX_FILES_PER_REQUEST = 50
 MAX_TOTAL_BYTES_PER_REQUEST = 200 * 1024 * 1024  # 200 MB total across all files
 
+# Worker slots shared by all LLM calls (phase analyses + chat)
+LLM_MAX_WORKERS = int(os.getenv("LLM_MAX_WORKERS", "6"))
+# Calls are started by priority class - chat, analysis (interactive /analyze) and batch
+# (/analyze with X-Priority: batch, speculative runs, background work) - in proportion to
+# LLM_WEIGHT_*; a class occupies at most LLM_LIMIT_* workers (0 = all; by default one worker is
+# kept for chat and one more for interactive analyses), and a call waiting LLM_AGING_SECONDS
+# goes first whatever its class
+LLM_WEIGHT_CHAT = float(os.getenv("LLM_WEIGHT_CHAT", "8"))
+LLM_WEIGHT_ANALYSIS = float(os.getenv("LLM_WEIGHT_ANALYSIS", "3"))
+LLM_WEIGHT_BATCH = float(os.getenv("LLM_WEIGHT_BATCH", "1"))
+LLM_LIMIT_CHAT = int(os.getenv("LLM_LIMIT_CHAT", "0"))
+LLM_LIMIT_ANALYSIS = int(os.getenv("LLM_LIMIT_ANALYSIS", str(max(1, LLM_MAX_WORKERS - 1))))
+LLM_LIMIT_BATCH = int(os.getenv("LLM_LIMIT_BATCH", str(max(1, LLM_MAX_WORKERS - 2))))
+LLM_AGING_SECONDS = float(os.getenv("LLM_AGING_SECONDS", "20"))
+llm_executor = PriorityExecutor(
+    LLM_MAX_WORKERS,
+    {
+        "chat": (LLM_WEIGHT_CHAT, LLM_LIMIT_CHAT),
+        "analysis": (LLM_WEIGHT_ANALYSIS, LLM_LIMIT_ANALYSIS),
+        "batch": (LLM_WEIGHT_BATCH, LLM_LIMIT_BATCH),
+    },
+    default_class="batch",
+    aging_seconds=LLM_AGING_SECONDS,
+    thread_name_prefix="llm",
+)
+
+# Retrieval budget for /chat: top-k chunks, capped by estimated prompt tokens
+CHAT_CONTEXT_TOP_K = int(os.getenv("CHAT_CONTEXT_TOP_K", "8"))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "2000"))
+
+# Chat sessions: last N turns verbatim + rolling summary, hard prompt ceiling
+CHAT_MEMORY_TURNS = int(os.getenv("CHAT_MEMORY_TURNS", "4"))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "300"))
+CHAT_MEMORY_MAX_TOKENS = int(os.getenv("CHAT_MEMORY_MAX_TOKENS", "1500"))
+CHAT_QUESTION_MAX_TOKENS = int(os.getenv("CHAT_QUESTION_MAX_TOKENS", "1000"))
+CHAT_PROMPT_MAX_TOKENS = int(os.getenv("CHAT_PROMPT_MAX_TOKENS", "6000"))
+CHAT_MAX_SESSIONS = int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+CHAT_SESSION_TTL_SECONDS = int(os.getenv("CHAT_SESSION_TTL_SECONDS", "3600"))
+
+# Chat answer cache: exact (normalized question + workspace digest + model),
+# plus an opt-in fuzzy tier on token-set similarity
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "512"))
+CHAT_CACHE_TTL_SECONDS = int(os.getenv("CHAT_CACHE_TTL_SECONDS", "3600"))
+CHAT_CACHE_FUZZY = os.getenv("CHAT_CACHE_FUZZY", "false").lower() in ("1", "true", "yes")
+CHAT_CACHE_FUZZY_THRESHOLD = float(os.getenv("CHAT_CACHE_FUZZY_THRESHOLD", "0.85"))
+
+# PDF rendering runs in a process pool so FPDF layout never blocks the event loop
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_RENDER_MAX_QUEUE = int(os.getenv("PDF_RENDER_MAX_QUEUE", "16"))
+PDF_RENDER_START_METHOD = os.getenv("PDF_RENDER_START_METHOD", "spawn")
+
+# Rendered reports cached on disk by payload hash (also used as the ETag)
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(BASE_DIR, "report_cache"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Local report store for the reviewer workflow (metadata, phase scores, PDF blobs)
+REPORT_DB_PATH = os.getenv("REPORT_DB_PATH", os.path.join(BASE_DIR, "reports.db"))
+
+# Reviewer delivery outbox: sink kind (filesystem | sqlite), its location and retry policy
+OUTBOX_SINK = os.getenv("OUTBOX_SINK", "filesystem")
+OUTBOX_SINK_PATH = os.getenv("OUTBOX_SINK_PATH", os.path.join(BASE_DIR, "deliveries"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+
+# How often the event loop lag probe runs (seconds)
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Token accounting (per workspace / UTC day) and budgets; 0 = unlimited.
+# Workspaces are named by the X-Workspace-Id header (DEFAULT_WORKSPACE otherwise).
+USAGE_DB_PATH = os.getenv("USAGE_DB_PATH", os.path.join(BASE_DIR, "usage.db"))
+DEFAULT_WORKSPACE = os.getenv("DEFAULT_WORKSPACE", "default")
+TOKEN_BUDGET_PER_REQUEST = int(os.getenv("TOKEN_BUDGET_PER_REQUEST", "0"))
+TOKEN_BUDGET_PER_WORKSPACE_DAY = int(os.getenv("TOKEN_BUDGET_PER_WORKSPACE_DAY", "0"))
+# Completion tokens assumed per model call when estimating before the call
+TOKEN_COMPLETION_RESERVE = int(os.getenv("TOKEN_COMPLETION_RESERVE", "2048"))
+
+# Request tracing: exporter none | file (TRACE_TARGET = path) | otlp (TRACE_TARGET = collector URL)
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none")
+TRACE_TARGET = os.getenv("TRACE_TARGET", os.path.join(BASE_DIR, "traces.jsonl"))
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+
+# Admin-only request profiling (X-Profile: cpu,alloc + X-Admin-Token); off unless both are set
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+# Warm the model client and render workers in the background after startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+# Upper bound on reports per /generate-pdf/batch request
+MAX_BATCH_REPORTS = int(os.getenv("MAX_BATCH_REPORTS", "100"))
+
+# State shared by the uvicorn workers of a node (workspace manifests, analysis
+# results, chat answers, in-flight locks): memory (single worker), sqlite
+# (STATE_TARGET is the database file) or socket (STATE_TARGET is unix:/path or
+# host:port of `python shared_state.py --listen ...`)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_TARGET = os.getenv(
+    "STATE_TARGET", os.path.join(BASE_DIR, "state.db") if STATE_BACKEND == "sqlite" else DEFAULT_SOCKET
+)
+# Analysis results are reused while the files, model and analyzer code are unchanged (0 disables)
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+# In-flight lock lease (renewed while the work runs) and how long others wait for it
+INFLIGHT_LEASE_SECONDS = float(os.getenv("INFLIGHT_LEASE_SECONDS", "30"))
+INFLIGHT_WAIT_SECONDS = float(os.getenv("INFLIGHT_WAIT_SECONDS", "600"))
+
+# Text output kept per notebook cell when .ipynb uploads are extracted for prompts (0 = none)
+NOTEBOOK_OUTPUT_CHARS = int(os.getenv("NOTEBOOK_OUTPUT_CHARS", "1000"))
+# CSV / TSV / Parquet uploads reach prompts as a profile: rows scanned and example rows shown
+TABLE_PROFILE_MAX_ROWS = int(os.getenv("TABLE_PROFILE_MAX_ROWS", "1000000"))
+TABLE_PROFILE_SAMPLE_ROWS = int(os.getenv("TABLE_PROFILE_SAMPLE_ROWS", "5"))
+
+# Two-tier analysis for large projects: phases see a project digest (static analysis,
+# plus one model call for an overview when PROJECT_DIGEST_OVERVIEW is on) and excerpts
+# instead of every file. PHASE_CONTEXT_MODE: auto (phases whose files context exceeds
+# PROJECT_DIGEST_MIN_TOKENS) | digest (always) | files (never)
+PHASE_CONTEXT_MODE = os.getenv("PHASE_CONTEXT_MODE", "auto")
+PROJECT_DIGEST_MIN_TOKENS = int(os.getenv("PROJECT_DIGEST_MIN_TOKENS", "8000"))
+PROJECT_DIGEST_EXCERPT_TOKENS = int(os.getenv("PROJECT_DIGEST_EXCERPT_TOKENS", "3000"))
+PROJECT_DIGEST_OVERVIEW = os.getenv("PROJECT_DIGEST_OVERVIEW", "true").lower() in ("1", "true", "yes")
+
+# Duplicate uploads are replaced by a "duplicate of X" note in prompts. DEDUP_MODE:
+# near (exact + MinHash near-duplicates at DEDUP_SIMILARITY) | exact | off
+DEDUP_MODE = os.getenv("DEDUP_MODE", "near")
+DEDUP_SIMILARITY = float(os.getenv("DEDUP_SIMILARITY", "0.9"))
+
+# Speculative pre-analysis when an upload completes (opt-in), picked up by the /analyze
+# that follows. SPECULATIVE_ANALYSIS: off | ingest (read and extract the files, build the
+# project digest) | full (also run all phases). Token caps per run and per workspace per day (0 = none)
+SPECULATIVE_ANALYSIS = os.getenv("SPECULATIVE_ANALYSIS", "off")
+SPECULATIVE_DELAY_SECONDS = float(os.getenv("SPECULATIVE_DELAY_SECONDS", "2"))
+SPECULATIVE_MAX_TOKENS = int(os.getenv("SPECULATIVE_MAX_TOKENS", "200000"))
+SPECULATIVE_DAILY_TOKENS = int(os.getenv("SPECULATIVE_DAILY_TOKENS", "1000000"))
+
+# Admission control (per worker): at most *_MAX_INFLIGHT analyses / chat calls run at once and
+# *_MAX_QUEUE more wait up to *_MAX_QUEUE_WAIT_SECONDS; the rest get 503 + Retry-After (0 = no limit)
+ANALYSIS_MAX_INFLIGHT = int(os.getenv("ANALYSIS_MAX_INFLIGHT", "2"))
+ANALYSIS_MAX_QUEUE = int(os.getenv("ANALYSIS_MAX_QUEUE", "8"))
+ANALYSIS_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("ANALYSIS_MAX_QUEUE_WAIT_SECONDS", "60"))
+BATCH_MAX_INFLIGHT = int(os.getenv("BATCH_MAX_INFLIGHT", "1"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "32"))
+BATCH_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("BATCH_MAX_QUEUE_WAIT_SECONDS", "600"))
+CHAT_MAX_INFLIGHT = int(os.getenv("CHAT_MAX_INFLIGHT", "8"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "16"))
+CHAT_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("CHAT_MAX_QUEUE_WAIT_SECONDS", "15"))
+# An admitted /chat/stream whose body never starts (client gone, middleware error) gives its
+# slot and token reservation back after this long
+CHAT_STREAM_START_SECONDS = float(os.getenv("CHAT_STREAM_START_SECONDS", "30"))
+
+# Status code used when the client went away before we could answer (nginx convention)
+CLIENT_CLOSED_REQUEST = 499
+
 # ---------------------------
 # Pydantic Models for PDF
 # ---------------------------
@@ -73,6 +266,11 @@ class PDFRequest(BaseModel):
     analysisResults: AnalysisData
     overallScore: str
     filesAnalyzed: List[str]
+    timestamp: Optional[str] = None  # analysis time, printed in the report header
+
+class BatchPDFRequest(BaseModel):
+    reports: List[PDFRequest] = []
+    reportIds: List[str] = []  # ETags / ids of reports already rendered
 
 class ReviewerRequest(BaseModel):
     analysisResults: AnalysisData
@@ -80,11 +278,79 @@ class ReviewerRequest(BaseModel):
     filesAnalyzed: List[str]
     timestamp: str
 
+class ReportStatusUpdate(BaseModel):
+    status: str
+
 # ---------------------------
 # App init
 # ---------------------------
 app = FastAPI(title="SDLC AI Verifier (Gemini)", version="2.0")
 
+shared_state = make_backend(STATE_BACKEND, STATE_TARGET)
+# With several workers, caches that are otherwise per process also go to the shared state
+cross_worker_state = None if STATE_BACKEND == "memory" else shared_state
+share_workspace_manifests(cross_worker_state)
+dedup.configure(mode=DEDUP_MODE, similarity=DEDUP_SIMILARITY)
+phase_engine.configure(context_mode=PHASE_CONTEXT_MODE, digest_min_tokens=PROJECT_DIGEST_MIN_TOKENS,
+                       excerpt_tokens=PROJECT_DIGEST_EXCERPT_TOKENS)
+extraction.configure(notebook_output_chars=NOTEBOOK_OUTPUT_CHARS, table_max_rows=TABLE_PROFILE_MAX_ROWS,
+                     table_sample_rows=TABLE_PROFILE_SAMPLE_ROWS)
+
+# One analysis / render per key at a time across all workers
+analysis_flight = InflightGuard(shared_state, "analysis", lease_seconds=INFLIGHT_LEASE_SECONDS,
+                                wait_seconds=INFLIGHT_WAIT_SECONDS)
+render_flight = InflightGuard(shared_state, "render", lease_seconds=INFLIGHT_LEASE_SECONDS,
+                              wait_seconds=INFLIGHT_WAIT_SECONDS)
+
+# Bounded concurrency for the expensive endpoints, checked after their cache lookups
+admission = AdmissionController()
+admission.add("analysis", ANALYSIS_MAX_INFLIGHT, ANALYSIS_MAX_QUEUE, ANALYSIS_MAX_QUEUE_WAIT_SECONDS,
+              expected_seconds=30.0)
+admission.add("batch", BATCH_MAX_INFLIGHT, BATCH_MAX_QUEUE, BATCH_MAX_QUEUE_WAIT_SECONDS, expected_seconds=30.0)
+admission.add("chat", CHAT_MAX_INFLIGHT, CHAT_MAX_QUEUE, CHAT_MAX_QUEUE_WAIT_SECONDS, expected_seconds=5.0)
+
+# Background analysis started by /upload, per workspace
+speculator = Speculator(SPECULATIVE_ANALYSIS, delay_seconds=SPECULATIVE_DELAY_SECONDS,
+                        max_tokens_per_run=SPECULATIVE_MAX_TOKENS, max_tokens_per_day=SPECULATIVE_DAILY_TOKENS)
+
+# Lexical index over uploaded file contents (kept in sync incrementally)
+chat_index = BM25Index(text_loader=extraction.load_text)
+
+chat_cache = ChatAnswerCache(
+    max_entries=CHAT_CACHE_MAX_ENTRIES,
+    ttl_seconds=CHAT_CACHE_TTL_SECONDS,
+    fuzzy=CHAT_CACHE_FUZZY,
+    fuzzy_threshold=CHAT_CACHE_FUZZY_THRESHOLD,
+    shared=cross_worker_state,
+)
+
+render_pool = RenderPool(
+    workers=PDF_RENDER_WORKERS,
+    max_queue=PDF_RENDER_MAX_QUEUE,
+    start_method=PDF_RENDER_START_METHOD,
+)
+
+report_cache = PDFDiskCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
+
+report_store = ReportStore(REPORT_DB_PATH)
+
+usage_ledger = UsageLedger(USAGE_DB_PATH)
+token_budget = TokenBudget(
+    usage_ledger,
+    per_request=TOKEN_BUDGET_PER_REQUEST,
+    per_workspace_day=TOKEN_BUDGET_PER_WORKSPACE_DAY,
+    completion_reserve=TOKEN_COMPLETION_RESERVE,
+)
+
+outbox_dispatcher: Optional[OutboxDispatcher] = None  # created on startup (needs the event loop)
+
+chat_sessions = ChatSessionStore(
+    max_sessions=CHAT_MAX_SESSIONS,
+    ttl_seconds=CHAT_SESSION_TTL_SECONDS,
+    max_turns=CHAT_MEMORY_TURNS,
+    summary_max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # tighten this in production
@@ -92,6 +358,115 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+
+tracing.configure(TRACE_EXPORTER, TRACE_TARGET, TRACE_SAMPLE_RATE)
+profiler = Profiler(PROFILING_ENABLED, ADMIN_TOKEN, PROFILE_DIR, interval=PROFILE_SAMPLE_INTERVAL)
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+app.add_middleware(TracingMiddleware)  # outermost, so profiles can reuse the trace id
+
+loop_lag_monitor = EventLoopLagMonitor(EVENT_LOOP_LAG_INTERVAL)
+
+@register_collector
+def collect_index_stats():
+    RETRIEVAL_INDEX_CHUNKS.set(chat_index.stats()["chunks"])
+
+@app.on_event("startup")
+async def start_background_tasks():
+    global outbox_dispatcher
+    outbox_dispatcher = OutboxDispatcher(
+        report_store,
+        make_sink(OUTBOX_SINK, OUTBOX_SINK_PATH),
+        ensure_report_pdf,
+        batch_size=OUTBOX_BATCH_SIZE,
+        poll_seconds=OUTBOX_POLL_SECONDS,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+    )
+    outbox_dispatcher.start()
+    loop_lag_monitor.start()
+    if WARMUP_ON_STARTUP:
+        # in the background: liveness/readiness answer while it runs
+        asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    await speculator.shutdown()
+    await loop_lag_monitor.stop()
+    if outbox_dispatcher is not None:
+        await outbox_dispatcher.stop()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    render_pool.shutdown()
+    report_store.close()
+    usage_ledger.close()
+    shared_state.close()
+    tracing.TRACER.shutdown()
+    llm_executor.shutdown(wait=False, cancel_futures=True)
+
+# ---------------------------
+# Lazy components & warm-up
+# ---------------------------
+STARTED_AT = time.time()
+
+_render_fn: Optional[Callable] = None
+warmup_status: Dict = {"state": "idle", "seconds": None, "errors": {}}
+
+
+def pdf_renderer() -> Callable:
+    """render_pdf_to_file; pdf_generator (and FPDF) is imported on first use"""
+    global _render_fn
+    if _render_fn is None:
+        started = time.perf_counter()
+        from pdf_generator import render_pdf_to_file
+        COMPONENT_INIT_SECONDS.set(time.perf_counter() - started, component="pdf_renderer")
+        _render_fn = render_pdf_to_file
+    return _render_fn
+
+
+def ensure_model_available():
+    """Fail fast (before reading files or building prompts) when no model client can be made"""
+    reason = model.unavailable_reason() if isinstance(model, LazyModel) else None
+    if reason:
+        raise ModelUnavailable(reason)
+
+
+def model_unavailable_response(e: ModelUnavailable) -> JSONResponse:
+    return JSONResponse({"success": False, "message": f"Model unavailable: {e}"}, status_code=503)
+
+
+async def warm_up() -> Dict:
+    """
+    Initialize everything that is otherwise created on first use: the model
+    client, the PDF renderer and the render worker processes.
+    Failures are recorded per component and don't stop the others.
+    """
+    warmup_status.update({"state": "running", "errors": {}})
+    started = time.perf_counter()
+    steps = {
+        "model": lambda: asyncio.to_thread(getattr(model, "warm", lambda: None)),
+        "pdf_renderer": lambda: asyncio.to_thread(pdf_renderer),
+        "render_pool": lambda: render_pool.warm("pdf_generator"),
+    }
+    for name, step in steps.items():
+        step_started = time.perf_counter()
+        try:
+            await step()
+        except Exception as e:
+            warmup_status["errors"][name] = str(e)
+        else:
+            if name == "render_pool":
+                COMPONENT_INIT_SECONDS.set(time.perf_counter() - step_started, component="render_pool")
+    warmup_status.update({
+        "state": "failed" if warmup_status["errors"] else "done",
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+    return dict(warmup_status)
+
+
+def is_admin(http_request: Request) -> bool:
+    token = http_request.headers.get("x-admin-token")
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
 
 # ---------------------------
 # Utilities
@@ -126,6 +501,267 @@ async def stream_save_upload(upload: UploadFile, dest_path: str):
     except Exception:
         pass
 
+CHAT_PROMPT_TEMPLATE = """
+You are a Senior Software Engineer + SDLC Specialist.
+Use clean technical language.
+
+Files:
+{file_list}
+{memory}
+Relevant Excerpts:
+{excerpts}
+
+User Question:
+{message}
+
+Give a structured, precise answer. Base it on the excerpts where they are relevant.
+"""
+
+
+async def build_chat_prompt(message: str, session: Optional[ChatSession] = None) -> str:
+    """
+    Prompt shared by /chat and /chat/stream.
+    Session memory is given priority over retrieved excerpts; together they
+    never push the prompt past CHAT_PROMPT_MAX_TOKENS.
+    """
+    file_list = truncate_to_tokens(", ".join(os.listdir(UPLOAD_DIR)) or "No files uploaded", 500)
+    message = truncate_to_tokens(message, CHAT_QUESTION_MAX_TOKENS)
+    fixed = estimate_tokens(CHAT_PROMPT_TEMPLATE.format(file_list=file_list, memory="", excerpts="", message=message))
+    remaining = max(0, CHAT_PROMPT_MAX_TOKENS - fixed)
+
+    memory = ""
+    if session is not None:
+        summary, turns = session.render_memory(min(CHAT_MEMORY_MAX_TOKENS, remaining))
+        if summary:
+            memory += f"\nConversation Summary:\n{summary}\n"
+        if turns:
+            memory += f"\nRecent Conversation:\n{turns}\n"
+        remaining -= estimate_tokens(memory)
+
+    excerpt_budget = max(0, min(CHAT_CONTEXT_TOKEN_BUDGET, remaining))
+    excerpts = await asyncio.to_thread(retrieve_excerpts, message, excerpt_budget)
+
+    prompt = CHAT_PROMPT_TEMPLATE.format(
+        file_list=file_list,
+        memory=memory,
+        excerpts=excerpts or "No matching content found in the uploaded files",
+        message=message,
+    )
+    return truncate_to_tokens(prompt, CHAT_PROMPT_MAX_TOKENS)
+
+
+def retrieve_excerpts(question: str, token_budget: int = CHAT_CONTEXT_TOKEN_BUDGET) -> str:
+    """Top matching chunks of the uploaded files for a chat question"""
+    chat_index.sync(UPLOAD_DIR)  # cheap when nothing changed: stat + cached hashes
+    chunks = chat_index.search(question, top_k=CHAT_CONTEXT_TOP_K, token_budget=token_budget)
+    return format_excerpts(chunks)
+
+
+def summarize_text(prompt: str, workspace: str = DEFAULT_WORKSPACE) -> str:
+    """
+    LLM summarizer used to fold old chat turns into a session summary.
+    The call is reserved against and charged to the workspace like a chat
+    call; over budget, BudgetExceeded makes the fold fall back to an
+    extractive summary.
+    """
+    estimate = token_budget.estimate(estimate_tokens(prompt))
+    with token_budget.reserve(workspace, estimate) as reservation:
+        return InstrumentedModel(model, "chat_summary", reservation.meter).generate_content(prompt).text
+
+
+def workspace_digest() -> str:
+    """Content digest of uploads/ (hashes are cached by size + mtime)"""
+    return content_digest(scan_manifest(UPLOAD_DIR))
+
+
+def model_name() -> str:
+    return getattr(model, "model_name", "unknown")
+
+
+def workspace_id(http_request: Request) -> str:
+    """Workspace a request is accounted to (X-Workspace-Id header)"""
+    workspace = http_request.headers.get("x-workspace-id") or DEFAULT_WORKSPACE
+    if not re.fullmatch(r"[A-Za-z0-9_.\-]{1,64}", workspace):
+        raise HTTPException(status_code=400, detail="Invalid X-Workspace-Id")
+    return workspace
+
+
+def budget_response(e: BudgetExceeded) -> JSONResponse:
+    return JSONResponse({
+        "success": False,
+        "message": str(e),
+        "budget": e.to_dict()
+    }, status_code=429)
+
+
+def analysis_priority(http_request: Request) -> str:
+    """Priority class of an /analyze request: "batch" with X-Priority: batch, else "analysis" (interactive)"""
+    return "batch" if http_request.headers.get("x-priority", "").lower() == "batch" else "analysis"
+
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    return JSONResponse({
+        "success": False,
+        "message": str(e),
+        "overload": e.to_dict()
+    }, status_code=503, headers={"Retry-After": str(e.retry_after)})
+
+
+def remember_turn(session: ChatSession, question: str, answer: str, workspace: str):
+    """Record a turn and fold older turns in the background if the window overflowed"""
+    session.add_turn(question, answer)
+    if session.needs_fold():
+        # chat class, not the default (batch): the session's next question reads this summary,
+        # and queued behind a long batch analysis it would wait up to LLM_AGING_SECONDS
+        llm_executor.submit_to("chat", session.fold, functools.partial(summarize_text, workspace=workspace))
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 7232 weak comparison against an If-None-Match header"""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+# Renders in progress in this worker by report key, so concurrent identical
+# requests share one render (render_flight does the same across workers)
+_inflight_renders: Dict[str, asyncio.Future] = {}
+
+
+async def render_report_cached(
+    analysis_results: Dict,
+    overall_score: str,
+    files_analyzed: List[str],
+    timestamp: Optional[str]
+) -> str:
+    """
+    Path of the rendered report, rendering it in the pool on a cache miss.
+    The render worker writes the PDF straight to a temp file that is then
+    renamed into the cache, so this process never holds the document in
+    memory (fpdf builds it in memory in the worker only); responses stream
+    it from disk with a correct Content-Length.
+    Workers share the cache directory, and a report another worker is
+    already rendering is waited for instead of rendered twice.
+    """
+    key = report_key(analysis_results, overall_score, files_analyzed, timestamp)
+    path = await asyncio.to_thread(report_cache.get, key)
+    if path is not None:
+        return path
+
+    pending = _inflight_renders.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    async def render() -> str:
+        tmp_path = report_cache.temp_path()
+        try:
+            await render_pool.run(
+                await asyncio.to_thread(pdf_renderer),
+                tmp_path,
+                analysis_results,
+                overall_score,
+                files_analyzed,
+                timestamp
+            )
+            return await asyncio.to_thread(report_cache.adopt, key, tmp_path)
+        except BaseException:
+            report_cache.discard(tmp_path)
+            raise
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight_renders[key] = future
+    try:
+        path = await render_flight.run(key, lambda: asyncio.to_thread(report_cache.peek, key), render)
+        future.set_result(path)
+        return path
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        _inflight_renders.pop(key, None)
+
+
+async def open_report_cached(
+    analysis_results: Dict,
+    overall_score: str,
+    files_analyzed: List[str],
+    timestamp: Optional[str]
+):
+    """
+    Open binary handle on the rendered report (see render_report_cached).
+    Another worker may evict the file between the lookup and the open; it
+    is rendered again then. Once open, the handle stays readable even if
+    the file is evicted while the response is being sent.
+    """
+    for _attempt in range(3):
+        path = await render_report_cached(analysis_results, overall_score, files_analyzed, timestamp)
+        try:
+            return await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            continue
+    raise RuntimeError("Rendered report was evicted before it could be sent")
+
+
+async def file_chunks(f, chunk_size: int = 64 * 1024):
+    """Read an open file in chunks off the event loop, closing it at the end"""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+def normalize_timestamp(timestamp: Optional[str]) -> str:
+    """ISO-8601 UTC form so stored timestamps sort chronologically"""
+    parsed = parse_timestamp(timestamp)
+    return (parsed or datetime.now(timezone.utc)).astimezone(timezone.utc).isoformat()
+
+
+def parse_score(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def report_key(analysis_results: Dict, overall_score: str, files_analyzed: List[str], timestamp: Optional[str]) -> str:
+    return payload_hash({
+        "analysisResults": analysis_results,
+        "overallScore": overall_score,
+        "filesAnalyzed": files_analyzed,
+        "timestamp": timestamp,
+    }, version=RENDER_VERSION)
+
+
+async def ensure_report_pdf(delivery: Dict):
+    """
+    (open PDF, size) of an outbox delivery, rendering and storing it on first
+    use. The PDF is copied into the store and read by the sink in chunks.
+    """
+    report_id = delivery["reportId"]
+    if await asyncio.to_thread(report_store.has_pdf, report_id):
+        reader, _key = await asyncio.to_thread(report_store.open_pdf, report_id)
+        return reader, reader.size
+    payload = delivery["payload"]
+    pdf_file = await open_report_cached(
+        payload["analysisResults"],
+        payload["overallScore"],
+        payload["filesAnalyzed"],
+        payload["timestamp"]
+    )
+    try:
+        size = os.fstat(pdf_file.fileno()).st_size
+        await asyncio.to_thread(report_store.attach_pdf, report_id, pdf_file, size)
+        pdf_file.seek(0)
+    except BaseException:
+        pdf_file.close()
+        raise
+    return pdf_file, size
+
 # ---------------------------
 # Endpoints
 # ---------------------------
@@ -135,8 +771,94 @@ def root():
     return {"status": "running", "message": "Gemini SDLC Verifier active"}
 
 
+@app.get("/healthz")
+def liveness():
+    """Liveness: the process is up and serving requests (no dependencies checked)"""
+    return {"status": "alive", "uptime_seconds": round(time.time() - STARTED_AT, 1)}
+
+
+@app.get("/readyz")
+async def readiness():
+    """
+    Readiness, with the state of each component. Lazily created components
+    that simply haven't been used yet count as ready; the model counts as
+    unavailable when it has no API key or failed to initialize.
+    """
+    components = {"model": model.status() if isinstance(model, LazyModel) else {"state": "ready"}}
+    components["phases"] = {"state": "ready", "available": list(phase_specs.PHASES)}
+    components["pdf_renderer"] = {"state": "ready" if _render_fn is not None else "not_initialized"}
+    components["render_pool"] = {
+        "state": "ready" if render_pool.started else "not_initialized",
+        "workers": render_pool.workers,
+        "pending": render_pool.pending,
+    }
+    # shedding load is serving, not unavailability: "degraded" while a queue is full
+    work = admission.stats()
+    saturated = any(w["max_inflight"] and w["inflight"] >= w["max_inflight"] and w["queued"] >= w["max_queue"]
+                    for w in work.values())
+    components["admission"] = {"state": "degraded" if saturated else "ready", "work": work}
+    components["llm_scheduler"] = {"state": "ready", "workers": LLM_MAX_WORKERS, "classes": llm_executor.stats()}
+    for name, store in (("report_store", report_store), ("usage_ledger", usage_ledger)):
+        try:
+            await asyncio.to_thread(store.ping)
+            components[name] = {"state": "ready"}
+        except Exception as e:
+            components[name] = {"state": "unavailable", "detail": str(e)}
+    running = outbox_dispatcher is not None and outbox_dispatcher.running
+    components["outbox_dispatcher"] = {"state": "ready" if running else "unavailable"}
+    try:
+        await asyncio.to_thread(shared_state.ping)
+        components["shared_state"] = {"state": "ready", "backend": shared_state.name}
+    except Exception as e:
+        # workers fall back to local caches and duplicate work, but still serve
+        components["shared_state"] = {"state": "degraded", "backend": shared_state.name, "detail": str(e)}
+
+    ready = all(c["state"] != "unavailable" for c in components.values())
+    return JSONResponse({
+        "status": "ready" if ready else "not_ready",
+        "components": components,
+        "warmup": warmup_status
+    }, status_code=200 if ready else 503)
+
+
+@app.post("/admin/warmup")
+async def warmup(http_request: Request):
+    """Initialize lazily loaded components now (admin only)"""
+    if not is_admin(http_request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    status = await warm_up()
+    return JSONResponse({"success": not status["errors"], "warmup": status})
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/usage")
+async def get_usage(http_request: Request, days: int = Query(7, ge=1, le=366)):
+    """Daily token usage of the caller's workspace and its remaining budget"""
+    workspace = workspace_id(http_request)
+    daily = await asyncio.to_thread(usage_ledger.report, workspace, days)
+    budget = await asyncio.to_thread(token_budget.status, workspace)
+    return JSONResponse({"success": True, "budget": budget, "daily": daily})
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, http_request: Request):
+    """CPU / allocation profile captured for a request (admin only)"""
+    if not profiler.authorised(http_request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    profile = await asyncio.to_thread(profiler.load, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return JSONResponse({"success": True, "profile": profile})
+
+
 @app.post("/upload")
 async def upload_files(
+    request: Request,
     files: List[UploadFile] = File(...),
     clear: Optional[bool] = Query(False, description="If true, clear previous uploads before saving"),
 ):
@@ -145,7 +867,10 @@ async def upload_files(
     - files: list of UploadFile
     - clear (query param): if true, the uploads directory will be cleared first
     Returns list of saved filenames.
+    With SPECULATIVE_ANALYSIS on, the analysis of the new files starts in
+    the background (see speculate()); DELETE /speculation cancels it.
     """
+    workspace = workspace_id(request)
     try:
         if len(files) > MAX_FILES_PER_REQUEST:
             return JSONResponse({
@@ -189,10 +914,22 @@ async def upload_files(
                     "message": f"Total uploaded size exceeds limit ({MAX_TOTAL_BYTES_PER_REQUEST} bytes)"
                 }, status_code=413)
 
+        UPLOAD_BYTES.inc(total_bytes)
+        UPLOAD_FILES.inc(len(saved_files))
+        UPLOAD_REQUEST_BYTES.observe(total_bytes)
+
+        # Re-index only what changed so /chat can retrieve from the new files
+        await asyncio.to_thread(chat_index.sync, UPLOAD_DIR)
+
+        if speculator.enabled:
+            digest = await asyncio.to_thread(workspace_digest)
+            speculator.schedule(workspace, digest, lambda token: speculate(workspace, digest, token))
+
         return JSONResponse({
             "success": True,
             "message": f"{len(saved_files)} files uploaded successfully",
-            "files": saved_files
+            "files": saved_files,
+            "speculation": speculator.status(workspace)
         })
 
     except Exception as e:
@@ -202,32 +939,90 @@ async def upload_files(
         }, status_code=500)
 
 
-@app.post("/analyze")
-async def analyze_project():
-    """
-    Reads files from uploads/ and passes them to analyzers.
-    Returns analyzer outputs and an overall score.
-    """
-    try:
-        uploaded_files = os.listdir(UPLOAD_DIR)
-        if not uploaded_files:
-            return JSONResponse({"success": False, "message": "No files uploaded"}, status_code=400)
+@app.delete("/speculation")
+async def cancel_speculation(request: Request):
+    """Cancel the workspace's speculative analysis started by /upload, if one is pending or running"""
+    workspace = workspace_id(request)
+    return JSONResponse({"success": True, "cancelled": speculator.cancel(workspace, "requested")})
+
+
+PHASE_RESULT_NAMESPACE = "phase_result"
+FILE_METADATA_NAMESPACE = "file_metadata"
+PROJECT_DIGEST_NAMESPACE = "project_digest"
+
+
+def phase_result_key(digest: str, spec: PhaseSpec) -> str:
+    """Cache key of one phase result: workspace content, model, phase spec and engine code"""
+    return payload_hash({
+        "workspace": digest,
+        "model": model_name(),
+        "engine": PHASE_ENGINE_FINGERPRINT,
+        "phase": asdict(spec),
+        "extraction": extraction.settings(),
+        "dedup": dedup.settings(),
+        "context": phase_engine.settings(),
+        "overview": PROJECT_DIGEST_OVERVIEW,
+    })
+
+
+def contents_hash(file_contents: Dict[str, str]) -> str:
+    """Hash of the file contents as the phases see them (after extraction)"""
+    h = hashlib.sha256()
+    for name in sorted(file_contents):
+        h.update(name.encode("utf-8") + b"\0")
+        h.update(file_contents[name].encode("utf-8", "surrogatepass") + b"\n")
+    return h.hexdigest()
+
+
+def project_digest_key(file_contents: Dict[str, str]) -> str:
+    return payload_hash({
+        "contents": contents_hash(file_contents),
+        "engine": PHASE_ENGINE_FINGERPRINT,
+        "model": model_name() if PROJECT_DIGEST_OVERVIEW else None,
+    })
 
-        file_contents: Dict[str, str] = {}
-        metadata: Dict[str, Dict] = {}
 
-        # Read each file - text if possible, else store a short binary preview
+async def load_project_digest(key: str, file_contents: Dict[str, str]):
+    """(digest, cached): from the shared state, or built by static analysis (without overview)"""
+    if ANALYSIS_CACHE_TTL_SECONDS > 0:
+        digest = await asyncio.to_thread(shared_state.get, PROJECT_DIGEST_NAMESPACE, key)
+        if digest is not None:
+            return digest, True
+    with tracer_span("project_digest", {"files": len(file_contents)}):
+        return await asyncio.to_thread(project_digest.build_digest, file_contents), False
+
+
+async def read_uploads(uploaded_files: List[str]):
+    """(file_contents, metadata) of the uploaded files, as the phases see them (extracted, deduplicated)"""
+    file_contents: Dict[str, str] = {}
+    metadata: Dict[str, Dict] = {}
+
+    # Read each file - text if possible, else store a short binary preview
+    with tracer_span("ingest", {"files": len(uploaded_files)}):
         for filename in uploaded_files:
             file_path = os.path.join(UPLOAD_DIR, filename)
             stat = os.stat(file_path)
             metadata[filename] = {"size": stat.st_size}
 
+            if extraction.reads_path(filename):
+                # tables are profiled from disk in chunks instead of read whole
+                profile = await asyncio.to_thread(extraction.extract_path, file_path)
+                if profile is not None:
+                    file_contents[filename] = profile
+                    metadata[filename].update(type="table", extractor=extraction.extractor_name(filename),
+                                              extracted_chars=len(profile))
+                    continue
+
             try:
                 # try to read as UTF-8 text
                 async with aiofiles.open(file_path, "r", encoding="utf-8", errors="strict") as f:
                     content = await f.read()
-                file_contents[filename] = content
+                file_contents[filename] = extraction.extract(filename, content)
                 metadata[filename]["type"] = "text"
+                extractor = extraction.extractor_name(filename)
+                if extractor and file_contents[filename] is not content:
+                    metadata[filename]["extractor"] = extractor
+                    metadata[filename]["extracted_chars"] = len(file_contents[filename])
             except Exception:
                 # binary fallback: keep a short preview (not entire file)
                 metadata[filename]["type"] = "binary"
@@ -236,36 +1031,297 @@ async def analyze_project():
                 # store a hex preview for debugging (short)
                 file_contents[filename] = f"[Binary file: {len(preview)} bytes preview]"
 
-        # Call analyzers (they should accept (file_contents, model))
-        results = {
-            "requirements": analyze_requirements(file_contents, model),
-            "design": analyze_design(file_contents, model),
-            "implementation": analyze_implementation(file_contents, model),
-            "testing": analyze_testing(file_contents, model),
-            "deployment": analyze_deployment(file_contents, model),
-            "maintenance": analyze_maintenance(file_contents, model)
-        }
+        # copies are sent once: the others become a "duplicate of X" note
+        duplicates = await asyncio.to_thread(dedup.find_duplicates, file_contents)
+        for filename, duplicate in duplicates.items():
+            metadata[filename].update(duplicate_of=duplicate.of, similarity=round(duplicate.similarity, 2))
+        file_contents = dedup.annotate(file_contents, duplicates)
+    return file_contents, metadata
 
-        # Compute overall score safely: handle missing scores
-        scores = []
-        for phase, res in results.items():
-            if isinstance(res, dict) and ("score" in res):
-                try:
-                    scores.append(float(res["score"]))
-                except Exception:
-                    scores.append(0.0)
-            else:
+
+async def run_phases(request: Request, workspace: str, specs: List[PhaseSpec], file_contents: Dict[str, str],
+                     token: Optional[CancelToken] = None, admit: Optional[Callable[[int], None]] = None,
+                     priority: str = "analysis"):
+    """
+    Run the given phases concurrently; returns (results by phase name, token usage).
+    admit, if given, is called with the token estimate before anything is
+    reserved and may refuse the run by raising BudgetExceeded. The model calls
+    are scheduled in the `priority` class of the LLM pool.
+    """
+    ensure_model_available()
+    token = token or CancelToken()
+    executor = llm_executor.for_class(priority)
+    phase_model = CancellableModel(model, token)
+
+    # Large projects: the phases that would see too many raw files get the digest
+    digest = None
+    context = {spec.name: "digest" if phase_engine.uses_digest(spec, file_contents) else "files" for spec in specs}
+    if "digest" in context.values():
+        digest_key = project_digest_key(file_contents)
+        digest, digest_cached = await load_project_digest(digest_key, file_contents)
+    overview_needed = digest is not None and PROJECT_DIGEST_OVERVIEW and digest.get("overview") is None
+
+    # with a digest this builds the excerpt prompts (first-time AST condensing): off the loop
+    prompt_tokens = await asyncio.to_thread(estimate_tokens_for, specs, file_contents, digest)
+    if overview_needed:
+        prompt_tokens += estimate_tokens(
+            await asyncio.to_thread(project_digest.overview_prompt, digest, file_contents)
+        )
+    estimate = token_budget.estimate(prompt_tokens, calls=len(specs) + overview_needed)
+    if admit is not None:
+        admit(estimate)
+    async with token_budget.hold(workspace, estimate) as reservation:
+        meter = reservation.meter
+        if overview_needed:
+            # the digest stage's one model call, shared by all phases and cached with the digest
+            overview_model = InstrumentedModel(phase_model, "digest", meter)
+            try:
+                outputs = await run_cancellable(request, executor, {
+                    "digest": timed_phase("digest", lambda: project_digest.summarize(digest, file_contents, overview_model))
+                }, token, endpoint="/analyze")
+                digest["overview"] = outputs["digest"]
+            except (AnalysisCancelled, BudgetExceeded):
+                raise
+            except Exception:
+                pass  # phases still get the static digest; the overview is retried next time
+        if digest is not None and ANALYSIS_CACHE_TTL_SECONDS > 0 and (not digest_cached or (overview_needed and digest["overview"])):
+            await asyncio.to_thread(shared_state.set, PROJECT_DIGEST_NAMESPACE, digest_key, digest,
+                                    ANALYSIS_CACHE_TTL_SECONDS)
+        results = await run_cancellable(request, executor, {
+            spec.name: timed_phase(
+                spec.name,
+                lambda spec=spec: run_phase(spec, file_contents, InstrumentedModel(phase_model, spec.name, meter), digest)
+            )
+            for spec in specs
+        }, token, endpoint="/analyze")
+    usage = meter.summary()
+    usage.update({"workspace": workspace, "estimated_before_call": estimate, "context": context})
+    return results, usage
+
+
+async def analysis_entries(request: Request, workspace: str, specs: List[PhaseSpec], uploaded_files: List[str],
+                           digest: str, computed: Dict, refresh: bool = False, token: Optional[CancelToken] = None,
+                           admit: Optional[Callable[[int], None]] = None, speculative: bool = False,
+                           priority: str = "analysis") -> Dict[str, Dict]:
+    """
+    Phase name -> {"result", "stored_at"} for the specs: cached results from the
+    shared state, the others computed (once across workers) and stored. What ran
+    is recorded in `computed` ("ran", "metadata", "usage"; "speculative" when
+    files prepared by a speculative run were reused). A speculative run
+    (speculative=True) takes an admission slot only if one is free.
+    Computing needs an admission slot of the `priority` class ("analysis" or
+    "batch"; raises Overloaded otherwise), which also schedules its model calls.
+    """
+    caching = ANALYSIS_CACHE_TTL_SECONDS > 0
+    entries: Dict[str, Dict] = {}
+
+    if caching:
+        keys = {spec.name: phase_result_key(digest, spec) for spec in specs}
+        not_before = time.time() if refresh else 0.0
+
+        async def lookup_results(names: List[str]) -> Dict[str, Dict]:
+            stored = await asyncio.to_thread(
+                shared_state.get_many, PHASE_RESULT_NAMESPACE, [keys[n] for n in names]
+            )
+            return {
+                n: stored[keys[n]] for n in names
+                if keys[n] in stored and stored[keys[n]]["stored_at"] >= not_before
+            }
+
+        entries = await lookup_results(list(keys))
+
+    missing = [spec for spec in specs if spec.name not in entries]
+    if missing:
+        async def compute() -> Dict[str, Dict]:
+            # speculative runs take a free slot or none: they never queue ahead of requested work
+            async with admission.slot(priority, wait=not speculative):
+                computed["ran"] = [spec.name for spec in missing]
+                prepared = speculator.prepared(digest)
+                if prepared is not None:
+                    computed["speculative"] = True
+                file_contents, computed["metadata"] = prepared or await read_uploads(uploaded_files)
+                results, computed["usage"] = await run_phases(request, workspace, missing, file_contents, token, admit,
+                                                              priority)
+            stored_at = time.time()
+            fresh = {name: {"result": result, "stored_at": stored_at} for name, result in results.items()}
+            if caching:
+                # phases that errored are retried on the next request
+                await asyncio.to_thread(shared_state.set_many, PHASE_RESULT_NAMESPACE, {
+                    keys[name]: entry for name, entry in fresh.items()
+                    if not (isinstance(entry["result"], dict) and entry["result"].get("status") == "error")
+                }, ANALYSIS_CACHE_TTL_SECONDS)
+                await asyncio.to_thread(shared_state.set, FILE_METADATA_NAMESPACE, digest,
+                                        computed["metadata"], ANALYSIS_CACHE_TTL_SECONDS)
+            return fresh
+
+        if caching:
+            names = [spec.name for spec in missing]
+
+            async def lookup_missing():
+                found = await lookup_results(names)
+                return found if len(found) == len(names) else None
+
+            flight_key = payload_hash({"phases": sorted(keys[n] for n in names)})
+            entries.update(await analysis_flight.run(flight_key, lookup_missing, compute))
+        else:
+            entries.update(await compute())
+
+    return entries
+
+
+async def speculate(workspace: str, digest: str, token: CancelToken):
+    """
+    Speculative run for the uploads with content digest `digest`: reads and
+    extracts the files, builds the project digest and the phase prompts (warming
+    their caches) and, with SPECULATIVE_ANALYSIS=full, runs every phase within
+    the speculative token caps, storing the results for the /analyze that follows.
+    """
+    uploaded_files = os.listdir(UPLOAD_DIR)
+    if not uploaded_files or await asyncio.to_thread(workspace_digest) != digest:
+        return  # changed since; the upload that changed it speculates on the new files
+    prepared = await read_uploads(uploaded_files)
+    token.raise_if_cancelled()
+    speculator.remember(digest, prepared)
+
+    file_contents = prepared[0]
+    specs = select_phases(None)
+    project = None
+    if any(phase_engine.uses_digest(spec, file_contents) for spec in specs):
+        key = project_digest_key(file_contents)
+        project, cached = await load_project_digest(key, file_contents)
+        if not cached and ANALYSIS_CACHE_TTL_SECONDS > 0:
+            await asyncio.to_thread(shared_state.set, PROJECT_DIGEST_NAMESPACE, key, project,
+                                    ANALYSIS_CACHE_TTL_SECONDS)
+    await asyncio.to_thread(estimate_tokens_for, specs, file_contents, project)
+    if not speculator.runs_phases or ANALYSIS_CACHE_TTL_SECONDS <= 0:
+        return  # without the result cache, phase results could not be picked up
+    token.raise_if_cancelled()
+
+    admitted = []
+
+    def admit(estimate: int):
+        speculator.admit(workspace, estimate)
+        admitted.append(estimate)
+
+    computed: Dict = {"speculative": False}
+    await analysis_entries(DetachedRequest(), workspace, specs, uploaded_files, digest, computed,
+                           token=token, admit=admit, speculative=True, priority="batch")
+    if admitted and "usage" in computed:
+        speculator.settle(workspace, admitted[0], computed["usage"]["total_tokens"])
+
+
+def overall_score(results: Dict) -> float:
+    # Compute overall score safely: handle missing scores
+    scores = []
+    for phase, res in results.items():
+        if isinstance(res, dict) and ("score" in res):
+            try:
+                scores.append(float(res["score"]))
+            except Exception:
                 scores.append(0.0)
+        else:
+            scores.append(0.0)
+
+    return (sum(scores) / len(scores)) if scores else 0.0
+
+
+@app.post("/analyze")
+async def analyze_project(
+    request: Request,
+    phases: Optional[str] = Query(None, description="Comma-separated phases to run, e.g. requirements,testing (default: all)"),
+    refresh: Optional[bool] = Query(False, description="If true, re-run even when cached results exist"),
+):
+    """
+    Reads files from uploads/ and passes them to the analysis phases
+    (all of them, or those selected with ?phases=).
+    Returns the phase results and an overall score over those phases.
+    Phases run concurrently on the LLM worker pool and are cancelled
+    if the client disconnects before the analysis completes.
+    Token usage is returned per phase and charged to the request's
+    workspace; an analysis whose estimate exceeds a token budget is
+    refused with 429 before any model call.
+    Each phase result is cached in the shared state while the files, the
+    model and the phase spec are unchanged, so only phases without a
+    cached result are run ("cached_phases" lists the others), and a run
+    already in flight in another worker is waited for, not repeated.
+    Phases whose files would make a large prompt see the project digest
+    plus excerpts instead (usage["context"] tells which; PHASE_CONTEXT_MODE).
+    With SPECULATIVE_ANALYSIS on, work started by /upload for the same files
+    is joined or reused ("speculative" tells whether this request did either;
+    refresh=true neither joins nor waits for it).
+    Analyses that need to run are admission-controlled: past the in-flight
+    and queue limits the answer is 503 with Retry-After (cached results
+    are always served). Send X-Priority: batch for non-interactive (API)
+    analyses: they queue longer and yield the LLM pool to interactive work.
+    """
+    workspace = workspace_id(request)
+    try:
+        specs = select_phases(phases.split(",") if phases else None)
+    except UnknownPhase as e:
+        return JSONResponse({"success": False, "message": str(e)}, status_code=400)
+
+    try:
+        uploaded_files = os.listdir(UPLOAD_DIR)
+        if not uploaded_files:
+            return JSONResponse({"success": False, "message": "No files uploaded"}, status_code=400)
+
+        digest = await asyncio.to_thread(workspace_digest)
+        # a refresh recomputes anyway: don't wait for a speculative run to finish first
+        computed: Dict = {"speculative": False if refresh else await speculator.join(workspace, digest)}
+        entries = await analysis_entries(request, workspace, specs, uploaded_files, digest, computed, refresh,
+                                         priority=analysis_priority(request))
+        caching = ANALYSIS_CACHE_TTL_SECONDS > 0
+
+        ran = set(computed.get("ran", ()))
+        if caching:
+            for spec in specs:
+                ANALYSIS_CACHE_LOOKUPS.inc(
+                    result="hit" if spec.name not in ran else ("refresh" if refresh else "miss")
+                )
+
+        metadata = computed.get("metadata")
+        if metadata is None and caching:
+            metadata = await asyncio.to_thread(shared_state.get, FILE_METADATA_NAMESPACE, digest)
+        if metadata is None:
+            _contents, metadata = speculator.prepared(digest) or await read_uploads(uploaded_files)
+
+        usage = computed.get("usage")
+        if usage is None:
+            usage = token_budget.new_meter().summary()
+            usage["workspace"] = workspace
+
+        results = {spec.name: entries[spec.name]["result"] for spec in specs}
+        analyzed_at = max(entry["stored_at"] for entry in entries.values())
+        cached_phases = [spec.name for spec in specs if spec.name not in ran]
+
+        with tracer_span("response.encode"):
+            return JSONResponse({
+                "success": True,
+                "overall_score": round(overall_score(results), 2),
+                "phases": results,
+                "files_analyzed": uploaded_files,
+                "file_metadata": metadata,
+                "analyzed_at": datetime.fromtimestamp(analyzed_at, timezone.utc).isoformat(),
+                "usage": usage,
+                "cached": len(cached_phases) == len(specs),
+                "cached_phases": cached_phases,
+                "speculative": computed["speculative"]
+            })
 
-        overall_score = (sum(scores) / len(scores)) if scores else 0.0
+    except BudgetExceeded as e:
+        return budget_response(e)
 
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    except ModelUnavailable as e:
+        return model_unavailable_response(e)
+
+    except AnalysisCancelled:
         return JSONResponse({
-            "success": True,
-            "overall_score": round(overall_score, 2),
-            "phases": results,
-            "files_analyzed": uploaded_files,
-            "file_metadata": metadata
-        })
+            "success": False,
+            "message": "Analysis cancelled: client disconnected"
+        }, status_code=CLIENT_CLOSED_REQUEST)
 
     except Exception as e:
         return JSONResponse({
@@ -275,86 +1331,330 @@ async def analyze_project():
 
 
 @app.post("/chat")
-async def chat_with_ai(message: str = Form(...)):
+async def chat_with_ai(
+    request: Request,
+    message: str = Form(...),
+    session_id: Optional[str] = Form(None),
+):
     """
-    Simple chat endpoint which includes a list of uploaded files in the prompt.
+    Chat endpoint grounded in the uploaded files: the prompt carries the file
+    list plus the most relevant excerpts retrieved from the BM25 index.
+    Pass back the returned session_id (from the same workspace) to continue a
+    conversation; an unknown id starts a new session with a fresh id.
+    Uncached answers are admission-controlled (503 with Retry-After when busy).
     """
+    workspace = workspace_id(request)
     try:
-        file_list = ", ".join(os.listdir(UPLOAD_DIR)) or "No files uploaded"
+        session = chat_sessions.get_or_create(session_id, workspace)
 
-        prompt = f"""
-You are a Senior Software Engineer + SDLC Specialist.
-Use clean technical language.
-
-Files:
-{file_list}
-
-User Question:
-{message}
+        # Only context-free questions (first turn of a session) are cacheable
+        cacheable = not session.has_history()
+        if cacheable:
+            digest = await asyncio.to_thread(workspace_digest)
+            cached, tier = await asyncio.to_thread(chat_cache.get, message, digest, model_name())
+            if cached is not None:
+                remember_turn(session, message, cached, workspace)
+                return JSONResponse({
+                    "success": True,
+                    "response": cached,
+                    "session_id": session.session_id,
+                    "cached": tier
+                })
 
-Give a structured, precise answer.
-"""
+        ensure_model_available()
+        async with admission.slot("chat"):
+            prompt = await build_chat_prompt(message, session)
 
-        # model.generate_content(...) per your existing usage
-        response = model.generate_content(prompt)
+            # model.generate_content(...) per your existing usage
+            token = CancelToken()
+            async with token_budget.hold(workspace, token_budget.estimate(estimate_tokens(prompt))) as reservation:
+                chat_model = InstrumentedModel(CancellableModel(model, token), "chat", reservation.meter)
+                outputs = await run_cancellable(request, llm_executor.for_class("chat"), {
+                    "chat": lambda: chat_model.generate_content(prompt)
+                }, token, endpoint="/chat")
+        response = outputs["chat"]
         # response might be an object; use .text or str accordingly
         text = getattr(response, "text", str(response))
+        remember_turn(session, message, text, workspace)
+        if cacheable:
+            await asyncio.to_thread(chat_cache.put, message, digest, model_name(), text)
 
         return JSONResponse({
             "success": True,
-            "response": text
+            "response": text,
+            "session_id": session.session_id,
+            "cached": False,
+            "usage": reservation.meter.summary()
         })
 
+    except BudgetExceeded as e:
+        return budget_response(e)
+
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    except ModelUnavailable as e:
+        return model_unavailable_response(e)
+
+    except AnalysisCancelled:
+        return JSONResponse({
+            "success": False,
+            "message": "Chat cancelled: client disconnected"
+        }, status_code=CLIENT_CLOSED_REQUEST)
+
+    except Exception as e:
+        return JSONResponse({
+            "success": False,
+            "message": f"Chat error: {str(e)}"
+        }, status_code=500)
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    http_request: Request,
+    message: str = Form(...),
+    session_id: Optional[str] = Form(None),
+):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+    Emits `token` events as the model produces text, then a final `done`
+    event with token counts, time-to-first-token, total time and session_id.
+    """
+    workspace = workspace_id(http_request)
+    try:
+        session = chat_sessions.get_or_create(session_id, workspace)
+        cacheable = not session.has_history()
+        if cacheable:
+            digest = await asyncio.to_thread(workspace_digest)
+            cached, tier = await asyncio.to_thread(chat_cache.get, message, digest, model_name())
+            if cached is not None:
+                remember_turn(session, message, cached, workspace)
+                return StreamingResponse(
+                    stream_text(cached, extra={"session_id": session.session_id, "cached": tier}),
+                    media_type="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+                )
+        ensure_model_available()
+        slot = await admission.acquire("chat")
+        try:
+            prompt = await build_chat_prompt(message, session)
+            reservation = await asyncio.to_thread(token_budget.reserve, workspace,
+                                                  token_budget.estimate(estimate_tokens(prompt)))
+        except BaseException:
+            slot.release()
+            raise
+    except BudgetExceeded as e:
+        return budget_response(e)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except ModelUnavailable as e:
+        return model_unavailable_response(e)
     except Exception as e:
         return JSONResponse({
             "success": False,
             "message": f"Chat error: {str(e)}"
         }, status_code=500)
 
+    async def on_complete(text: str):
+        remember_turn(session, message, text, workspace)
+        if cacheable:
+            # the shared backend may block or be down: off the loop, and never at the stream's expense
+            try:
+                await asyncio.to_thread(chat_cache.put, message, digest, model_name(), text)
+            except Exception:
+                logger.warning("Chat answer cache write failed", exc_info=True)
+
+    released = False
+
+    async def release():
+        # the slot is freed and the reservation settled exactly once, whichever path gets here first
+        nonlocal released
+        if released:
+            return
+        released = True
+        start_guard.cancel()
+        slot.release()
+        await asyncio.to_thread(reservation.close)
+
+    # Neither the body nor the background task runs if the response is never sent
+    start_guard = asyncio.get_running_loop().call_later(
+        CHAT_STREAM_START_SECONDS, lambda: asyncio.ensure_future(release())
+    )
+
+    async def charged(stream):
+        start_guard.cancel()
+        try:
+            async for frame in stream:
+                yield frame
+        finally:
+            await stream.aclose()
+            await release()
+
+    return StreamingResponse(
+        charged(stream_generation(
+            model, prompt, llm_executor.for_class("chat"),
+            on_complete=on_complete,
+            on_usage=lambda counts: reservation.meter.record("chat", counts),
+            extra={"session_id": session.session_id, "cached": False},
+        )),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # runs after the response even when the body never started (client disconnected first)
+        background=BackgroundTask(release)
+    )
+
+
+@app.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str, http_request: Request):
+    """Forget one of the calling workspace's chat sessions"""
+    if not chat_sessions.delete(session_id, workspace_id(http_request)):
+        raise HTTPException(status_code=404, detail="Unknown chat session")
+    return JSONResponse({"success": True, "session_id": session_id})
+
 
 # ==================== NEW: PDF Generation Endpoint ====================
 
 @app.post("/generate-pdf")
-async def generate_pdf(request: PDFRequest):
+async def generate_pdf(request: PDFRequest, http_request: Request):
     """
-    Generate a PDF verification report from analysis results
+    Generate a PDF verification report from analysis results.
+    Rendering is deterministic, so the payload hash is the ETag: repeat
+    downloads are served from the disk cache, or answered with 304 when
+    the client sends a matching If-None-Match.
     """
     try:
         # Extract data from request
         analysis_results = request.analysisResults.dict()
         overall_score = request.overallScore
         files_analyzed = request.filesAnalyzed
+        timestamp = request.timestamp
         
-        # Generate PDF using the imported function
-        pdf_buffer = generate_pdf_report(
-            analysis_results,
-            overall_score,
-            files_analyzed
-        )
+        key = report_key(analysis_results, overall_score, files_analyzed, timestamp)
+        etag = f'"{key}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+        if etag_matches(http_request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=cache_headers)
         
-        # Create filename with timestamp
-        filename = f"SDLC_Verification_Report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        pdf_file = await open_report_cached(analysis_results, overall_score, files_analyzed, timestamp)
+        
+        # Filename derived from the content, stable across repeat downloads
+        filename = f"SDLC_Verification_Report_{key[:12]}.pdf"
         
-        # Return PDF as streaming response
         return StreamingResponse(
-            pdf_buffer,
+            file_chunks(pdf_file),
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f"attachment; filename={filename}"
+                "Content-Disposition": f"attachment; filename={filename}",
+                "Content-Length": str(os.fstat(pdf_file.fileno()).st_size),
+                **cache_headers
             }
         )
         
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF generation failed: {str(e)}")
 
 
+@app.post("/generate-pdf/batch")
+async def generate_pdf_batch(request: BatchPDFRequest):
+    """
+    Render many reports and stream them back as a single zip.
+    Payloads are rendered in parallel across the render pool and each PDF
+    is written into the archive as soon as it is ready. reportIds refer to
+    reports rendered earlier (the ETag returned by /generate-pdf) or stored
+    reviewer reports (their id or report key): the PDF cache is tried first,
+    then the report store, which outlives cache evictions.
+    """
+    # a repeated id would overwrite its archive entry: keep the first of each
+    report_ids = list(dict.fromkeys(report_id.strip().strip('"') for report_id in request.reportIds))
+    total = len(request.reports) + len(report_ids)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="No reports requested")
+    if total > MAX_BATCH_REPORTS:
+        raise HTTPException(status_code=413, detail=f"Too many reports in batch (limit {MAX_BATCH_REPORTS})")
+
+    # Leave room in the shared render queue for interactive /generate-pdf calls
+    slots = asyncio.Semaphore(render_pool.workers)
+    jobs = {}
+    opened = []
+    missing = []
+    for key in report_ids:
+        name = f"SDLC_Verification_Report_{key[:12]}.pdf"
+        if not re.fullmatch(r"[0-9a-f]{32,64}", key):
+            missing.append(key)
+            continue
+        # opened right away: the handle outlives an eviction before the entry is written
+        pdf_file = await asyncio.to_thread(report_cache.open, key)
+        if pdf_file is not None:
+            opened.append(pdf_file)
+            jobs[name] = _resolved(pdf_file)
+            continue
+        stored_id = await asyncio.to_thread(report_store.resolve_id, key)
+        if stored_id is None:
+            missing.append(key)
+        else:
+            jobs[name] = stored_report_for_batch(slots, stored_id)
+    if missing:
+        for job in jobs.values():
+            job.close()  # never awaited
+        for pdf_file in opened:
+            pdf_file.close()
+        raise HTTPException(status_code=404, detail={"message": "Unknown report ids", "reportIds": missing})
+
+    for index, report in enumerate(request.reports, start=1):
+        jobs[f"{index:03d}_SDLC_Verification_Report.pdf"] = render_for_batch(slots, report)
+
+    return StreamingResponse(
+        stream_zip(jobs),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=SDLC_Verification_Reports_{total}.zip"}
+    )
+
+
+async def _resolved(value):
+    return value
+
+
+async def stored_report_for_batch(slots: asyncio.Semaphore, report_id: str):
+    """A stored report's PDF, rendered from its payload if the outbox hasn't done so yet"""
+    try:
+        reader, _key = await asyncio.to_thread(report_store.open_pdf, report_id)
+        return reader
+    except ReportNotReady:
+        report = await asyncio.to_thread(report_store.get_report, report_id)
+        return await render_for_batch(slots, PDFRequest(**report["payload"]))
+
+
+async def render_for_batch(slots: asyncio.Semaphore, report: PDFRequest):
+    """Render and open one batch entry, waiting out a full render queue instead of failing"""
+    async with slots:
+        while True:
+            try:
+                return await open_report_cached(
+                    report.analysisResults.dict(),
+                    report.overallScore,
+                    report.filesAnalyzed,
+                    report.timestamp
+                )
+            except RenderQueueFull as e:
+                await asyncio.sleep(min(e.retry_after, 5))
+
+
 # ==================== NEW: Send to Reviewer Endpoint ====================
 
 @app.post("/send-to-reviewer")
-async def send_to_reviewer(request: ReviewerRequest):
+async def send_to_reviewer(request: ReviewerRequest, http_request: Request):
     """
-    Send verification report to reviewer
-    TODO: Implement Firebase/Firestore integration
+    Send verification report to reviewer.
+    The report and an outbox entry are committed in one local transaction
+    and the call returns right away; the outbox dispatcher renders the PDF
+    and delivers it in the background, retrying with backoff through the
+    configured DeliverySink (outbox.make_sink, OUTBOX_SINK). Every call is a
+    new submission unless it carries an Idempotency-Key header: a retry with
+    the same key returns the original report instead of queueing it twice,
+    and reusing a key for a different report is rejected with 422.
     """
     try:
         # Extract data
@@ -362,43 +1662,126 @@ async def send_to_reviewer(request: ReviewerRequest):
         overall_score = request.overallScore
         files_analyzed = request.filesAnalyzed
         timestamp = request.timestamp
+        key = report_key(analysis_results, overall_score, files_analyzed, timestamp)
+        idempotency_key = http_request.headers.get("idempotency-key") or uuid.uuid4().hex
+        if not re.fullmatch(r"[A-Za-z0-9_\-]{1,128}", idempotency_key):
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
         
-        # TODO: Implement your Firebase/Firestore logic here
-        # Example workflow:
-        # 1. Generate PDF
-        pdf_buffer = generate_pdf_report(
-            analysis_results,
-            overall_score,
-            files_analyzed
+        # 1. Persist report + outbox entry (PDF is rendered by the dispatcher)
+        report_id = await asyncio.to_thread(
+            report_store.add_report,
+            key,
+            normalize_timestamp(timestamp),
+            parse_score(overall_score),
+            files_analyzed,
+            {
+                "analysisResults": analysis_results,
+                "overallScore": overall_score,
+                "filesAnalyzed": files_analyzed,
+                "timestamp": timestamp,
+            },
+            None,
+            outbox_key=idempotency_key
         )
-        
-        # 2. Upload PDF to Firebase Storage
-        # storage_url = upload_to_firebase_storage(pdf_buffer, filename)
-        
-        # 3. Store metadata in Firestore
-        # firestore_doc = {
-        #     "overallScore": overall_score,
-        #     "filesAnalyzed": files_analyzed,
-        #     "pdfUrl": storage_url,
-        #     "status": "pending",
-        #     "timestamp": timestamp,
-        #     "phases": analysis_results["phases"]
-        # }
-        # db.collection("verificationReports").add(firestore_doc)
-        
-        # 4. Send notification to reviewer (optional)
-        # send_notification_to_reviewer(...)
-        
+        if outbox_dispatcher is not None:
+            outbox_dispatcher.notify()
+
         return JSONResponse({
             "success": True,
-            "message": "Report successfully sent to reviewer",
-            "timestamp": timestamp
-        })
+            "message": "Report queued for delivery to reviewer",
+            "timestamp": timestamp,
+            "reportId": report_id,
+            "idempotencyKey": idempotency_key
+        }, status_code=202)
         
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different report")
+
+    except HTTPException:
+        raise
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to send to reviewer: {str(e)}")
 
 
+@app.get("/outbox")
+async def outbox_status():
+    """Delivery backlog by status (pending, in_flight, delivered, failed)"""
+    counts = await asyncio.to_thread(report_store.outbox_counts)
+    return JSONResponse({"success": True, "outbox": counts})
+
+
+# ==================== Reviewer report store ====================
+
+@app.get("/reports")
+async def list_reports(
+    status: Optional[str] = Query(None, description="Filter by review status"),
+    sort: str = Query("timestamp", description="timestamp | score (descending)"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    phase: Optional[str] = Query(None, description="Only reports scored in this phase"),
+    max_phase_score: Optional[float] = Query(None, description="...with at most this score in `phase`"),
+):
+    """
+    Keyset-paginated listing of submitted reports (no PDF payloads).
+    """
+    if status is not None and status not in REPORT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(REPORT_STATUSES)}")
+    try:
+        page = await asyncio.to_thread(report_store.list_reports, status, sort, limit, cursor,
+                                       phase, max_phase_score)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({"success": True, **page})
+
+
+@app.get("/reports/{report_id}")
+async def get_report(report_id: str):
+    """Report metadata, per-phase scores and the original analysis payload"""
+    try:
+        report = await asyncio.to_thread(report_store.get_report, report_id)
+    except ReportNotFound:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return JSONResponse({"success": True, "report": report})
+
+
+@app.get("/reports/{report_id}/pdf")
+async def get_report_pdf(report_id: str, http_request: Request):
+    """The PDF stored at submission time (never re-rendered), streamed from the store"""
+    try:
+        reader, key = await asyncio.to_thread(report_store.open_pdf, report_id)
+    except ReportNotFound:
+        raise HTTPException(status_code=404, detail="Report not found")
+    except ReportNotReady:
+        if outbox_dispatcher is not None:
+            outbox_dispatcher.notify()
+        raise HTTPException(status_code=409, detail="Report PDF is still being rendered", headers={"Retry-After": "2"})
+    etag = f'"{key}"'
+    if etag_matches(http_request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        file_chunks(reader),
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f"attachment; filename=SDLC_Verification_Report_{key[:12]}.pdf",
+            "Content-Length": str(reader.size),
+            "ETag": etag
+        }
+    )
+
+
+@app.patch("/reports/{report_id}/status")
+async def update_report_status(report_id: str, update: ReportStatusUpdate):
+    """Move a report through the review workflow"""
+    try:
+        await asyncio.to_thread(report_store.set_status, report_id, update.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ReportNotFound:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return JSONResponse({"success": True, "id": report_id, "status": update.status})
+
+
 # ---------------------------
 # Run with: uvicorn main:app --reload --port 8000
 # Or keep the block below for running via `python main.py`
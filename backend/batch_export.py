@@ -0,0 +1,113 @@
+"""
+Streaming zip export of many rendered reports.
+
+Jobs are awaited concurrently and each PDF is appended to the archive as
+soon as its render finishes, so the client starts receiving bytes after
+the first report instead of after the last one. The archive is written
+through a non-seekable sink (entries use data descriptors) and drained
+after every chunk, which keeps memory bounded by the copy chunk size.
+"""
+
+import asyncio
+import json
+import zipfile
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, Tuple
+
+COPY_CHUNK_SIZE = 64 * 1024
+# Fixed entry timestamp keeps the archive layout reproducible
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class _ZipSink:
+    """Write-only, non-seekable file object that buffers until drained"""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _close(source):
+    if hasattr(source, "close"):
+        source.close()
+
+
+async def _labelled(name: str, job: Awaitable) -> Tuple[str, Optional[object], Optional[str]]:
+    try:
+        return name, await job, None
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        return name, None, str(e)
+
+
+async def stream_zip(jobs: Dict[str, Awaitable]) -> AsyncIterator[bytes]:
+    """
+    jobs maps archive entry names to awaitables resolving to a file path or
+    an open binary file (closed once copied).
+    Yields the zip archive incrementally, in completion order, followed by a
+    manifest.json that records which entries succeeded or failed.
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED)
+    tasks = [asyncio.ensure_future(_labelled(name, job)) for name, job in jobs.items()]
+    manifest = []
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            name, source, error = await next_done
+            if error is not None:
+                manifest.append({"file": name, "status": "error", "error": error})
+                continue
+
+            info = zipfile.ZipInfo(name, date_time=_ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_STORED  # PDFs are already compressed
+            # file reads run in a thread; the zip itself only writes to the in-memory sink
+            src = source if hasattr(source, "read") else await asyncio.to_thread(open, source, "rb")
+            try:
+                with archive.open(info, "w") as dst:
+                    while True:
+                        chunk = await asyncio.to_thread(src.read, COPY_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        dst.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            finally:
+                src.close()
+            manifest.append({"file": name, "status": "ok"})
+            data = sink.drain()
+            if data:
+                yield data
+
+        archive.writestr(
+            zipfile.ZipInfo("manifest.json", date_time=_ZIP_DATE_TIME),
+            json.dumps(sorted(manifest, key=lambda m: m["file"]), indent=2),
+        )
+        archive.close()
+        yield sink.drain()
+
+    finally:
+        # client went away (or we failed): stop the renders nobody will read
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                _close(task.result()[1])  # no-op for files already copied
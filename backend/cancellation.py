@@ -0,0 +1,139 @@
+"""
+Cancellation of LLM work when the HTTP client goes away.
+
+Phase analyses and chat calls run on a bounded thread pool. While they run,
+a watcher polls the request for a client disconnect; when it fires, the
+shared CancelToken is tripped and every pending future is cancelled:
+- queued calls that never reached a worker are dropped from the pool queue
+- in-flight calls stop consuming the model's response stream at the next
+  chunk, which aborts generation instead of paying for the full answer
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import Callable, Dict, Optional
+
+from metrics import LLM_INFLIGHT, LLM_TASKS_CANCELLED, REQUESTS_CANCELLED
+from tracing import bind
+
+# How often (seconds) to poll the ASGI receive channel for a disconnect
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside worker threads once the owning request is cancelled"""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared by one request's LLM calls"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "client_disconnected"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise AnalysisCancelled(self.reason or "cancelled")
+
+
+class CancellableModel:
+    """
+    Wraps a GenerativeModel so analyzers can keep calling generate_content().
+    The call is made in streaming mode and the token is checked between
+    chunks; the returned object is the fully resolved response, so
+    `response.text` behaves exactly like a non-streamed call.
+    """
+
+    def __init__(self, model, token: CancelToken):
+        self._model = model
+        self.token = token
+
+    def generate_content(self, prompt, **kwargs):
+        self.token.raise_if_cancelled()
+        if kwargs.pop("stream", False):
+            return self._model.generate_content(prompt, stream=True, **kwargs)
+
+        response = self._model.generate_content(prompt, stream=True, **kwargs)
+        for _chunk in response:
+            # Abandoning the iterator closes the stream and stops generation
+            self.token.raise_if_cancelled()
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+async def watch_disconnect(request, token: CancelToken, futures, interval: float = DISCONNECT_POLL_INTERVAL):
+    """Trip the token and cancel outstanding futures once the client disconnects"""
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel("client_disconnected")
+            for fut in futures:
+                fut.cancel()
+            return
+        await asyncio.sleep(interval)
+
+
+async def run_cancellable(
+    request,
+    executor: Executor,
+    calls: Dict[str, Callable[[], object]],
+    token: CancelToken,
+    endpoint: str,
+) -> Dict[str, object]:
+    """
+    Run each zero-argument callable on the executor and return their results
+    keyed like `calls`. Raises AnalysisCancelled if the client disconnected
+    before everything finished; cancellations are counted per task state.
+    """
+    loop = asyncio.get_running_loop()
+    started = set()
+    lock = threading.Lock()
+
+    def guarded(name: str, fn: Callable[[], object]) -> Callable[[], object]:
+        def run():
+            token.raise_if_cancelled()
+            with lock:
+                started.add(name)
+            LLM_INFLIGHT.inc()
+            try:
+                return fn()
+            finally:
+                LLM_INFLIGHT.dec()
+        return run
+
+    futures = {
+        name: loop.run_in_executor(executor, bind(guarded(name, fn)))
+        for name, fn in calls.items()
+    }
+    watcher = asyncio.create_task(watch_disconnect(request, token, list(futures.values())))
+
+    try:
+        results = await asyncio.gather(*futures.values(), return_exceptions=True)
+    finally:
+        watcher.cancel()
+
+    if token.cancelled:
+        REQUESTS_CANCELLED.inc(endpoint=endpoint)
+        for name, fut in futures.items():
+            if name not in started:
+                LLM_TASKS_CANCELLED.inc(endpoint=endpoint, state="queued")
+            elif fut.cancelled():
+                LLM_TASKS_CANCELLED.inc(endpoint=endpoint, state="in_flight")
+        raise AnalysisCancelled(token.reason or "cancelled")
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return dict(zip(futures.keys(), results))
+
@@ -0,0 +1,156 @@
+"""
+Answer cache for /chat.
+
+Entries are keyed by the model name, the workspace content digest and a
+normalized form of the question, so an answer is only reused while the
+uploaded files are byte-for-byte the same. Eviction is LRU with a TTL.
+An optional fuzzy tier matches questions whose token sets are similar
+enough (Jaccard), e.g. "What's missing in testing?" vs "what is missing
+in the testing phase".
+
+With a shared state backend, exact answers are also stored there, so an
+answer cached by one worker is a hit on the others (counted as shared_hit
+and copied into the local tier).
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+from metrics import CHAT_CACHE_ENTRIES, CHAT_CACHE_LOOKUPS
+from retrieval import tokenize
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a question"""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = text.replace("'", "")
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def question_terms(question: str) -> FrozenSet[str]:
+    """Content terms of a question for fuzzy matching (contractions split off)"""
+    return frozenset(t for t in tokenize(question.replace("'", " ")) if len(t) > 1)
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    created: float
+    scope: Tuple[str, str]  # (model, workspace digest)
+    terms: FrozenSet[str]
+
+
+class ChatAnswerCache:
+    """LRU + TTL cache of chat answers with an opt-in token-set fuzzy tier"""
+
+    SHARED_NAMESPACE = "chat_answer"
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 3600,
+                 fuzzy: bool = False, fuzzy_threshold: float = 0.85, shared=None):
+        self.max_entries = max_entries
+        self.shared = shared  # optional shared_state.StateBackend
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy = fuzzy
+        self.fuzzy_threshold = fuzzy_threshold
+        self._entries: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._by_scope: Dict[Tuple[str, str], Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(question: str, workspace_digest: str, model_name: str) -> str:
+        raw = "\0".join((model_name, workspace_digest, normalize_question(question)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, question: str, workspace_digest: str, model_name: str) -> Tuple[Optional[str], Optional[str]]:
+        """Return (answer, tier) where tier is "exact" / "fuzzy", or (None, None)"""
+        key = self.make_key(question, workspace_digest, model_name)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created > self.ttl_seconds:
+                self._drop_locked(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                CHAT_CACHE_LOOKUPS.inc(result="exact_hit")
+                return entry.answer, "exact"
+
+        if self.shared is not None:
+            stored = self.shared.get(self.SHARED_NAMESPACE, key)
+            if stored is not None and now - stored["created"] <= self.ttl_seconds:
+                self._store(key, question, (model_name, workspace_digest), stored["answer"], stored["created"])
+                CHAT_CACHE_LOOKUPS.inc(result="shared_hit")
+                return stored["answer"], "exact"
+
+        with self._lock:
+            if self.fuzzy:
+                match = self._fuzzy_locked(question, (model_name, workspace_digest), now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    CHAT_CACHE_LOOKUPS.inc(result="fuzzy_hit")
+                    return self._entries[match].answer, "fuzzy"
+
+        CHAT_CACHE_LOOKUPS.inc(result="miss")
+        return None, None
+
+    def put(self, question: str, workspace_digest: str, model_name: str, answer: str):
+        key = self.make_key(question, workspace_digest, model_name)
+        created = time.time()
+        self._store(key, question, (model_name, workspace_digest), answer, created)
+        if self.shared is not None:
+            self.shared.set(self.SHARED_NAMESPACE, key, {"answer": answer, "created": created}, ttl=self.ttl_seconds)
+
+    def _store(self, key: str, question: str, scope: Tuple[str, str], answer: str, created: float):
+        with self._lock:
+            self._drop_locked(key)
+            self._entries[key] = CachedAnswer(answer, created, scope, question_terms(question))
+            self._by_scope.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop_locked(next(iter(self._entries)))
+            CHAT_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_scope.clear()
+            CHAT_CACHE_ENTRIES.set(0)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop_locked(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_scope.get(entry.scope)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_scope[entry.scope]
+        CHAT_CACHE_ENTRIES.set(len(self._entries))
+
+    def _fuzzy_locked(self, question: str, scope: Tuple[str, str], now: float) -> Optional[str]:
+        terms = question_terms(question)
+        if not terms:
+            return None
+        best_key, best_score = None, self.fuzzy_threshold
+        for key in list(self._by_scope.get(scope, ())):
+            entry = self._entries[key]
+            if now - entry.created > self.ttl_seconds:
+                self._drop_locked(key)
+                continue
+            union = len(terms | entry.terms)
+            score = len(terms & entry.terms) / union if union else 0.0
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
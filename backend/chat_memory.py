@@ -0,0 +1,198 @@
+"""
+Bounded server-side memory for /chat sessions.
+
+Each session keeps the last few turns verbatim and folds anything older into
+a compact rolling summary. Folding happens after the answer has been sent,
+so it never adds latency to the turn that triggered it, and the memory block
+rendered into a prompt is always capped by a token budget.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Deque, List, Optional, Tuple
+
+from metrics import CHAT_SESSIONS, CHAT_SUMMARY_FOLDS
+from tokens import estimate_tokens, truncate_to_tokens
+
+SUMMARY_PROMPT = """
+You maintain the running summary of a technical conversation about a software project.
+Merge the new turns into the existing summary. Keep decisions, facts about the
+project, open questions and user preferences. Drop pleasantries and repetition.
+Answer with the updated summary only, at most {max_words} words.
+
+Existing summary:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+@dataclass
+class Turn:
+    question: str
+    answer: str
+
+    def render(self) -> str:
+        return f"User: {self.question}\nAssistant: {self.answer}"
+
+
+class ChatSession:
+    """Rolling summary + last `max_turns` turns verbatim"""
+
+    def __init__(self, session_id: str, max_turns: int, summary_max_tokens: int, workspace: str = ""):
+        self.session_id = session_id
+        self.workspace = workspace
+        self.max_turns = max_turns
+        self.summary_max_tokens = summary_max_tokens
+        self.summary = ""
+        self.turns: Deque[Turn] = deque()
+        self.pending: List[Turn] = []  # evicted from the window, not yet folded
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+        self._folding = False
+
+    def add_turn(self, question: str, answer: str):
+        with self._lock:
+            self.turns.append(Turn(question, answer))
+            while len(self.turns) > self.max_turns:
+                self.pending.append(self.turns.popleft())
+            self.last_used = time.time()
+
+    def has_history(self) -> bool:
+        with self._lock:
+            return bool(self.turns or self.pending or self.summary)
+
+    def needs_fold(self) -> bool:
+        with self._lock:
+            return bool(self.pending) and not self._folding
+
+    def fold(self, summarize: Optional[Callable[[str], str]] = None):
+        """
+        Merge pending turns into the summary. Uses the LLM summarizer when
+        given, and falls back to a cheap extractive summary if it fails.
+        """
+        with self._lock:
+            if not self.pending or self._folding:
+                return
+            self._folding = True
+            batch, summary = list(self.pending), self.summary
+
+        mode = "extractive"
+        new_summary = None
+        if summarize is not None:
+            try:
+                prompt = SUMMARY_PROMPT.format(
+                    max_words=max(20, self.summary_max_tokens * 3 // 4),
+                    summary=summary or "(empty)",
+                    turns="\n\n".join(t.render() for t in batch),
+                )
+                new_summary = (summarize(prompt) or "").strip() or None
+                mode = "llm"
+            except Exception:
+                new_summary = None
+        if new_summary is None:
+            mode = "extractive"
+            new_summary = _extractive_fold(summary, batch)
+
+        with self._lock:
+            self.summary = _keep_tail(new_summary, self.summary_max_tokens)
+            del self.pending[:len(batch)]
+            self._folding = False
+        CHAT_SUMMARY_FOLDS.inc(mode=mode)
+
+    def render_memory(self, max_tokens: int) -> Tuple[str, str]:
+        """
+        (summary, recent turns) fitting max_tokens. Oldest verbatim turns are
+        dropped first, then the summary is cut; turns evicted but not yet
+        folded are shown in condensed form so nothing disappears meanwhile.
+        """
+        with self._lock:
+            summary = self.summary
+            if self.pending:
+                summary = _extractive_fold(summary, self.pending)
+            turns = list(self.turns)
+
+        summary = _keep_tail(summary, min(self.summary_max_tokens, max_tokens))
+        remaining = max_tokens - estimate_tokens(summary)
+        rendered: List[str] = []
+        for turn in reversed(turns):
+            text = turn.render()
+            cost = estimate_tokens(text) + 1
+            if cost > remaining:
+                break
+            rendered.append(text)
+            remaining -= cost
+        return summary, "\n\n".join(reversed(rendered))
+
+
+def _first_sentence(text: str, limit: int = 200) -> str:
+    text = " ".join(text.split())
+    for stop in (". ", "? ", "! "):
+        idx = text.find(stop)
+        if 0 < idx < limit:
+            return text[:idx + 1]
+    return text[:limit]
+
+
+def _extractive_fold(summary: str, turns: List[Turn]) -> str:
+    lines = [summary] if summary else []
+    lines.extend(f"- Q: {_first_sentence(t.question)} A: {_first_sentence(t.answer)}" for t in turns)
+    return "\n".join(lines)
+
+
+def _keep_tail(text: str, max_tokens: int) -> str:
+    """Keep the most recent part of a summary within max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return truncate_to_tokens(text[::-1], max_tokens, marker="")[::-1]
+
+
+class ChatSessionStore:
+    """
+    In-memory session registry with LRU + idle TTL eviction. Sessions belong
+    to the workspace that created them and are only found from it; ids are
+    always minted here, so clients can't pick (or guess) them.
+    """
+
+    def __init__(self, max_sessions: int, ttl_seconds: int, max_turns: int, summary_max_tokens: int):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.summary_max_tokens = summary_max_tokens
+        self._sessions: "OrderedDict[Tuple[str, str], ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, session_id: Optional[str], workspace: str) -> ChatSession:
+        """The workspace's session with this id, or a new session with a fresh id"""
+        now = time.time()
+        with self._lock:
+            self._evict_expired_locked(now)
+            session = self._sessions.get((workspace, session_id)) if session_id else None
+            if session is None:
+                # an unknown id (expired, another workspace's, made up) is not reused
+                session = ChatSession(uuid.uuid4().hex, self.max_turns, self.summary_max_tokens, workspace)
+                self._sessions[(workspace, session.session_id)] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end((workspace, session_id))
+            session.last_used = now
+            CHAT_SESSIONS.set(len(self._sessions))
+            return session
+
+    def delete(self, session_id: str, workspace: str) -> bool:
+        with self._lock:
+            removed = self._sessions.pop((workspace, session_id), None) is not None
+            CHAT_SESSIONS.set(len(self._sessions))
+            return removed
+
+    def _evict_expired_locked(self, now: float):
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
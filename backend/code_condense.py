@@ -0,0 +1,265 @@
+"""
+Condensed views of source files that don't fit a phase's per-file limit.
+
+Cutting a long module at max_file_chars shows the model its first few
+hundred lines and nothing of the rest. A condenser instead turns the whole
+file into a skeleton - imports, signatures, decorators, docstrings and the
+key control flow of each body, without comments or blank lines - and then
+puts full function bodies back, in file order, while the result still fits.
+
+Condensers are registered per file extension (register()); Python is built
+in, on the standard-library ast. Results are cached by content hash and
+limit, so an unchanged file is parsed once however many phases and requests
+see it.
+"""
+
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from metrics import CONDENSE_CACHE_LOOKUPS
+
+CACHE_MAX_ENTRIES = 512
+# Longest expression kept verbatim in a skeleton line
+MAX_EXPR_CHARS = 100
+# Nesting depth of control flow kept inside a condensed body
+MAX_FLOW_DEPTH = 2
+
+INDENT = "    "
+
+# extension (lower case, with the dot) -> condenser(source, max_chars) -> condensed source
+CONDENSERS: Dict[str, Callable[[str, int], str]] = {}
+
+_cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def register(extensions, condenser: Callable[[str, int], str]):
+    """
+    Add a condenser for the given extensions. It gets the file's source and
+    the character limit, returns the condensed source (ideally within the
+    limit) and raises ValueError / SyntaxError if it can't parse the file.
+    """
+    for extension in extensions:
+        CONDENSERS[extension.lower()] = condenser
+
+
+def supports(filename: str) -> bool:
+    return os.path.splitext(filename)[1].lower() in CONDENSERS
+
+
+def condense(filename: str, source: str, max_chars: int) -> Optional[str]:
+    """Condensed source within roughly max_chars, or None if the file can't be condensed"""
+    condenser = CONDENSERS.get(os.path.splitext(filename)[1].lower())
+    if condenser is None:
+        return None
+    key = (hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest(), max_chars)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        CONDENSE_CACHE_LOOKUPS.inc(result="hit")
+        return cached or None
+    CONDENSE_CACHE_LOOKUPS.inc(result="miss")
+    try:
+        condensed = condenser(source, max_chars)
+    except (SyntaxError, ValueError, RecursionError):
+        condensed = ""  # cached too, so a broken file isn't re-parsed either
+    with _cache_lock:
+        _cache[key] = condensed
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return condensed or None
+
+
+# ---------------------------
+# Python
+# ---------------------------
+def _short(node: ast.AST) -> str:
+    text = ast.unparse(node).replace("\n", " ")
+    return text if len(text) <= MAX_EXPR_CHARS else text[:MAX_EXPR_CHARS] + "..."
+
+
+def _docstring(body: List[ast.stmt], depth: int, full: bool) -> List[str]:
+    doc = ast.get_docstring(ast.Module(body=body, type_ignores=[])) if body else None
+    if not doc:
+        return []
+    pad = INDENT * depth
+    lines = doc.splitlines() if full else doc.strip().splitlines()[:1]
+    if len(lines) == 1:
+        return [f'{pad}"""{lines[0]}"""']
+    return [f'{pad}"""'] + [pad + line if line else "" for line in lines] + [f'{pad}"""']
+
+
+def _def_header(node, depth: int) -> List[str]:
+    pad = INDENT * depth
+    lines = [f"{pad}@{_short(d)}" for d in node.decorator_list]
+    if isinstance(node, ast.ClassDef):
+        bases = [ast.unparse(b) for b in node.bases] + [ast.unparse(k) for k in node.keywords]
+        lines.append(f"{pad}class {node.name}" + (f"({', '.join(bases)})" if bases else "") + ":")
+    else:
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+        lines.append(f"{pad}{prefix} {node.name}({ast.unparse(node.args)}){returns}:")
+    return lines
+
+
+# Skeleton detail levels, tried from the most detailed down until one fits
+FLOW, DOCSTRINGS, SIGNATURES = 2, 1, 0
+DETAIL_NOTES = {
+    FLOW: "signatures, docstrings and control flow",
+    DOCSTRINGS: "signatures and docstring summaries",
+    SIGNATURES: "signatures",
+}
+
+
+def _source_lines(lines: List[str], node, depth: int) -> List[str]:
+    """The node's original source without comment-only and blank lines, re-indented to depth"""
+    start = min([d.lineno for d in getattr(node, "decorator_list", [])] + [node.lineno]) - 1
+    out = []
+    for line in lines[start:node.end_lineno]:
+        stripped = line.strip()
+        if stripped and not stripped.startswith("#"):
+            indent = line[:node.col_offset]
+            out.append(INDENT * depth + (line[node.col_offset:] if not indent.strip() else line.lstrip()))
+    return out
+
+
+class _PythonSkeleton:
+    """Renders statements with the bodies of all functions not in `expanded` outlined"""
+
+    def __init__(self, source_lines: List[str], body: List[ast.stmt], expanded: Set[ast.AST],
+                 detail: int = FLOW, depth: int = 0):
+        self.source_lines = source_lines
+        self.expanded = expanded
+        self.detail = detail
+        self.lines: List[str] = []
+        self._block(body, depth, top_level=depth == 0)
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+    def _docstring(self, body: List[ast.stmt], depth: int) -> bool:
+        """Append the body's docstring (per detail level); whether it has one"""
+        has_doc = bool(body) and ast.get_docstring(ast.Module(body=body, type_ignores=[])) is not None
+        if has_doc and self.detail > SIGNATURES:
+            self.lines += _docstring(body, depth, full=self.detail == FLOW)
+        return has_doc
+
+    def _block(self, body: List[ast.stmt], depth: int, top_level: bool = False):
+        has_doc = self._docstring(body, depth)
+        for node in body[1:] if has_doc else body:
+            self._statement(node, depth, top_level)
+
+    def _statement(self, node: ast.stmt, depth: int, top_level: bool):
+        pad = INDENT * depth
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            self.lines.append(pad + ast.unparse(node))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node in self.expanded:
+                self.lines += _source_lines(self.source_lines, node, depth)
+            else:
+                self.lines += _def_header(node, depth)
+                before = len(self.lines)
+                has_doc = self._docstring(node.body, depth + 1)
+                if self.detail == FLOW:
+                    self._flow(node.body[1:] if has_doc else node.body, depth + 1, 1)
+                if len(self.lines) == before:
+                    self.lines.append(INDENT * (depth + 1) + "...")
+        elif isinstance(node, ast.ClassDef):
+            self.lines += _def_header(node, depth)
+            before = len(self.lines)
+            self._block(node.body, depth + 1)
+            if len(self.lines) == before:
+                self.lines.append(INDENT * (depth + 1) + "...")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)) and self.detail > SIGNATURES:
+            self.lines.append(pad + _short(node))
+        elif top_level and isinstance(node, (ast.If, ast.Try)) and self.detail == FLOW:
+            # e.g. `if __name__ == "__main__":` or optional-import guards
+            self._flow([node], depth, 1)
+
+    def _flow(self, body: List[ast.stmt], depth: int, level: int):
+        """Control-flow outline of a body: branches, loops, handlers, returns and raises"""
+        pad = INDENT * depth
+        for node in body:
+            if isinstance(node, (ast.Return, ast.Raise)):
+                self.lines.append(pad + _short(node))
+            elif isinstance(node, ast.Expr) and isinstance(node.value, (ast.Yield, ast.YieldFrom, ast.Await)):
+                self.lines.append(pad + _short(node))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.lines += _def_header(node, depth) + [pad + INDENT + "..."]
+            elif isinstance(node, ast.If):
+                self._branch(f"if {_short(node.test)}:", node.body, depth, level)
+                orelse = node.orelse
+                while len(orelse) == 1 and isinstance(orelse[0], ast.If):
+                    self._branch(f"elif {_short(orelse[0].test)}:", orelse[0].body, depth, level)
+                    orelse = orelse[0].orelse
+                if orelse:
+                    self._branch("else:", orelse, depth, level)
+            elif isinstance(node, (ast.For, ast.AsyncFor)):
+                prefix = "async for" if isinstance(node, ast.AsyncFor) else "for"
+                self._branch(f"{prefix} {_short(node.target)} in {_short(node.iter)}:", node.body, depth, level)
+            elif isinstance(node, ast.While):
+                self._branch(f"while {_short(node.test)}:", node.body, depth, level)
+            elif isinstance(node, (ast.With, ast.AsyncWith)):
+                prefix = "async with" if isinstance(node, ast.AsyncWith) else "with"
+                self._branch(f"{prefix} {', '.join(_short(i) for i in node.items)}:", node.body, depth, level)
+            elif isinstance(node, ast.Try):
+                self._branch("try:", node.body, depth, level)
+                for handler in node.handlers:
+                    header = "except" + (f" {_short(handler.type)}" if handler.type else "")
+                    header += f" as {handler.name}:" if handler.name else ":"
+                    self._branch(header, handler.body, depth, level)
+                if node.finalbody:
+                    self._branch("finally:", node.finalbody, depth, level)
+
+    def _branch(self, header: str, body: List[ast.stmt], depth: int, level: int):
+        self.lines.append(INDENT * depth + header)
+        before = len(self.lines)
+        if level < MAX_FLOW_DEPTH:
+            self._flow(body, depth + 1, level + 1)
+        if len(self.lines) == before:
+            self.lines.append(INDENT * (depth + 1) + "...")
+
+
+def _functions(tree: ast.Module) -> List[Tuple[ast.AST, int]]:
+    """(node, depth) of module-level functions and methods of module-level classes, in file order"""
+    found = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            found.append((node, 0))
+        elif isinstance(node, ast.ClassDef):
+            found += [(n, 1) for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    return found
+
+
+def condense_python(source: str, max_chars: int) -> str:
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    functions = _functions(tree)
+    expanded: Set[ast.AST] = set()
+    for detail in (FLOW, DOCSTRINGS, SIGNATURES):
+        size = len(_PythonSkeleton(lines, tree.body, expanded, detail).text()) + len(_note(len(functions), 0, detail))
+        if size <= max_chars:
+            break
+    # Put full bodies back in file order while they fit. Rendering is line by
+    # line, so a body's cost is its full text minus its outline, each rendered alone.
+    for function, depth in functions:
+        cost = (len(_PythonSkeleton(lines, [function], {function}, detail, depth).text())
+                - len(_PythonSkeleton(lines, [function], set(), detail, depth).text()))
+        if size + cost <= max_chars:
+            expanded.add(function)
+            size += cost
+    return _note(len(functions), len(expanded), detail) + _PythonSkeleton(lines, tree.body, expanded, detail).text()
+
+
+def _note(functions: int, expanded: int, detail: int) -> str:
+    return (f"# [condensed: comments and blank lines removed; {functions - expanded} of "
+            f"{functions} function bodies reduced to {DETAIL_NOTES[detail]}]\n")
+
+
+register((".py", ".pyw"), condense_python)
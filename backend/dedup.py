@@ -0,0 +1,188 @@
+"""
+Duplicate and near-duplicate uploads, found before prompts are built.
+
+Projects often carry copies of the same file - "model_training (1).ipynb"
+next to its original, vendored or generated files - and every copy used
+to be sent in full to every phase. find_duplicates() groups files that are
+exact duplicates (same content hash) or near-duplicates (estimated Jaccard
+similarity of their word 5-shingles at or above SIMILARITY, via MinHash
+signatures and LSH banding, so the cost stays linear in the number of
+files). One representative per group keeps its content; annotate()
+replaces the others with a one-line "duplicate of X" note. Groups are
+found transitively, but a file is only replaced if it is itself similar
+enough to the representative, so a chain of small edits keeps its far end.
+
+The representative is the file that doesn't look like a copy ("(1)",
+"copy", ".bak", ...), then the longest one, then the first by name.
+
+numpy is imported on first use.
+"""
+
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List
+
+from metrics import DEDUP_CHARS_SAVED, DEDUP_FILES
+
+MODES = ("near", "exact", "off")
+MODE = "near"
+# Estimated Jaccard similarity at which two files count as near-duplicates
+SIMILARITY = 0.9
+# Files shorter than this are left alone (the note would save next to nothing)
+MIN_CHARS = 200
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+BANDS = 16  # LSH: 16 bands of 4 rows, candidates from ~0.5 similarity, then checked exactly
+_PRIME = 4294967291  # 2**32 - 5: (a * x + b) stays below 2**64 for 32-bit shingle hashes
+_HASH_BLOCK = 16384
+
+_WORD = re.compile(r"\S+")
+_COPY_NAME = re.compile(r"\(\d+\)|_\d+_|copy|backup|\.bak|\.orig|\.old|~$", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Duplicate:
+    of: str             # the representative kept in the prompt
+    similarity: float   # 1.0 for an exact duplicate
+
+    @property
+    def exact(self) -> bool:
+        return self.similarity >= 1.0
+
+    def note(self) -> str:
+        if self.exact:
+            return f"[Exact duplicate of {self.of}: content omitted]"
+        return f"[Near-duplicate of {self.of} (~{self.similarity:.0%} similar): content omitted]"
+
+
+def configure(mode: str = MODE, similarity: float = SIMILARITY):
+    global MODE, SIMILARITY
+    if mode not in MODES:
+        raise ValueError(f"Unknown dedup mode {mode!r} (expected {', '.join(MODES)})")
+    MODE = mode
+    SIMILARITY = similarity
+
+
+def settings() -> Dict:
+    return {"mode": MODE, "similarity": SIMILARITY}
+
+
+def _permutations():
+    import numpy as np
+
+    rng = np.random.default_rng(0x5D1C)  # fixed: signatures must be comparable across calls
+    a = rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def signature(text: str):
+    """MinHash signature (NUM_PERM uint64 values) of the text's word shingles"""
+    import numpy as np
+
+    words = _WORD.findall(text)
+    count = max(1, len(words) - SHINGLE_WORDS + 1)
+    hashes = np.unique(np.fromiter(
+        (zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8", "surrogatepass")) for i in range(count)),
+        dtype=np.uint64, count=count,
+    ))
+    a, b = _permutations()
+    sig = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(hashes), _HASH_BLOCK):  # bounded memory on huge files
+        block = hashes[start:start + _HASH_BLOCK]
+        sig = np.minimum(sig, ((a * block + b) % _PRIME).min(axis=1))
+    return sig
+
+
+def _similarity(sig_a, sig_b) -> float:
+    return float((sig_a == sig_b).mean())
+
+
+def _looks_like_copy(name: str) -> bool:
+    return bool(_COPY_NAME.search(name))
+
+
+def find_duplicates(file_contents: Dict[str, str]) -> Dict[str, Duplicate]:
+    """File name -> Duplicate for every file whose content is covered by another file"""
+    if MODE == "off":
+        return {}
+    candidates = {name: c for name, c in file_contents.items() if isinstance(c, str) and len(c) >= MIN_CHARS}
+
+    # exact duplicates: one entry per distinct content
+    by_hash: Dict[str, List[str]] = {}
+    for name, content in candidates.items():
+        by_hash.setdefault(hashlib.sha256(content.encode("utf-8", "surrogatepass")).hexdigest(), []).append(name)
+    groups = list(by_hash.values())
+
+    signatures = {}
+    if MODE == "near" and len(groups) > 1:
+        # near-duplicates between distinct contents: LSH buckets, then the signature similarity
+        parent = list(range(len(groups)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, group in enumerate(groups):
+            signatures[i] = signature(candidates[group[0]])
+        rows = NUM_PERM // BANDS
+        checked = set()
+        for band in range(BANDS):
+            buckets: Dict[bytes, List[int]] = {}
+            for i, sig in signatures.items():
+                buckets.setdefault(sig[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+            for members in buckets.values():
+                for x, i in enumerate(members):
+                    for j in members[x + 1:]:
+                        if (i, j) not in checked:
+                            checked.add((i, j))
+                            if _similarity(signatures[i], signatures[j]) >= SIMILARITY:
+                                parent[find(j)] = find(i)
+        merged: Dict[int, List[int]] = {}
+        for i in range(len(groups)):
+            merged.setdefault(find(i), []).append(i)
+        clusters = [[(name, i) for i in members for name in groups[i]] for members in merged.values()]
+    else:
+        clusters = [[(name, i) for name in group] for i, group in enumerate(groups)]
+
+    duplicates: Dict[str, Duplicate] = {}
+    for cluster in clusters:
+        # near-duplicates chain transitively (a~b, b~c), but a member only becomes a note if it is
+        # itself similar enough to the kept file; the rest pick their own representative
+        while len(cluster) > 1:
+            keep, keep_group = min(cluster, key=lambda m: (_looks_like_copy(m[0]), -len(candidates[m[0]]), m[0]))
+            rest = []
+            for name, group in cluster:
+                if name == keep:
+                    continue
+                if group == keep_group:
+                    duplicates[name] = Duplicate(keep, 1.0)
+                    continue
+                similarity = _similarity(signatures[group], signatures[keep_group])
+                if similarity >= SIMILARITY:
+                    duplicates[name] = Duplicate(keep, min(similarity, 0.99))
+                else:
+                    rest.append((name, group))
+            cluster = rest
+    return duplicates
+
+
+def annotate(file_contents: Dict[str, str], duplicates: Dict[str, Duplicate]) -> Dict[str, str]:
+    """file_contents with every duplicate's content replaced by its note"""
+    if not duplicates:
+        return file_contents
+    annotated = {}
+    for name, content in file_contents.items():
+        duplicate = duplicates.get(name)
+        if duplicate is None:
+            annotated[name] = content
+            continue
+        annotated[name] = duplicate.note()
+        DEDUP_FILES.inc(kind="exact" if duplicate.exact else "near")
+        DEDUP_CHARS_SAVED.inc(max(0, len(content) - len(annotated[name])))
+    return annotated
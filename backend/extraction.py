@@ -0,0 +1,205 @@
+"""
+Format-aware extraction of uploaded files before they reach a prompt.
+
+Some uploads are mostly machine noise when read as plain text. A Jupyter
+notebook is JSON: cell metadata, base64 plot images, widget state and
+execution output, with the actual code a small fraction of it; a data
+file is rows the model learns little from. Extractors turn such files into
+the text the model should see; files without an extractor (or that fail to
+parse) are passed through unchanged.
+
+- extract(filename, text): the prompt text of one uploaded text file
+- extract_path(path): the prompt text of a file profiled from disk
+  (tables, possibly binary or larger than memory), or None to read it as usual
+- load_text(path): both of the above, as a text_loader for the retrieval index
+- settings(): the options that change extraction output, for cache keys
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+import tabular_profile
+from metrics import EXTRACTION_CHARS
+from workspace import read_text
+
+# Characters of text output kept per notebook cell (0 = drop outputs)
+NOTEBOOK_OUTPUT_CHARS = 1000
+# Tables: rows profiled (longer files are profiled from their first rows) and example rows shown
+TABLE_MAX_ROWS = 1_000_000
+TABLE_SAMPLE_ROWS = 5
+
+_DATA_URI = re.compile(r"\(data:[^;)]+;base64,[A-Za-z0-9+/=\s]+\)")
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
+
+
+def configure(notebook_output_chars: int = NOTEBOOK_OUTPUT_CHARS, table_max_rows: int = TABLE_MAX_ROWS,
+              table_sample_rows: int = TABLE_SAMPLE_ROWS):
+    global NOTEBOOK_OUTPUT_CHARS, TABLE_MAX_ROWS, TABLE_SAMPLE_ROWS
+    NOTEBOOK_OUTPUT_CHARS = max(0, notebook_output_chars)
+    TABLE_MAX_ROWS = max(1, table_max_rows)
+    TABLE_SAMPLE_ROWS = max(0, table_sample_rows)
+
+
+def settings() -> Dict:
+    return {
+        "notebook_output_chars": NOTEBOOK_OUTPUT_CHARS,
+        "table_max_rows": TABLE_MAX_ROWS,
+        "table_sample_rows": TABLE_SAMPLE_ROWS,
+    }
+
+
+def _joined(value) -> str:
+    """nbformat stores multi-line strings either as one string or a list of lines"""
+    return "".join(value) if isinstance(value, list) else (value or "")
+
+
+def _truncated(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + f"\n...[{len(text) - max_chars} more chars of output]"
+
+
+def _output_text(output: Dict) -> Optional[str]:
+    """Text of one cell output, or None for outputs with no text form (images, widgets)"""
+    kind = output.get("output_type")
+    if kind == "stream":
+        return _joined(output.get("text"))
+    if kind == "error":
+        return f"{output.get('ename', 'Error')}: {output.get('evalue', '')}"
+    if kind in ("execute_result", "display_data"):
+        data = output.get("data") or {}
+        if "text/plain" in data:
+            return _joined(data["text/plain"])
+    return None
+
+
+def _cell_outputs(outputs: List[Dict], max_chars: int) -> str:
+    texts, dropped = [], 0
+    for output in outputs:
+        text = _output_text(output)
+        if text is None:
+            dropped += 1
+        elif text.strip():
+            texts.append(_ANSI_ESCAPE.sub("", text).rstrip("\n"))
+    out = _truncated("\n".join(texts), max_chars) if texts else ""
+    if dropped:
+        out += ("\n" if out else "") + f"[{dropped} non-text output(s) omitted]"
+    return out
+
+
+def extract_notebook(text: str) -> str:
+    """
+    Cell sources in order, each under a "# [<type> cell N]" header, followed
+    by its text outputs truncated to NOTEBOOK_OUTPUT_CHARS. Images, HTML,
+    widget state, attachments and all metadata are dropped.
+    """
+    notebook = json.loads(text)
+    cells = notebook["cells"]
+    metadata = notebook.get("metadata") or {}
+    language = (
+        (metadata.get("kernelspec") or {}).get("language")
+        or (metadata.get("language_info") or {}).get("name")
+        or "unknown"
+    )
+    parts = [f"# Jupyter notebook ({language}, {len(cells)} cells; outputs and images stripped)"]
+    for index, cell in enumerate(cells, 1):
+        cell_type = cell.get("cell_type", "code")
+        source = _DATA_URI.sub("(embedded image)", _joined(cell.get("source"))).strip("\n")
+        parts.append(f"# [{cell_type} cell {index}]\n{source}")
+        if NOTEBOOK_OUTPUT_CHARS and cell.get("outputs"):
+            outputs = _cell_outputs(cell["outputs"], NOTEBOOK_OUTPUT_CHARS)
+            if outputs:
+                parts.append(f"# [output {index}]\n{outputs}")
+    return "\n\n".join(parts) + "\n"
+
+
+def extract_csv(path: str) -> str:
+    return tabular_profile.profile_csv(path, max_rows=TABLE_MAX_ROWS, sample_rows=TABLE_SAMPLE_ROWS)
+
+
+def extract_tsv(path: str) -> str:
+    return tabular_profile.profile_csv(path, sep="\t", max_rows=TABLE_MAX_ROWS, sample_rows=TABLE_SAMPLE_ROWS)
+
+
+def extract_parquet(path: str) -> str:
+    return tabular_profile.profile_parquet(path, max_rows=TABLE_MAX_ROWS, sample_rows=TABLE_SAMPLE_ROWS)
+
+
+# extension (lower case, with the dot) -> extractor over the file's text
+EXTRACTORS: Dict[str, Callable[[str], str]] = {
+    ".ipynb": extract_notebook,
+}
+
+# extension -> extractor reading the file itself, in bounded memory
+PATH_EXTRACTORS: Dict[str, Callable[[str], str]] = {
+    ".csv": extract_csv,
+    ".tsv": extract_tsv,
+    ".parquet": extract_parquet,
+}
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def extractor_name(filename: str) -> Optional[str]:
+    extractor = EXTRACTORS.get(_extension(filename)) or PATH_EXTRACTORS.get(_extension(filename))
+    return extractor.__name__.replace("extract_", "") if extractor else None
+
+
+def reads_path(filename: str) -> bool:
+    """Whether the file is extracted from disk (extract_path) rather than from its text"""
+    return _extension(filename) in PATH_EXTRACTORS
+
+
+def extract(filename: str, text: str) -> str:
+    """The text of an uploaded file as it should appear in a prompt"""
+    extractor = EXTRACTORS.get(_extension(filename))
+    if extractor is None:
+        return text
+    name = extractor_name(filename)
+    try:
+        extracted = extractor(text)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # not what the extension promised (e.g. a truncated notebook): keep it as text
+        EXTRACTION_CHARS.inc(len(text), extractor=name, stage="failed")
+        return text
+    EXTRACTION_CHARS.inc(len(text), extractor=name, stage="raw")
+    EXTRACTION_CHARS.inc(len(extracted), extractor=name, stage="extracted")
+    return extracted
+
+
+def extract_path(path: str) -> Optional[str]:
+    """
+    Profile of a file with a path extractor, or None when it has none, fails
+    (e.g. a malformed table or pyarrow missing for Parquet) or the raw file
+    is smaller than its profile; the caller then reads the file as usual.
+    """
+    extractor = PATH_EXTRACTORS.get(_extension(path))
+    if extractor is None:
+        return None
+    name = extractor_name(path)
+    size = os.path.getsize(path)
+    try:
+        extracted = extractor(path)
+    except Exception:
+        # pandas / pyarrow raise a variety of parser and import errors
+        EXTRACTION_CHARS.inc(size, extractor=name, stage="failed")
+        return None
+    if size <= len(extracted):
+        EXTRACTION_CHARS.inc(size, extractor=name, stage="kept")
+        return None
+    EXTRACTION_CHARS.inc(size, extractor=name, stage="raw")
+    EXTRACTION_CHARS.inc(len(extracted), extractor=name, stage="extracted")
+    return extracted
+
+
+def load_text(path: str) -> Optional[str]:
+    if reads_path(path):
+        extracted = extract_path(path)
+        if extracted is not None:
+            return extracted
+    text = read_text(path)
+    return extract(os.path.basename(path), text) if text is not None else None
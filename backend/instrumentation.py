@@ -0,0 +1,195 @@
+"""
+Request, model-call and event-loop instrumentation feeding metrics.py.
+
+Everything here is a couple of perf_counter() calls and dictionary updates
+per event, so it stays on in production:
+- RequestMetricsMiddleware: plain ASGI middleware (no per-request task or
+  body buffering) timing each request until its last body chunk, labelled
+  by route template so path parameters don't explode cardinality
+- InstrumentedModel: wraps the model handed to an analyzer or chat call and
+  records latency, errors and prompt/completion sizes per phase
+- timed_phase: end-to-end analyzer time and the status it reported
+- EventLoopLagMonitor: a periodic probe measuring how late the loop runs it
+
+InstrumentedModel and timed_phase also open trace spans (llm.generate and
+phase.<name>); the time before and after the model call inside an analyzer
+is recorded as prompt.build and parse spans.
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, Optional
+
+from cancellation import AnalysisCancelled
+from metrics import (
+    EVENT_LOOP_LAG_LAST,
+    EVENT_LOOP_LAG_SECONDS,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_INFLIGHT,
+    LLM_CALL_ERRORS,
+    LLM_CALL_SECONDS,
+    LLM_COMPLETION_TOKENS,
+    LLM_PROMPT_CHARS,
+    LLM_PROMPT_TOKENS,
+    PHASE_RESULTS,
+    PHASE_SECONDS,
+)
+from streaming import usage_counts
+from tracing import derive_gap_spans, tracer_span
+from usage import UsageMeter
+
+
+class RequestMetricsMiddleware:
+    """Per-route latency histogram for every HTTP request"""
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_INFLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_INFLIGHT.dec()
+            # the router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=f"{status[0] // 100}xx",
+            )
+
+
+def record_prompt(phase: str, prompt) -> None:
+    if isinstance(prompt, str):
+        LLM_PROMPT_CHARS.observe(len(prompt), phase=phase)
+
+
+def record_usage(phase: str, usage, prompt: str, completion: str) -> Dict:
+    counts = usage_counts(usage, prompt, completion)
+    LLM_PROMPT_TOKENS.observe(counts["prompt_tokens"], phase=phase)
+    LLM_COMPLETION_TOKENS.observe(counts["completion_tokens"], phase=phase)
+    return counts
+
+
+def record_failure(phase: str, seconds: float, error: BaseException) -> None:
+    if isinstance(error, AnalysisCancelled):
+        LLM_CALL_SECONDS.observe(seconds, phase=phase, outcome="cancelled")
+        return
+    LLM_CALL_SECONDS.observe(seconds, phase=phase, outcome="error")
+    LLM_CALL_ERRORS.inc(phase=phase, error=type(error).__name__)
+
+
+def _response_text(response) -> str:
+    try:
+        return response.text or ""
+    except Exception:
+        return ""
+
+
+class InstrumentedModel:
+    """
+    Model wrapper recording per-phase call metrics. Put it outermost (around
+    CancellableModel) so the timed call covers the whole generation. Streamed
+    calls only record the prompt size; stream_generation times those itself.
+    With a meter, each call is checked against the request's token budget
+    first and its token usage is added to the meter afterwards.
+    """
+
+    def __init__(self, model, phase: str, meter: Optional[UsageMeter] = None):
+        self._model = model
+        self.phase = phase
+        self.meter = meter
+
+    def generate_content(self, prompt, **kwargs):
+        if self.meter is not None and isinstance(prompt, str):
+            self.meter.check(prompt)
+        record_prompt(self.phase, prompt)
+        if kwargs.get("stream"):
+            return self._model.generate_content(prompt, **kwargs)
+
+        started = time.perf_counter()
+        with tracer_span("llm.generate", {"phase": self.phase}) as span:
+            try:
+                response = self._model.generate_content(prompt, **kwargs)
+            except BaseException as e:
+                record_failure(self.phase, time.perf_counter() - started, e)
+                raise
+            LLM_CALL_SECONDS.observe(time.perf_counter() - started, phase=self.phase, outcome="ok")
+            if isinstance(prompt, str):
+                span.set_attribute("prompt.chars", len(prompt))
+                counts = record_usage(self.phase, getattr(response, "usage_metadata", None), prompt, _response_text(response))
+                span.set_attribute("tokens.prompt", counts["prompt_tokens"])
+                span.set_attribute("tokens.completion", counts["completion_tokens"])
+                if self.meter is not None:
+                    self.meter.record(self.phase, counts)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+def timed_phase(phase: str, fn: Callable[[], object]) -> Callable[[], object]:
+    """Wrap an analyzer call to record its total time and reported status"""
+    def run():
+        started = time.perf_counter()
+        status = "error"
+        with tracer_span(f"phase.{phase}", {"phase": phase}) as span:
+            try:
+                result = fn()
+                if isinstance(result, dict):
+                    status = str(result.get("status", "completed"))
+                return result
+            except AnalysisCancelled:
+                status = "cancelled"
+                raise
+            finally:
+                PHASE_SECONDS.observe(time.perf_counter() - started, phase=phase)
+                PHASE_RESULTS.inc(phase=phase, status=status)
+                span.set_attribute("phase.status", status)
+                derive_gap_spans(span, "llm.generate", "prompt.build", "parse")
+    return run
+
+
+class EventLoopLagMonitor:
+    """Sleeps `interval` seconds in a loop and records how late each wake-up is"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="event-loop-lag")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - due)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
@@ -0,0 +1,114 @@
+"""
+Lazily created Gemini client.
+
+Importing google.generativeai and building the GenerativeModel is the most
+expensive part of importing app.py, and used to fail the whole import when
+GOOGLE_API_KEY was missing. LazyModel defers both to the first model call
+(or an explicit warm()), so the process starts fast, health checks answer
+without credentials, and forked workers don't pay for a client they may
+never use. It stands in for the model everywhere: generate_content() and
+any other attribute are forwarded to the real client once it exists.
+
+A failed initialization is not final: the error is reported (and calls
+fail fast) for a backoff period that doubles with each consecutive
+failure, after which the next call tries again.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from metrics import COMPONENT_INIT_SECONDS
+
+
+class ModelUnavailable(RuntimeError):
+    """The model client cannot be created (missing key or failed init)"""
+
+
+class LazyModel:
+    def __init__(self, model_name: str, generation_config: Optional[Dict] = None,
+                 api_key_env: str = "GOOGLE_API_KEY", retry_seconds: float = 5.0,
+                 max_retry_seconds: float = 300.0):
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or {})
+        self.api_key_env = api_key_env
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._model = None
+        self._error: Optional[str] = None
+        self._failures = 0
+        self._retry_at = 0.0  # monotonic time after which a failed init is retried
+        self._init_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._model is not None
+
+    def unavailable_reason(self) -> Optional[str]:
+        """Why the client can't be used, without initializing it (None if usable)"""
+        if self._model is not None:
+            return None
+        if not os.environ.get(self.api_key_env):
+            return f"{self.api_key_env} missing in .env"
+        if self._error is not None and time.monotonic() < self._retry_at:
+            return self._error
+        return None  # not tried yet, or due for another attempt
+
+    def get(self):
+        """The real GenerativeModel, created on first use"""
+        model = self._model
+        if model is not None:
+            return model
+        with self._lock:
+            if self._model is None:
+                reason = self.unavailable_reason()
+                if reason is not None:
+                    raise ModelUnavailable(reason)
+                self._model = self._create()
+            return self._model
+
+    def _create(self):
+        api_key = os.environ.get(self.api_key_env)
+        if not api_key:
+            raise ModelUnavailable(f"{self.api_key_env} missing in .env")
+        started = time.perf_counter()
+        try:
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config=self.generation_config
+            )
+        except Exception as e:
+            self._failures += 1
+            backoff = min(self.max_retry_seconds, self.retry_seconds * 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + backoff
+            self._error = f"Model client initialization failed: {e} (retried after {backoff:g}s)"
+            raise ModelUnavailable(self._error) from e
+        self._error = None
+        self._failures = 0
+        self._init_seconds = time.perf_counter() - started
+        COMPONENT_INIT_SECONDS.set(self._init_seconds, component="model")
+        return model
+
+    def warm(self):
+        self.get()
+
+    def status(self) -> Dict:
+        reason = self.unavailable_reason()
+        return {
+            "state": "ready" if self.initialized else ("unavailable" if reason else "not_initialized"),
+            "model": self.model_name,
+            "detail": reason,
+            "init_seconds": self._init_seconds,
+        }
+
+    def generate_content(self, *args, **kwargs):
+        return self.get().generate_content(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # only reached for attributes not set in __init__
+        return getattr(self.get(), name)
@@ -0,0 +1,161 @@
+"""
+Measure import and startup time of the backend.
+
+Each run starts a fresh interpreter, so nothing is shared between runs:
+1. `python -X importtime -c "import app"`: total import time and the
+   most expensive modules (cumulative microseconds, as reported by -X importtime)
+2. `uvicorn app:app`: wall time from process start until /healthz answers,
+   and until /readyz answers 200
+3. optionally (--warmup, needs ADMIN_TOKEN and a GOOGLE_API_KEY): the time
+   taken by POST /admin/warmup
+
+Usage (from backend/):
+    python measure_startup.py                 # 5 runs
+    python measure_startup.py --runs 10 --no-key --top 15
+    python measure_startup.py --probe /metrics    # trees without /healthz
+    ADMIN_TOKEN=x python measure_startup.py --warmup
+
+--no-key starts the children with an empty GOOGLE_API_KEY (load_dotenv()
+does not override it) to show startup without credentials; /readyz is then
+expected to answer 503 and is not timed.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def child_env(no_key: bool) -> dict:
+    env = dict(os.environ)
+    if no_key:
+        env["GOOGLE_API_KEY"] = ""
+    return env
+
+
+def import_times(env: dict, top: int):
+    """(total seconds, [(module, cumulative seconds)]) for `import app`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import app failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(cumulative_us) / 1e6))
+    total = next((cum for name, cum in rows if name == "app"), 0.0)
+    return total, sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float, want_status: int = 200) -> float:
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == want_status:
+                    return time.monotonic()
+        except urllib.error.HTTPError as e:
+            if e.code == want_status:
+                return time.monotonic()
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def serve_times(env: dict, warmup: bool, probe: str, timeout: float = 60.0):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--app-dir", BACKEND_DIR, "app:app",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        deadline = started + timeout
+        healthy = wait_for(base + probe, deadline) - started
+        ready = None
+        if probe == "/healthz" and env.get("GOOGLE_API_KEY") != "":
+            ready = wait_for(base + "/readyz", deadline) - started
+        warm = None
+        if warmup:
+            req = urllib.request.Request(base + "/admin/warmup", method="POST",
+                                         headers={"X-Admin-Token": env.get("ADMIN_TOKEN", "")})
+            t = time.monotonic()
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                json.load(resp)
+            warm = time.monotonic() - t
+        return healthy, ready, warm
+    except TimeoutError as e:
+        proc.terminate()
+        _out, err = proc.communicate(timeout=10)
+        raise SystemExit(f"server never answered {e}:\n{err.decode(errors='replace')[-2000:]}")
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            proc.wait(10)
+
+
+def describe(label: str, values):
+    values = [v for v in values if v is not None]
+    if not values:
+        print(f"  {label:<28} n/a")
+        return
+    print(f"  {label:<28} median {statistics.median(values) * 1000:8.1f} ms"
+          f"   min {min(values) * 1000:8.1f}   max {max(values) * 1000:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--no-key", action="store_true", help="start without GOOGLE_API_KEY")
+    parser.add_argument("--warmup", action="store_true", help="also time POST /admin/warmup")
+    parser.add_argument("--probe", default="/healthz",
+                        help="path polled for the first response (e.g. /metrics on trees without /healthz)")
+    args = parser.parse_args()
+
+    env = child_env(args.no_key)
+    print(f"python {sys.version.split()[0]}, {args.runs} runs, key {'absent' if args.no_key else 'from env/.env'}")
+
+    imports, slowest = [], []
+    health, ready, warm = [], [], []
+    for _ in range(args.runs):
+        total, slowest = import_times(env, args.top)
+        imports.append(total)
+        h, r, w = serve_times(env, args.warmup, args.probe)
+        health.append(h)
+        ready.append(r)
+        warm.append(w)
+
+    print("\nStartup")
+    describe("import app", imports)
+    describe(f"process start -> {args.probe}", health)
+    describe("process start -> /readyz", ready)
+    describe("POST /admin/warmup", warm)
+    print("\nSlowest imports (cumulative, last run)")
+    for name, seconds in slowest:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+Minimal in-process metrics for the SDLC AI Verifier backend.
+Exposes counters and gauges in the Prometheus text exposition format,
+without pulling in prometheus_client.
+"""
+
+import threading
+from typing import Callable, Dict, List, Tuple
+
+
+class _Metric:
+    """Base class: a named metric with a fixed set of label names"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.labelnames, key)), val) for key, val in items]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (seconds by default)"""
+
+    metric_type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts + [sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        out = []
+        for key, series in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                out.append((f"{self.name}_bucket", {**labels, "le": f"{bound:g}"}, count))
+            out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, series[-1]))
+            out.append((f"{self.name}_sum", labels, series[-2]))
+            out.append((f"{self.name}_count", labels, series[-1]))
+        return out
+
+
+REGISTRY: List[_Metric] = []
+# Callbacks run right before each scrape, for values that are cheaper to
+# sample on demand (cache sizes, ratios) than to maintain on every update
+COLLECTORS: List[Callable[[], None]] = []
+
+
+def register_collector(fn: Callable[[], None]) -> Callable[[], None]:
+    """Add a pre-scrape callback (usable as a decorator)"""
+    COLLECTORS.append(fn)
+    return fn
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_latest() -> str:
+    """Render every registered metric in Prometheus text format"""
+    for collect in COLLECTORS:
+        collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------
+# Shared metric definitions
+# ---------------------------
+REQUESTS_CANCELLED = Counter(
+    "sdlc_requests_cancelled_total",
+    "Requests abandoned because the client disconnected",
+    ("endpoint",),
+)
+LLM_TASKS_CANCELLED = Counter(
+    "sdlc_llm_tasks_cancelled_total",
+    "LLM tasks cancelled after a client disconnect, by state at cancellation",
+    ("endpoint", "state"),
+)
+LLM_INFLIGHT = Gauge(
+    "sdlc_llm_inflight",
+    "LLM calls currently occupying a worker slot",
+)
+CHAT_SESSIONS = Gauge(
+    "sdlc_chat_sessions",
+    "Chat sessions currently held in memory",
+)
+CHAT_SUMMARY_FOLDS = Counter(
+    "sdlc_chat_summary_folds_total",
+    "Older chat turns folded into a session's rolling summary, by method",
+    ("mode",),
+)
+CHAT_CACHE_LOOKUPS = Counter(
+    "sdlc_chat_cache_lookups_total",
+    "Chat answer cache lookups by result (exact_hit, shared_hit, fuzzy_hit, miss)",
+    ("result",),
+)
+CHAT_CACHE_ENTRIES = Gauge(
+    "sdlc_chat_cache_entries",
+    "Answers currently held in the chat cache",
+)
+PDF_RENDER_SECONDS = Histogram(
+    "sdlc_pdf_render_seconds",
+    "Time spent rendering a PDF report inside a render worker",
+)
+PDF_RENDER_QUEUE_WAIT_SECONDS = Histogram(
+    "sdlc_pdf_render_queue_wait_seconds",
+    "Time a PDF render waited for a free render worker",
+)
+PDF_RENDER_PENDING = Gauge(
+    "sdlc_pdf_render_pending",
+    "PDF renders queued or running in the render pool",
+)
+PDF_RENDER_REJECTED = Counter(
+    "sdlc_pdf_render_rejected_total",
+    "PDF renders rejected because the render queue was full",
+)
+PDF_CACHE_LOOKUPS = Counter(
+    "sdlc_pdf_cache_lookups_total",
+    "Rendered PDF cache lookups by result (hit, miss)",
+    ("result",),
+)
+PDF_CACHE_BYTES = Gauge(
+    "sdlc_pdf_cache_bytes",
+    "Bytes of rendered PDFs held in the on-disk report cache",
+)
+OUTBOX_DELIVERIES = Counter(
+    "sdlc_outbox_deliveries_total",
+    "Reviewer outbox delivery attempts by result (delivered, retry, failed)",
+    ("result",),
+)
+OUTBOX_BATCH_SIZE = Histogram(
+    "sdlc_outbox_batch_size",
+    "Deliveries claimed per outbox dispatch batch",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+OUTBOX_DELIVERY_SECONDS = Histogram(
+    "sdlc_outbox_delivery_seconds",
+    "Time spent handing one batch to the delivery sink",
+    ("sink",),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "sdlc_http_request_seconds",
+    "HTTP request latency until the last response byte, by route template",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_INFLIGHT = Gauge(
+    "sdlc_http_requests_inflight",
+    "HTTP requests currently being served",
+)
+LLM_CALL_SECONDS = Histogram(
+    "sdlc_llm_call_seconds",
+    "Model call latency by phase (analyzer name or chat) and outcome (ok, error, cancelled)",
+    ("phase", "outcome"),
+)
+LLM_CALL_ERRORS = Counter(
+    "sdlc_llm_call_errors_total",
+    "Failed model calls by phase and exception type",
+    ("phase", "error"),
+)
+LLM_TTFT_SECONDS = Histogram(
+    "sdlc_llm_time_to_first_token_seconds",
+    "Time until the first streamed token, by phase",
+    ("phase",),
+)
+_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+LLM_PROMPT_CHARS = Histogram(
+    "sdlc_llm_prompt_chars",
+    "Prompt size in characters, by phase",
+    ("phase",),
+    buckets=_SIZE_BUCKETS,
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "sdlc_llm_prompt_tokens",
+    "Prompt size in tokens (usage metadata, or estimated), by phase",
+    ("phase",),
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+LLM_COMPLETION_TOKENS = Histogram(
+    "sdlc_llm_completion_tokens",
+    "Completion size in tokens (usage metadata, or estimated), by phase",
+    ("phase",),
+    buckets=(16, 64, 256, 1024, 2048, 4096, 8192, 16384),
+)
+PHASE_SECONDS = Histogram(
+    "sdlc_phase_seconds",
+    "End-to-end analyzer time (prompt build, model call, parsing), by phase",
+    ("phase",),
+)
+PHASE_RESULTS = Counter(
+    "sdlc_phase_results_total",
+    "Analyzer results by phase and reported status (completed, error)",
+    ("phase", "status"),
+)
+UPLOAD_BYTES = Counter(
+    "sdlc_upload_bytes_total",
+    "Bytes written to the uploads directory",
+)
+UPLOAD_FILES = Counter(
+    "sdlc_upload_files_total",
+    "Files written to the uploads directory",
+)
+UPLOAD_REQUEST_BYTES = Histogram(
+    "sdlc_upload_request_bytes",
+    "Total bytes per /upload request",
+    buckets=(1024, 16384, 131072, 1048576, 8388608, 67108864, 268435456),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "sdlc_event_loop_lag_seconds",
+    "Delay between when a periodic loop callback was due and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+EVENT_LOOP_LAG_LAST = Gauge(
+    "sdlc_event_loop_lag_last_seconds",
+    "Event loop lag measured by the most recent probe",
+)
+CACHE_HIT_RATIO = Gauge(
+    "sdlc_cache_hit_ratio",
+    "Hits / lookups since start, by cache (chat, pdf, analysis, condense)",
+    ("cache",),
+)
+RETRIEVAL_INDEX_CHUNKS = Gauge(
+    "sdlc_retrieval_index_chunks",
+    "Chunks held in the chat retrieval index",
+)
+TRACE_SPANS_EXPORTED = Counter(
+    "sdlc_trace_spans_exported_total",
+    "Trace spans handed to the configured exporter",
+)
+TRACE_SPANS_DROPPED = Counter(
+    "sdlc_trace_spans_dropped_total",
+    "Trace spans dropped (export queue full or export failed)",
+)
+PROFILES_CAPTURED = Counter(
+    "sdlc_profiles_captured_total",
+    "Request profiles captured in admin profiling mode, by result (captured, busy)",
+    ("result",),
+)
+TOKENS_USED = Counter(
+    "sdlc_tokens_total",
+    "Model tokens consumed, by phase and type (prompt, completion)",
+    ("phase", "type"),
+)
+TOKEN_BUDGET_REJECTIONS = Counter(
+    "sdlc_token_budget_rejections_total",
+    "Requests or calls refused by a token budget, by scope (request, workspace)",
+    ("scope",),
+)
+COMPONENT_INIT_SECONDS = Gauge(
+    "sdlc_component_init_seconds",
+    "Time spent initializing a lazily loaded component (model, pdf_renderer, render_pool)",
+    ("component",),
+)
+SHARED_STATE_OPS = Counter(
+    "sdlc_shared_state_ops_total",
+    "Shared state backend operations, by backend, operation and result (ok, error)",
+    ("backend", "op", "result"),
+)
+INFLIGHT_DEDUP = Counter(
+    "sdlc_inflight_dedup_total",
+    "Callers that found the same work in flight in another worker, by kind and outcome"
+    " (shared: got its result, takeover: ran it after the holder gave up, timeout: stopped waiting)",
+    ("kind", "outcome"),
+)
+ANALYSIS_CACHE_LOOKUPS = Counter(
+    "sdlc_analysis_cache_lookups_total",
+    "Per-phase analysis result cache lookups, by result (hit, miss, refresh)",
+    ("result",),
+)
+EXTRACTION_CHARS = Counter(
+    "sdlc_extraction_chars_total",
+    "Characters of uploaded files seen by format extractors, by extractor and stage"
+    " (raw: as uploaded, extracted: sent on to prompts, failed: unparseable, passed through,"
+    " kept: smaller than its extract, passed through)",
+    ("extractor", "stage"),
+)
+CONDENSE_CACHE_LOOKUPS = Counter(
+    "sdlc_condense_cache_lookups_total",
+    "Condensed source views looked up by content hash, by result (hit, miss)",
+    ("result",),
+)
+DEDUP_FILES = Counter(
+    "sdlc_dedup_files_total",
+    "Uploaded files replaced by a note in prompts because another file covers them, by kind (exact, near)",
+    ("kind",),
+)
+DEDUP_CHARS_SAVED = Counter(
+    "sdlc_dedup_chars_saved_total",
+    "Characters of duplicate files left out of prompt contexts",
+)
+SPECULATIVE_ANALYSIS = Counter(
+    "sdlc_speculative_analysis_total",
+    "Speculative pre-analysis runs started at upload, by event (scheduled, completed, joined by /analyze,"
+    " superseded by a newer upload, requested: cancelled, over_budget, shed: no free analysis slot,"
+    " failed, shutdown)",
+    ("event",),
+)
+ADMISSION_DECISIONS = Counter(
+    "sdlc_admission_decisions_total",
+    "Admission decisions per work class (admitted, queued then admitted, rejected: busy (would have"
+    " to wait, and may not), queue_full, wait_too_long, timeout)",
+    ("work", "outcome"),
+)
+ADMISSION_INFLIGHT = Gauge(
+    "sdlc_admission_inflight",
+    "Admitted requests running per work class",
+    ("work",),
+)
+ADMISSION_QUEUED = Gauge(
+    "sdlc_admission_queued",
+    "Requests waiting for admission per work class",
+    ("work",),
+)
+ADMISSION_QUEUE_WAIT_SECONDS = Histogram(
+    "sdlc_admission_queue_wait_seconds",
+    "Time admitted requests waited in the admission queue",
+    ("work",),
+)
+LLM_SCHEDULER_QUEUED = Gauge(
+    "sdlc_llm_scheduler_queued",
+    "Model calls waiting for an LLM worker, per priority class",
+    ("priority",),
+)
+LLM_SCHEDULER_WAIT_SECONDS = Histogram(
+    "sdlc_llm_scheduler_wait_seconds",
+    "Time model calls waited for an LLM worker, per priority class",
+    ("priority",),
+)
+LLM_SCHEDULER_AGED = Counter(
+    "sdlc_llm_scheduler_aged_total",
+    "Model calls started ahead of their priority because they waited too long",
+    ("priority",),
+)
+
+
+# ---------------------------
+# Pre-scrape collectors (after every definition they read)
+# ---------------------------
+def _hit_ratio(counter: Counter, hits: Tuple[str, ...], misses: Tuple[str, ...]):
+    hit = sum(counter.value(result=r) for r in hits)
+    total = hit + sum(counter.value(result=r) for r in misses)
+    return hit / total if total else None
+
+
+def _collect_cache_ratios():
+    for cache, ratio in (
+        ("chat", _hit_ratio(CHAT_CACHE_LOOKUPS, ("exact_hit", "shared_hit", "fuzzy_hit"), ("miss",))),
+        ("pdf", _hit_ratio(PDF_CACHE_LOOKUPS, ("hit",), ("miss",))),
+        ("analysis", _hit_ratio(ANALYSIS_CACHE_LOOKUPS, ("hit",), ("miss",))),
+        ("condense", _hit_ratio(CONDENSE_CACHE_LOOKUPS, ("hit",), ("miss",))),
+    ):
+        if ratio is not None:
+            CACHE_HIT_RATIO.set(ratio, cache=cache)
+
+
+register_collector(_collect_cache_ratios)
@@ -0,0 +1,265 @@
+"""
+Asynchronous reviewer delivery through a transactional outbox.
+
+/send-to-reviewer only writes the report and an outbox row (one local
+transaction) and returns. The OutboxDispatcher runs in the background: it
+leases due rows in batches, makes sure each report's PDF is rendered and
+stored, and hands the batch to a pluggable DeliverySink. Failed items are
+retried with exponential backoff; every item carries an idempotency key so
+a sink can safely see the same delivery twice (e.g. after a crash between
+delivering and marking the row delivered).
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from metrics import OUTBOX_BATCH_SIZE, OUTBOX_DELIVERIES, OUTBOX_DELIVERY_SECONDS
+from report_store import ReportStore
+
+logger = logging.getLogger("sdlc.outbox")
+
+_COPY_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class Delivery:
+    idempotency_key: str
+    report_id: str
+    metadata: Dict
+    pdf: BinaryIO       # open for reading; sinks copy it in chunks
+    pdf_size: int
+
+
+class DeliverySink(ABC):
+    """
+    Destination for reviewer deliveries. deliver() receives a batch and
+    returns {idempotency_key: error or None}; keys that were delivered
+    before must be treated as success.
+    """
+
+    name = "sink"
+
+    @abstractmethod
+    def deliver(self, batch: List[Delivery]) -> Dict[str, Optional[str]]:
+        ...
+
+
+class FilesystemSink(DeliverySink):
+    """Writes <key>.pdf and <key>.json into a directory (atomic renames)"""
+
+    name = "filesystem"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _write(self, path: str, source: BinaryIO):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(source, f, _COPY_CHUNK_SIZE)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def deliver(self, batch: List[Delivery]) -> Dict[str, Optional[str]]:
+        results = {}
+        for item in batch:
+            base = os.path.join(self.directory, item.idempotency_key)
+            try:
+                if not os.path.exists(base + ".json"):
+                    self._write(base + ".pdf", item.pdf)
+                    # metadata last: its presence marks a complete delivery
+                    self._write(base + ".json", io.BytesIO(json.dumps(
+                        {"reportId": item.report_id, **item.metadata}, indent=2).encode("utf-8")))
+                results[item.idempotency_key] = None
+            except OSError as e:
+                results[item.idempotency_key] = str(e)
+        return results
+
+
+class SQLiteSink(DeliverySink):
+    """Stores deliveries in a separate SQLite database (INSERT OR IGNORE on the key)"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS deliveries ("
+            " idempotency_key TEXT PRIMARY KEY, report_id TEXT NOT NULL,"
+            " metadata TEXT NOT NULL, pdf BLOB NOT NULL, delivered_at REAL NOT NULL)"
+        )
+
+    def deliver(self, batch: List[Delivery]) -> Dict[str, Optional[str]]:
+        with self._lock, self._conn:
+            for d in batch:
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO deliveries VALUES (?, ?, ?, zeroblob(?), ?)",
+                    (d.idempotency_key, d.report_id, json.dumps(d.metadata), d.pdf_size, time.time()),
+                )
+                if cur.rowcount:  # not delivered before: fill in the PDF
+                    with self._conn.blobopen("deliveries", "pdf", cur.lastrowid) as blob:
+                        shutil.copyfileobj(d.pdf, blob, _COPY_CHUNK_SIZE)
+        return {d.idempotency_key: None for d in batch}
+
+
+def make_sink(kind: str, path: str) -> DeliverySink:
+    if kind == "filesystem":
+        return FilesystemSink(path)
+    if kind == "sqlite":
+        return SQLiteSink(path)
+    raise ValueError(f"Unknown outbox sink {kind!r} (expected filesystem or sqlite)")
+
+
+class OutboxDispatcher:
+    """Background task draining the outbox into a DeliverySink"""
+
+    def __init__(
+        self,
+        store: ReportStore,
+        sink: DeliverySink,
+        ensure_pdf: Callable[[Dict], Awaitable[Tuple[BinaryIO, int]]],
+        batch_size: int = 20,
+        linger_seconds: float = 0.2,
+        poll_seconds: float = 5.0,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 8,
+        base_backoff_seconds: float = 2.0,
+    ):
+        self.store = store
+        self.sink = sink
+        self.ensure_pdf = ensure_pdf
+        self.batch_size = batch_size
+        self.linger_seconds = linger_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.base_backoff_seconds = base_backoff_seconds
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="outbox-dispatcher")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self):
+        """Wake the dispatcher after a new submission instead of waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                # linger briefly so submissions arriving together share a batch
+                await asyncio.sleep(self.linger_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self.dispatch_once() == self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+
+    async def dispatch_once(self) -> int:
+        """Claim and deliver one batch; returns the number of rows claimed"""
+        rows = await asyncio.to_thread(self.store.claim_outbox, self.batch_size, self.lease_seconds)
+        if not rows:
+            return 0
+        OUTBOX_BATCH_SIZE.observe(len(rows))
+
+        batch: List[Delivery] = []
+        by_key = {}
+        for row in rows:
+            try:
+                pdf, pdf_size = await self.ensure_pdf(row)
+            except Exception as e:
+                await self._retry(row, f"render failed: {e}")
+                continue
+            payload = row["payload"]
+            batch.append(Delivery(
+                idempotency_key=row["idempotencyKey"],
+                report_id=row["reportId"],
+                metadata={
+                    "reportKey": row["reportKey"],
+                    "overallScore": payload.get("overallScore"),
+                    "filesAnalyzed": payload.get("filesAnalyzed"),
+                    "timestamp": payload.get("timestamp"),
+                    "phases": payload.get("analysisResults", {}).get("phases", {}),
+                },
+                pdf=pdf,
+                pdf_size=pdf_size,
+            ))
+            by_key[row["idempotencyKey"]] = row
+
+        if not batch:
+            return len(rows)
+
+        started = time.perf_counter()
+        try:
+            results = await asyncio.to_thread(self.sink.deliver, batch)
+        except Exception as e:
+            results = {d.idempotency_key: str(e) for d in batch}
+        finally:
+            for d in batch:
+                d.pdf.close()
+        OUTBOX_DELIVERY_SECONDS.observe(time.perf_counter() - started, sink=self.sink.name)
+
+        delivered = []
+        for key, row in by_key.items():
+            error = results.get(key, "no result from sink")
+            if error is None:
+                delivered.append(row["id"])
+                OUTBOX_DELIVERIES.inc(result="delivered")
+            else:
+                await self._retry(row, error)
+        if delivered:
+            await asyncio.to_thread(self.store.mark_delivered, delivered)
+        return len(rows)
+
+    async def _retry(self, row: Dict, error: str):
+        if row["attempts"] >= self.max_attempts:
+            OUTBOX_DELIVERIES.inc(result="failed")
+            logger.error("Delivery %s failed permanently: %s", row["idempotencyKey"], error)
+            await asyncio.to_thread(self.store.mark_retry, row["id"], error, None)
+            return
+        OUTBOX_DELIVERIES.inc(result="retry")
+        # exponential backoff with jitter
+        delay = self.base_backoff_seconds * (2 ** (row["attempts"] - 1)) * random.uniform(0.8, 1.2)
+        await asyncio.to_thread(self.store.mark_retry, row["id"], error, time.time() + delay)
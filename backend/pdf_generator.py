@@ -4,21 +4,35 @@ Uses FPDF library to create professional PDF reports
 Install: pip install fpdf2
 """
 
+import os
 from fpdf import FPDF
-from datetime import datetime
+from datetime import datetime, timezone
 from io import BytesIO
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from report_format import RENDER_VERSION, parse_timestamp  # noqa: F401 (re-exported)
+
+# Used when no analysis timestamp is supplied, so output stays reproducible
+_FALLBACK_DATE = datetime(2000, 1, 1, tzinfo=timezone.utc)
 
 
 class SDLCReportPDF(FPDF):
     """Custom PDF class with header and footer"""
     
+    def __init__(self, generated_at: Optional[datetime] = None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The analysis timestamp, never the wall clock: same input -> same bytes
+        self.generated_at = generated_at
+        if hasattr(self, 'set_creation_date'):  # fpdf2
+            self.set_creation_date(generated_at or _FALLBACK_DATE)
+    
     def header(self):
         """Page header"""
         self.set_font('Arial', 'B', 16)
         self.cell(0, 10, 'SDLC Verification Report', 0, 1, 'C')
-        self.set_font('Arial', 'I', 10)
-        self.cell(0, 5, f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 1, 'C')
+        if self.generated_at is not None:
+            self.set_font('Arial', 'I', 10)
+            self.cell(0, 5, f'Analyzed: {self.generated_at.strftime("%Y-%m-%d %H:%M:%S %Z")}', 0, 1, 'C')
         self.ln(5)
     
     def footer(self):
@@ -121,25 +135,19 @@ def add_phase_section(pdf: FPDF, phase_name: str, phase_data: Dict):
     pdf.ln(5)
 
 
-def generate_pdf_report(
+def build_report_pdf(
     analysis_results: Dict,
     overall_score: str,
-    files_analyzed: List[str]
-) -> BytesIO:
+    files_analyzed: List[str],
+    timestamp: Optional[str] = None
+) -> FPDF:
     """
-    Generate PDF report from analysis results
-    
-    Args:
-        analysis_results: Dictionary containing phase analysis data
-        overall_score: Overall verification score
-        files_analyzed: List of analyzed files
-    
-    Returns:
-        BytesIO: PDF file buffer
+    Lay out the full report and return the FPDF document (not yet serialized).
+    Rendering is deterministic: identical arguments give identical bytes.
     """
     
     # Create PDF instance
-    pdf = SDLCReportPDF()
+    pdf = SDLCReportPDF(generated_at=parse_timestamp(timestamp))
     pdf.add_page()
     pdf.set_auto_page_break(auto=True, margin=15)
     
@@ -213,13 +221,67 @@ def generate_pdf_report(
         'critical decisions.'
     )
     
-    # Output to BytesIO buffer
-    pdf_output = BytesIO()
-    pdf_bytes = pdf.output(dest='S').encode('latin-1')
-    pdf_output.write(pdf_bytes)
-    pdf_output.seek(0)
+    return pdf
+
+
+def pdf_to_bytes(pdf: FPDF) -> bytes:
+    """Serialize a document; PyFPDF returns a latin-1 str, fpdf2 a bytearray"""
+    output = pdf.output(dest='S')
+    if isinstance(output, str):
+        return output.encode('latin-1')
+    return bytes(output)
+
+
+def render_pdf_bytes(
+    analysis_results: Dict,
+    overall_score: str,
+    files_analyzed: List[str],
+    timestamp: Optional[str] = None
+) -> bytes:
+    """
+    Render the report to bytes. Module-level so it can run in a process pool.
+    """
+    return pdf_to_bytes(build_report_pdf(analysis_results, overall_score, files_analyzed, timestamp))
+
+
+def render_pdf_to_file(
+    path: str,
+    analysis_results: Dict,
+    overall_score: str,
+    files_analyzed: List[str],
+    timestamp: Optional[str] = None
+) -> int:
+    """
+    Render the report straight to a file and return its size in bytes.
+    Used by the render pool so the serialized PDF never travels back to the
+    server process: the caller streams the file from disk instead. fpdf
+    still builds the whole document in memory before writing it, so the
+    render worker (not the server) peaks at about one report's size.
+    """
+    pdf = build_report_pdf(analysis_results, overall_score, files_analyzed, timestamp)
+    pdf.output(path)  # fpdf2 and PyFPDF both write to disk when given a name
+    return os.path.getsize(path)
+
+
+def generate_pdf_report(
+    analysis_results: Dict,
+    overall_score: str,
+    files_analyzed: List[str],
+    timestamp: Optional[str] = None
+) -> BytesIO:
+    """
+    Generate PDF report from analysis results
+    
+    Args:
+        analysis_results: Dictionary containing phase analysis data
+        overall_score: Overall verification score
+        files_analyzed: List of analyzed files
+        timestamp: ISO timestamp of the analysis, printed in the page header
     
-    return pdf_output
+    Returns:
+        BytesIO: PDF file buffer
+    """
+    return BytesIO(render_pdf_bytes(analysis_results, overall_score, files_analyzed, timestamp))
 
 
 # Test function (optional)
@@ -0,0 +1,253 @@
+"""
+Runs analysis phases described by phase_specs.PhaseSpec.
+
+Every phase used to carry its own copy of the context building, model call
+and score parsing; they now live here once:
+- build_context(): the uploaded files a phase sees (its include/exclude
+  filters), each condensed (code_condense) or truncated to max_file_chars,
+  the whole capped by the phase's token_budget; or, for large projects,
+  the project digest (project_digest) plus targeted excerpts of the files
+  the phase cares most about (see uses_digest())
+- build_prompt(): role + files + output format
+- run_phase(): model call, post-processing (split_emojis) and parsing into
+  the phase result dict
+- estimate_prompt_tokens(): the prompt size from file sizes alone, for
+  token budgets before any call is made
+"""
+
+import re
+from fnmatch import fnmatch
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import code_condense
+import project_digest
+from cancellation import AnalysisCancelled
+from phase_specs import PHASES, PhaseSpec
+from tokens import CHARS_PER_TOKEN, estimate_tokens
+from usage import BudgetExceeded
+
+# How phases see the project: "files" (every file, as before), "digest" (the
+# project digest plus excerpts) or "auto" (the digest for phases whose files
+# context would be larger than DIGEST_MIN_TOKENS)
+CONTEXT_MODES = ("auto", "files", "digest")
+CONTEXT_MODE = "auto"
+DIGEST_MIN_TOKENS = 8000
+# Excerpts next to the digest: total budget and per-file limit
+EXCERPT_TOKENS = 3000
+EXCERPT_FILE_CHARS = 6000
+
+CONTEXT_HEADER = "PROJECT FILES (FULL CONTENT INCLUDED):\n\n"
+FILE_SEPARATOR = "===========================================\n"
+TRUNCATED_MARKER = "\n...[TRUNCATED]...\n\n"
+
+DIGEST_HEADER = "PROJECT FILES (SUMMARIZED: A STRUCTURED DIGEST OF ALL FILES, THEN SELECTED EXCERPTS):\n\n"
+EXCERPTS_HEADER = "\nSELECTED FILE EXCERPTS (LONG FILES CONDENSED OR TRUNCATED):\n\n"
+
+# Status markers that split_emojis phases put at the start of a line
+STATUS_EMOJIS = ("✅", "❌", "🔴", "🟡", "🟢", "✓", "✗", "💡")
+_EMOJI_INLINE_RES = [re.compile(f"([^\n])({re.escape(emoji)})") for emoji in STATUS_EMOJIS]
+
+PROMPT_FRAME = """
+You are a {role}.
+
+{context}
+
+OUTPUT FORMAT (use this exact structure):
+
+"""
+
+
+def configure(context_mode: str = CONTEXT_MODE, digest_min_tokens: int = DIGEST_MIN_TOKENS,
+              excerpt_tokens: int = EXCERPT_TOKENS, excerpt_file_chars: int = EXCERPT_FILE_CHARS):
+    global CONTEXT_MODE, DIGEST_MIN_TOKENS, EXCERPT_TOKENS, EXCERPT_FILE_CHARS
+    if context_mode not in CONTEXT_MODES:
+        raise ValueError(f"Unknown phase context mode {context_mode!r} (expected {', '.join(CONTEXT_MODES)})")
+    CONTEXT_MODE = context_mode
+    DIGEST_MIN_TOKENS = digest_min_tokens
+    EXCERPT_TOKENS = excerpt_tokens
+    EXCERPT_FILE_CHARS = excerpt_file_chars
+
+
+def settings() -> Dict:
+    return {
+        "context_mode": CONTEXT_MODE,
+        "digest_min_tokens": DIGEST_MIN_TOKENS,
+        "excerpt_tokens": EXCERPT_TOKENS,
+        "excerpt_file_chars": EXCERPT_FILE_CHARS,
+    }
+
+
+class UnknownPhase(ValueError):
+    """A requested phase has no spec"""
+
+    def __init__(self, names: List[str]):
+        self.names = names
+        super().__init__(f"Unknown phase(s): {', '.join(names)}. Available: {', '.join(PHASES)}")
+
+
+def select_phases(names: Optional[Iterable[str]] = None) -> List[PhaseSpec]:
+    """Specs for the requested phase names (all phases if none), in canonical order"""
+    if names is None:
+        return list(PHASES.values())
+    wanted = {n.strip().lower() for n in names if n.strip()}
+    if not wanted:
+        return list(PHASES.values())
+    unknown = sorted(wanted - PHASES.keys())
+    if unknown:
+        raise UnknownPhase(unknown)
+    return [spec for name, spec in PHASES.items() if name in wanted]
+
+
+def phase_files(spec: PhaseSpec, file_contents: Dict[str, str]) -> List[Tuple[str, str]]:
+    """(filename, content) pairs the phase is shown, in upload order"""
+    return [
+        (filename, content) for filename, content in file_contents.items()
+        if any(fnmatch(filename, p) for p in spec.include)
+        and not any(fnmatch(filename, p) for p in spec.exclude)
+    ]
+
+
+def _file_section(filename: str, content, max_chars: int) -> str:
+    section = FILE_SEPARATOR + f"FILE NAME: {filename}\n" + FILE_SEPARATOR
+    if not isinstance(content, str):
+        return section + "[Non-text / Binary file]\n\n"
+    if len(content) < max_chars:
+        return section + content + "\n\n"
+    condensed = code_condense.condense(filename, content, max_chars)
+    if condensed is not None and len(condensed) <= max_chars:
+        return section + condensed + "\n\n"
+    content = condensed or content
+    return section + content[:max_chars] + TRUNCATED_MARKER
+
+
+def uses_digest(spec: PhaseSpec, file_contents: Dict[str, str]) -> bool:
+    """Whether the phase reasons over the project digest instead of the raw files"""
+    if CONTEXT_MODE == "auto":
+        return _files_prompt_tokens(spec, file_contents) > DIGEST_MIN_TOKENS
+    return CONTEXT_MODE == "digest"
+
+
+def build_excerpts(spec: PhaseSpec, file_contents: Dict[str, str], digest: Dict) -> str:
+    """The phase's most relevant files (excerpt_kinds / excerpt_hints) within EXCERPT_TOKENS"""
+    allowed = dict(phase_files(spec, file_contents))
+    remaining = EXCERPT_TOKENS * CHARS_PER_TOKEN
+    excerpts = ""
+    for filename in project_digest.excerpt_files(digest, spec.excerpt_kinds, spec.excerpt_hints):
+        if filename not in allowed:
+            continue
+        # leave room for the header and the truncation marker
+        max_chars = min(EXCERPT_FILE_CHARS, remaining - 200)
+        if max_chars <= 0:
+            break
+        section = _file_section(filename, allowed[filename], max_chars)
+        excerpts += section
+        remaining -= len(section)
+    return excerpts or "[no files of the kinds this phase focuses on]\n\n"
+
+
+def build_context(spec: PhaseSpec, file_contents: Dict[str, str], digest: Optional[Dict] = None) -> str:
+    if digest is not None and uses_digest(spec, file_contents):
+        return (DIGEST_HEADER + project_digest.render(digest) + EXCERPTS_HEADER
+                + build_excerpts(spec, file_contents, digest))
+    context = CONTEXT_HEADER
+    files = phase_files(spec, file_contents)
+    remaining = spec.token_budget * CHARS_PER_TOKEN if spec.token_budget else None
+    for index, (filename, content) in enumerate(files):
+        max_chars = spec.max_file_chars
+        if remaining is not None:
+            # leave room for the header and the truncation marker
+            max_chars = min(max_chars, remaining - 200)
+            if max_chars <= 0:
+                context += f"[{len(files) - index} more file(s) omitted: context token budget reached]\n\n"
+                break
+        section = _file_section(filename, content, max_chars)
+        context += section
+        if remaining is not None:
+            remaining -= len(section)
+    return context
+
+
+def build_prompt(spec: PhaseSpec, file_contents: Dict[str, str], digest: Optional[Dict] = None) -> str:
+    return (
+        PROMPT_FRAME.format(role=spec.role, context=build_context(spec, file_contents, digest))
+        + spec.template.replace("{score_label}", spec.score_label)
+    )
+
+
+def estimate_prompt_tokens(spec: PhaseSpec, file_contents: Dict[str, str], digest: Optional[Dict] = None) -> int:
+    """Prompt size of a phase; with the raw files, computed from file sizes without building it"""
+    if digest is not None and uses_digest(spec, file_contents):
+        # builds the excerpts: cheap once condensed (cached by content hash), but the first
+        # build runs the AST passes, so async callers run this in a thread
+        return estimate_tokens(build_prompt(spec, file_contents, digest))
+    return _files_prompt_tokens(spec, file_contents)
+
+
+def _files_prompt_tokens(spec: PhaseSpec, file_contents: Dict[str, str]) -> int:
+    """Headers + truncated file lengths"""
+    overhead = len(FILE_SEPARATOR) * 2 + len("FILE NAME: \n") + len(TRUNCATED_MARKER)
+    chars = sum(
+        min(len(content) if isinstance(content, str) else 0, spec.max_file_chars) + len(filename) + overhead
+        for filename, content in phase_files(spec, file_contents)
+    )
+    if spec.token_budget:
+        chars = min(chars, spec.token_budget * CHARS_PER_TOKEN)
+    fixed = len(PROMPT_FRAME) + len(spec.role) + len(CONTEXT_HEADER) + len(spec.template)
+    return (chars + fixed + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_emojis(text: str) -> str:
+    """Start a new line before every status emoji that follows other text"""
+    for pattern in _EMOJI_INLINE_RES:  # one pass per emoji, so "✅❌" splits too
+        text = pattern.sub(r"\1\n\2", text)
+    return text
+
+
+def parse_score(spec: PhaseSpec, text: str) -> int:
+    """The phase's "<SCORE LABEL>: NN/100" line, else any "SCORE: NN/100" line"""
+    lines = text.splitlines()
+    for marker in (f"{spec.score_label}:", "SCORE:"):
+        for line in lines:
+            if marker in line and "/100" in line:
+                try:
+                    return int(line.split(marker, 1)[1].split("/")[0].strip().strip("*[] "))
+                except ValueError:
+                    continue
+    return spec.default_score
+
+
+def run_phase(spec: PhaseSpec, file_contents: Dict[str, str], model, digest: Optional[Dict] = None) -> Dict:
+    """
+    Analyze one phase with the model. Model errors become a result with
+    status "error" (the other phases still complete); cancellation and a
+    request running past its token budget are propagated. Pass the project digest to let phases over
+    DIGEST_MIN_TOKENS (or all, in "digest" mode) use it.
+    """
+    prompt = build_prompt(spec, file_contents, digest)
+    try:
+        response = model.generate_content(prompt)
+        analysis_text = response.text
+    except (AnalysisCancelled, BudgetExceeded):
+        raise
+    except Exception as e:
+        return {
+            "phase": spec.label,
+            "score": 0,
+            "analysis": f"Error during analysis: {str(e)}",
+            "status": "error"
+        }
+    if spec.split_emojis:
+        analysis_text = split_emojis(analysis_text)
+    return {
+        "phase": spec.label,
+        "score": parse_score(spec, analysis_text),
+        "analysis": analysis_text,
+        "status": "completed"
+    }
+
+
+def estimate_tokens_for(specs: Iterable[PhaseSpec], file_contents: Dict[str, str],
+                        digest: Optional[Dict] = None) -> int:
+    """Total prompt tokens of running the given phases"""
+    return sum(estimate_prompt_tokens(spec, file_contents, digest) for spec in specs)
+
@@ -0,0 +1,512 @@
+"""
+Declarative specs of the six SDLC analysis phases.
+
+A phase is data: who the model should be (role), the output format it must
+follow (template, with {score_label} filled in), the label of the score line
+that is parsed from the answer, which uploaded files it sees and how much of
+them. phase_engine turns a spec into a prompt, calls the model and parses the
+result, so adding or tuning a phase means editing this file only.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class PhaseSpec:
+    name: str                 # key in /analyze results and in ?phases=
+    label: str                # human-readable phase name, returned as "phase"
+    role: str                 # "You are a {role}."
+    score_label: str          # e.g. "COMPLETENESS SCORE" -> "1. COMPLETENESS SCORE: 88/100"
+    template: str             # output format section of the prompt
+    include: Tuple[str, ...] = ("*",)  # fnmatch patterns on file names
+    exclude: Tuple[str, ...] = ()
+    max_file_chars: int = 15000  # per file; longer files are truncated
+    token_budget: int = 0     # cap on the files context, in estimated tokens (0: none)
+    default_score: int = 80   # when the answer has no parsable score line
+    # With a project digest (large projects, see phase_engine): file kinds shown
+    # as excerpts next to it, and fnmatch name hints ranked first within them
+    excerpt_kinds: Tuple[str, ...] = ("doc", "code")
+    excerpt_hints: Tuple[str, ...] = ("readme*",)
+    split_emojis: bool = False  # put each status emoji (✅ ❌ 🔴 ...) of the answer on its own line
+
+
+REQUIREMENTS_TEMPLATE = """\
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+📋 REQUIREMENTS ANALYSIS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+1. {score_label}: [X]/100
+
+   
+   ✅ PRESENT:
+   • [item]
+   • [item]
+   
+   
+   ❌ MISSING:
+   • [item]
+   • [item]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+2. QUALITY ISSUES
+
+   
+   🔴 CRITICAL:
+   • [issue] - [why it matters]
+   • [issue] - [why it matters]
+   
+   
+   🟡 MODERATE:
+   • [issue]
+   • [issue]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+3. DATASET ALIGNMENT
+
+   
+   ✓ [aligned item]
+   ✓ [aligned item]
+   
+   
+   ✗ [misalignment]
+   ✗ [misalignment]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+4. AI REQUIREMENTS CHECK
+
+   • Bias/Fairness: [✓/✗] [one-line reason if missing]
+   • Explainability: [✓/✗] [one-line reason if missing]
+   • Performance Metrics: [✓/✗] [one-line reason if missing]
+   • Monitoring Plan: [✓/✗] [one-line reason if missing]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+💡 TOP RECOMMENDATIONS
+
+1. [Action verb] + [what] + [why/impact]
+2. [Action verb] + [what] + [why/impact]
+3. [Action verb] + [what] + [why/impact]
+4. [Action verb] + [what] + [why/impact]
+5. [Action verb] + [what] + [why/impact]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+RULES:
+- Keep each bullet point under 15 words
+- No bold text inside bullets (use it only for section headers if needed)
+- Be specific, not generic
+- Focus on actionable insights
+- Avoid repetition across sections
+- IMPORTANT: Add a blank line before every emoji (✅, ❌, 🔴, 🟡, ✓, ✗, 💡)
+"""
+
+
+DESIGN_TEMPLATE = """\
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+🏗️ DESIGN ANALYSIS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+1. {score_label}: [X]/100
+
+   
+   ✅ PRESENT:
+   • [design element]
+   • [design element]
+   
+   
+   ❌ MISSING:
+   • [design element]
+   • [design element]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+2. MODEL DESIGN EVALUATION
+
+   
+   🔴 CRITICAL:
+   • [issue] - [impact]
+   • [issue] - [impact]
+   
+   
+   🟡 MODERATE:
+   • [issue]
+   • [issue]
+   
+   
+   ✓ STRENGTHS:
+   • [strength]
+   • [strength]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+3. DATA PIPELINE DESIGN
+
+   
+   ✓ [pipeline component evaluation]
+   ✓ [pipeline component evaluation]
+   
+   
+   ✗ [missing/weak component]
+   ✗ [missing/weak component]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+4. SCALABILITY & MAINTAINABILITY
+
+   • Modularity: [✓/✗] [one-line assessment]
+   • Code Reusability: [✓/✗] [one-line assessment]
+   • Error Handling: [✓/✗] [one-line assessment]
+   • Documentation: [✓/✗] [one-line assessment]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+💡 TOP RECOMMENDATIONS
+
+1. [Action verb] + [what] + [why/impact]
+2. [Action verb] + [what] + [why/impact]
+3. [Action verb] + [what] + [why/impact]
+4. [Action verb] + [what] + [why/impact]
+5. [Action verb] + [what] + [why/impact]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+RULES:
+- Keep each bullet point under 15 words
+- No bold text inside bullets
+- Be specific and actionable
+- Focus on design patterns and architecture
+- Avoid repetition
+- IMPORTANT: Add a blank line before every emoji (✅, ❌, 🔴, 🟡, ✓, ✗, 💡)
+"""
+
+
+IMPLEMENTATION_TEMPLATE = """\
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+⚙️ IMPLEMENTATION ANALYSIS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+1. {score_label}: [X]/100
+
+   
+   ✅ STRENGTHS:
+   • [strength]
+   • [strength]
+   
+   
+   ❌ WEAKNESSES:
+   • [weakness]
+   • [weakness]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+2. CODE ISSUES
+
+   
+   🔴 CRITICAL:
+   • [issue] - [impact on production]
+   • [issue] - [impact on production]
+   
+   
+   🟡 MODERATE:
+   • [issue]
+   • [issue]
+   
+   
+   🟢 MINOR:
+   • [issue]
+   • [issue]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+3. BEST PRACTICES COMPLIANCE
+
+   
+   ✓ [compliant practice]
+   ✓ [compliant practice]
+   
+   
+   ✗ [non-compliant practice]
+   ✗ [non-compliant practice]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+4. TECHNICAL DEBT ASSESSMENT
+
+   • Error Handling: [✓/✗] [assessment]
+   • Code Documentation: [✓/✗] [assessment]
+   • Resource Management: [✓/✗] [assessment]
+   • Security Practices: [✓/✗] [assessment]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+💡 TOP RECOMMENDATIONS
+
+1. [Action verb] + [what] + [why/impact]
+2. [Action verb] + [what] + [why/impact]
+3. [Action verb] + [what] + [why/impact]
+4. [Action verb] + [what] + [why/impact]
+5. [Action verb] + [what] + [why/impact]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+RULES:
+- Keep each bullet point under 15 words
+- No bold text inside bullets
+- Be specific with code examples where applicable
+- Focus on actionable improvements
+- Avoid generic advice
+- IMPORTANT: Add a blank line before every emoji (✅, ❌, 🔴, 🟡, 🟢, ✓, ✗, 💡)
+"""
+
+
+TESTING_TEMPLATE = """\
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+🧪 TESTING ANALYSIS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+1. {score_label}: [X]/100
+
+   ✅ TESTED:
+   • [test area]
+   • [test area]
+   
+   ❌ UNTESTED:
+   • [test area]
+   • [test area]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+2. TEST QUALITY ISSUES
+
+   🔴 CRITICAL GAPS:
+   • [missing test] - [why critical]
+   • [missing test] - [why critical]
+   
+   🟡 MODERATE GAPS:
+   • [test improvement needed]
+   • [test improvement needed]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+3. TEST TYPES EVALUATION
+
+   ✓ [test type present and quality]
+   ✓ [test type present and quality]
+   
+   ✗ [missing test type]
+   ✗ [missing test type]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+4. ML-SPECIFIC TESTING
+
+   • Model Validation: [✓/✗] [assessment]
+   • Data Quality Tests: [✓/✗] [assessment]
+   • Performance Tests: [✓/✗] [assessment]
+   • Edge Case Tests: [✓/✗] [assessment]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+💡 TOP RECOMMENDATIONS
+
+1. [Action verb] + [what] + [why/impact]
+2. [Action verb] + [what] + [why/impact]
+3. [Action verb] + [what] + [why/impact]
+4. [Action verb] + [what] + [why/impact]
+5. [Action verb] + [what] + [why/impact]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+RULES:
+- Keep each bullet point under 15 words
+- No bold text inside bullets
+- Be specific about test scenarios
+- Focus on critical gaps
+- Prioritize ML model testing
+"""
+
+
+DEPLOYMENT_TEMPLATE = """\
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+🚀 DEPLOYMENT ANALYSIS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+1. {score_label}: [X]/100
+
+   
+   ✅ READY:
+   • [deployment aspect]
+   • [deployment aspect]
+   
+   
+   ❌ NOT READY:
+   • [deployment aspect]
+   • [deployment aspect]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+2. DEPLOYMENT ISSUES
+
+   
+   🔴 CRITICAL BLOCKERS:
+   • [issue] - [production risk]
+   • [issue] - [production risk]
+   
+   
+   🟡 MODERATE CONCERNS:
+   • [issue]
+   • [issue]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+3. INFRASTRUCTURE EVALUATION
+
+   
+   ✓ [infrastructure component assessment]
+   ✓ [infrastructure component assessment]
+   
+   
+   ✗ [missing/inadequate component]
+   ✗ [missing/inadequate component]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+4. PRODUCTION REQUIREMENTS
+
+   • Monitoring/Logging: [✓/✗] [assessment]
+   • Scalability Plan: [✓/✗] [assessment]
+   • Rollback Strategy: [✓/✗] [assessment]
+   • Security Measures: [✓/✗] [assessment]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+💡 TOP RECOMMENDATIONS
+
+1. [Action verb] + [what] + [why/impact]
+2. [Action verb] + [what] + [why/impact]
+3. [Action verb] + [what] + [why/impact]
+4. [Action verb] + [what] + [why/impact]
+5. [Action verb] + [what] + [why/impact]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+RULES:
+- Keep each bullet point under 15 words
+- No bold text inside bullets
+- Focus on production readiness
+- Emphasize monitoring and recovery
+- Be specific about infrastructure needs
+- IMPORTANT: Add a blank line before every emoji (✅, ❌, 🔴, 🟡, ✓, ✗, 💡)
+"""
+
+
+MAINTENANCE_TEMPLATE = """\
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+🔧 MAINTENANCE ANALYSIS
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+1. {score_label}: [X]/100
+
+   ✅ STRONG AREAS:
+   • [maintainability aspect]
+   • [maintainability aspect]
+   
+   ❌ WEAK AREAS:
+   • [maintainability aspect]
+   • [maintainability aspect]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+2. MAINTENANCE ISSUES
+
+   🔴 CRITICAL:
+   • [issue] - [long-term impact]
+   • [issue] - [long-term impact]
+   
+   🟡 MODERATE:
+   • [issue]
+   • [issue]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+3. DOCUMENTATION & SUPPORT
+
+   ✓ [documentation element present]
+   ✓ [documentation element present]
+   
+   ✗ [missing documentation]
+   ✗ [missing documentation]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+4. LONG-TERM VIABILITY
+
+   • Code Maintainability: [✓/✗] [assessment]
+   • Update/Patch Strategy: [✓/✗] [assessment]
+   • Model Retraining Plan: [✓/✗] [assessment]
+   • Knowledge Transfer: [✓/✗] [assessment]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+💡 TOP RECOMMENDATIONS
+
+1. [Action verb] + [what] + [why/impact]
+2. [Action verb] + [what] + [why/impact]
+3. [Action verb] + [what] + [why/impact]
+4. [Action verb] + [what] + [why/impact]
+5. [Action verb] + [what] + [why/impact]
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+RULES:
+- Keep each bullet point under 15 words
+- No bold text inside bullets
+- Focus on long-term sustainability
+- Emphasize documentation and knowledge transfer
+- Consider model drift and retraining needs
+"""
+
+
+PHASES: Dict[str, PhaseSpec] = {spec.name: spec for spec in (
+    PhaseSpec(
+        name="requirements",
+        label="Requirements",
+        role="Senior SDLC Specialist performing Requirements Analysis",
+        score_label="COMPLETENESS SCORE",
+        template=REQUIREMENTS_TEMPLATE,
+        excerpt_kinds=("doc",),
+        excerpt_hints=("*srs*", "*requirement*", "*spec*", "readme*", "*user*stor*"),
+    ),
+    PhaseSpec(
+        name="design",
+        label="Design",
+        role="Senior SDLC Architect performing Design Phase Analysis",
+        score_label="ARCHITECTURE SCORE",
+        template=DESIGN_TEMPLATE,
+        excerpt_kinds=("doc", "code"),
+        excerpt_hints=("*design*", "*architecture*", "*diagram*", "readme*"),
+    ),
+    PhaseSpec(
+        name="implementation",
+        label="Implementation",
+        role="Senior Software Engineer performing Implementation Phase Analysis",
+        score_label="CODE QUALITY SCORE",
+        template=IMPLEMENTATION_TEMPLATE,
+        excerpt_kinds=("code", "notebook"),
+        excerpt_hints=(),
+    ),
+    PhaseSpec(
+        name="testing",
+        label="Testing",
+        role="Senior QA Engineer performing Testing Phase Analysis",
+        score_label="TEST COVERAGE SCORE",
+        template=TESTING_TEMPLATE,
+        excerpt_kinds=("test", "code", "notebook"),
+        excerpt_hints=("conftest*", "*test_plan*"),
+        split_emojis=True,
+    ),
+    PhaseSpec(
+        name="deployment",
+        label="Deployment",
+        role="Senior DevOps Engineer performing Deployment Phase Analysis",
+        score_label="DEPLOYMENT READINESS SCORE",
+        template=DEPLOYMENT_TEMPLATE,
+        excerpt_kinds=("deploy", "config", "doc"),
+        excerpt_hints=("dockerfile*", "*compose*", "requirements*", "*deploy*", "readme*"),
+    ),
+    PhaseSpec(
+        name="maintenance",
+        label="Maintenance",
+        role="Senior System Administrator performing Maintenance Phase Analysis",
+        score_label="MAINTAINABILITY SCORE",
+        template=MAINTENANCE_TEMPLATE,
+        excerpt_kinds=("doc", "config", "code"),
+        excerpt_hints=("readme*", "changelog*", "contributing*", "*maintenance*"),
+        split_emojis=True,
+    ),
+)}
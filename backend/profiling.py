@@ -0,0 +1,226 @@
+"""
+Opt-in, admin-only profiling of individual requests.
+
+A request carrying `X-Profile: cpu,alloc` together with a valid
+`X-Admin-Token` (and PROFILING_ENABLED on the server) is profiled:
+- cpu: a sampler thread snapshots every thread's stack with
+  sys._current_frames() at a fixed interval and counts folded stacks
+  (flamegraph.pl / speedscope "collapsed" format). Idle pool threads
+  parked in a wait are skipped, so LLM worker threads show up only while
+  they actually run.
+- alloc: tracemalloc is started for the duration of the request and the
+  top allocation sites (net growth) are reported.
+
+Only one request is profiled at a time; a second one runs unprofiled and
+is told so in the X-Profile-Status header. The profile is saved as JSON
+under PROFILE_DIR and its id returned in X-Profile-Id (it is also the
+trace id when the request is traced).
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter as TallyCounter
+from typing import Dict, List, Optional
+
+from metrics import PROFILES_CAPTURED
+from tracing import current_span
+
+# Stack leaves in these modules mean the thread is parked, not working
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+# (file, function) leaves that block in C code, e.g. a pool worker on its queue
+_IDLE_LEAVES = {("thread.py", "_worker")}
+_MAX_DEPTH = 64
+
+
+def _folded_stack(frame) -> Optional[str]:
+    leaf = os.path.basename(frame.f_code.co_filename)
+    if leaf in _IDLE_FILES or (leaf, frame.f_code.co_name) in _IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None and len(names) < _MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples all thread stacks every `interval` seconds until stopped"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: TallyCounter = TallyCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _folded_stack(frame)
+                if stack:
+                    self.stacks[stack] += 1
+
+
+class RequestProfile:
+    """CPU samples and/or allocation growth for one request"""
+
+    def __init__(self, cpu: bool, alloc: bool, interval: float, top: int):
+        self.cpu = cpu
+        self.alloc = alloc
+        self.top = top
+        self.sampler = StackSampler(interval) if cpu else None
+        self._baseline = None
+        self._started_tracemalloc = False
+        self.started = 0.0
+
+    def start(self):
+        self.started = time.perf_counter()
+        if self.alloc:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(16)
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def stop(self) -> Dict:
+        result: Dict = {"wall_seconds": round(time.perf_counter() - self.started, 4)}
+        if self.sampler is not None:
+            self.sampler.stop()
+            result["cpu"] = {
+                "interval_seconds": self.sampler.interval,
+                "samples": self.sampler.samples,
+                "folded": dict(self.sampler.stacks.most_common(self.top)),
+            }
+        if self.alloc:
+            snapshot = tracemalloc.take_snapshot()
+            _current, peak = tracemalloc.get_traced_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+            stats = snapshot.compare_to(self._baseline, "lineno")
+            result["alloc"] = {
+                "peak_bytes": peak,
+                "top": [
+                    {"site": str(s.traceback[0]), "size_diff": s.size_diff, "count_diff": s.count_diff}
+                    for s in stats[:self.top]
+                ],
+            }
+        return result
+
+
+class Profiler:
+    """Gatekeeper: admin check, one profile at a time, storage of results"""
+
+    def __init__(self, enabled: bool, admin_token: str, directory: str,
+                 interval: float = 0.005, top: int = 50):
+        # without an admin token nobody could be authorised, so stay off
+        self.enabled = enabled and bool(admin_token)
+        self.admin_token = admin_token
+        self.directory = directory
+        self.interval = interval
+        self.top = top
+        self._busy = threading.Lock()
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def try_begin(self) -> bool:
+        """Claim the single profiling slot; False if another request holds it"""
+        return self._busy.acquire(blocking=False)
+
+    def end(self):
+        """Give back the slot claimed with try_begin()"""
+        self._busy.release()
+
+    def authorised(self, token: Optional[str]) -> bool:
+        return self.enabled and token is not None and hmac.compare_digest(token, self.admin_token)
+
+    def path_for(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def load(self, profile_id: str) -> Optional[Dict]:
+        if not re.fullmatch(r"[0-9a-f]{1,64}", profile_id):
+            return None
+        try:
+            with open(self.path_for(profile_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, profile_id: str, data: Dict):
+        tmp_path = self.path_for(profile_id) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path_for(profile_id))
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it with X-Profile and a valid X-Admin-Token"""
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        wanted = headers.get(b"x-profile")
+        if wanted is None:
+            await self.app(scope, receive, send)
+            return
+        token = headers.get(b"x-admin-token", b"").decode("latin-1")
+        if not self.profiler.authorised(token):
+            # don't reveal whether profiling exists; just run normally
+            await self.app(scope, receive, send)
+            return
+
+        modes = {m.strip() for m in wanted.decode("latin-1").lower().split(",")}
+        if not self.profiler.try_begin():
+            PROFILES_CAPTURED.inc(result="busy")
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+
+        profile_id = current_span().trace_id or uuid.uuid4().hex
+        profile = RequestProfile("cpu" in modes, "alloc" in modes, self.profiler.interval, self.profiler.top)
+        extra = [(b"x-profile-status", b"captured"), (b"x-profile-id", profile_id.encode())]
+        try:
+            # snapshots, their comparison and the file write are slow: keep them off the event loop
+            await asyncio.to_thread(profile.start)
+            try:
+                await self.app(scope, receive, self._with_headers(send, extra))
+            finally:
+                data = await asyncio.to_thread(profile.stop)
+            data.update({"id": profile_id, "method": scope["method"], "path": scope["path"]})
+            await asyncio.to_thread(self.profiler.save, profile_id, data)
+            PROFILES_CAPTURED.inc(result="captured")
+        finally:
+            self.profiler.end()
+
+    @staticmethod
+    def _with_headers(send, extra: List):
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers") or []) + extra
+            await send(message)
+        return send_wrapper
@@ -0,0 +1,314 @@
+"""
+Whole-project digest: a compact, structured summary of the uploaded files.
+
+For large projects every phase used to re-read the same raw files. The
+digest is built once per upload set, mostly by local static analysis:
+- file inventory: kind (code, test, doc, config, deploy, data, ...),
+  language, size and top-level symbols
+- module graph: which uploaded files import which (Python via ast,
+  JS/TS via import/require statements)
+- detected frameworks and libraries (imports, requirements.txt, package.json)
+- tests: test files and test function counts
+- deployment artifacts (Dockerfile, compose, CI workflows, Procfile, ...)
+- docs outline: the headings of every document
+plus at most one model call (summarize()) for a short project overview.
+
+build_digest() returns plain JSON-able data, so it can be cached by
+content hash in the shared state; render() turns it into prompt text and
+excerpt_files() picks the files a phase sees in full (or condensed) next
+to it. See phase_engine for how phases use it.
+"""
+
+import ast
+import os
+import re
+from collections import Counter
+from fnmatch import fnmatch
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from tokens import truncate_to_tokens
+
+# Caps that keep the rendered digest compact on very large uploads
+MAX_INVENTORY_FILES = 200
+MAX_SYMBOLS_PER_FILE = 12
+MAX_HEADINGS_PER_DOC = 25
+OVERVIEW_DOCS_TOKENS = 1500
+
+CODE_EXTENSIONS = {
+    ".py": "python", ".pyw": "python", ".ipynb": "notebook", ".js": "javascript", ".jsx": "javascript",
+    ".mjs": "javascript", ".ts": "typescript", ".tsx": "typescript", ".java": "java", ".kt": "kotlin",
+    ".go": "go", ".rb": "ruby", ".rs": "rust", ".php": "php", ".cs": "csharp", ".c": "c", ".h": "c",
+    ".cpp": "cpp", ".hpp": "cpp", ".swift": "swift", ".scala": "scala", ".sh": "shell", ".sql": "sql",
+    ".html": "html", ".css": "css", ".vue": "vue",
+}
+DOC_EXTENSIONS = {".md", ".markdown", ".rst", ".txt", ".adoc"}
+DATA_EXTENSIONS = {".csv", ".tsv", ".parquet", ".xlsx", ".xls"}
+CONFIG_EXTENSIONS = {".json", ".yaml", ".yml", ".toml", ".ini", ".cfg", ".conf", ".env", ".xml"}
+
+# fnmatch patterns on lower-cased file names, checked before the extension
+TEST_PATTERNS = ("test_*", "*_test.*", "*_tests.*", "*.test.*", "*.spec.*", "*_spec.*", "tests.py", "conftest.py")
+DEPLOY_PATTERNS = (
+    "dockerfile*", "*.dockerfile", "docker-compose*", "compose.y*ml", "procfile", "makefile", "*.tf",
+    "*k8s*", "*kubernetes*", "*deployment*.y*ml", "*helm*", "*workflow*.y*ml", ".gitlab-ci*", "jenkinsfile",
+    "*.service", "nginx*.conf", "app.yaml", "vercel.json", "netlify.toml", "fly.toml", "render.yaml",
+)
+CONFIG_NAMES = ("requirements*.txt", "setup.py", "setup.cfg", "pyproject.toml", "package.json", "pipfile",
+                "environment.y*ml", ".env*", "*.lock")
+
+# import root / package name -> framework or library label
+FRAMEWORKS = {
+    "fastapi": "FastAPI", "flask": "Flask", "django": "Django", "streamlit": "Streamlit", "starlette": "Starlette",
+    "uvicorn": "Uvicorn", "pydantic": "Pydantic", "sqlalchemy": "SQLAlchemy", "celery": "Celery",
+    "pandas": "pandas", "numpy": "NumPy", "sklearn": "scikit-learn", "scikit-learn": "scikit-learn",
+    "torch": "PyTorch", "tensorflow": "TensorFlow", "keras": "Keras", "matplotlib": "Matplotlib",
+    "seaborn": "seaborn", "pytest": "pytest", "unittest": "unittest", "requests": "requests",
+    "google.generativeai": "Gemini SDK", "google-generativeai": "Gemini SDK", "openai": "OpenAI SDK",
+    "langchain": "LangChain", "fpdf": "FPDF", "fpdf2": "FPDF",
+    "react": "React", "vue": "Vue", "@angular/core": "Angular", "next": "Next.js", "express": "Express",
+    "jest": "Jest", "mocha": "Mocha", "vitest": "Vitest", "axios": "axios", "tailwindcss": "Tailwind CSS",
+}
+
+_JS_IMPORT = re.compile(r"""(?:import\s[^'"]*?from\s*|import\s*|require\(\s*)['"]([^'"]+)['"]""")
+_MD_HEADING = re.compile(r"^(#{1,3})\s+(.+?)\s*#*\s*$")
+_NUMBERED_HEADING = re.compile(r"^(\d+(?:\.\d+){0,2})\.?\s+([A-Z][^.:]{2,70})$")
+_REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9_.\-\[\]]+)")
+
+
+def file_kind(filename: str, content: str) -> str:
+    name = filename.lower()
+    ext = os.path.splitext(name)[1]
+    if content.startswith("[Binary file:"):
+        return "binary"
+    if any(fnmatch(name, p) for p in TEST_PATTERNS) and ext in CODE_EXTENSIONS:
+        return "test"
+    if any(fnmatch(name, p) for p in DEPLOY_PATTERNS):
+        return "deploy"
+    if any(fnmatch(name, p) for p in CONFIG_NAMES):
+        return "config"
+    if ext == ".ipynb":
+        return "notebook"
+    if ext in CODE_EXTENSIONS:
+        return "code"
+    if ext in DOC_EXTENSIONS:
+        return "doc"
+    if ext in DATA_EXTENSIONS:
+        return "data"
+    if ext in CONFIG_EXTENSIONS:
+        return "config"
+    return "other"
+
+
+def _python_facts(content: str) -> Tuple[List[str], List[str], int]:
+    """(imported modules, top-level symbols, test functions) of Python source"""
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError, RecursionError):
+        return [], [], 0
+    imports, symbols, tests = [], [], 0
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.append(node.module)
+        elif isinstance(node, ast.ImportFrom) and node.level:
+            imports += [node.module or alias.name for alias in node.names]
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test"):
+            tests += 1
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            methods = sum(isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) for n in node.body)
+            symbols.append(f"class {node.name} ({methods} methods)" if methods else f"class {node.name}")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            symbols.append(f"{node.name}()")
+    return imports, symbols, tests
+
+
+def _notebook_python(content: str) -> str:
+    """Code cells of an extracted notebook (see extraction.extract_notebook)"""
+    cells = re.split(r"^# \[(\w+) cell \d+\]\n", content, flags=re.M)
+    return "\n".join(body for kind, body in zip(cells[1::2], cells[2::2]) if kind == "code")
+
+
+def _js_facts(content: str) -> Tuple[List[str], int]:
+    tests = len(re.findall(r"\b(?:it|test)\s*\(\s*['\"`]", content))
+    return _JS_IMPORT.findall(content), tests
+
+
+def _declared_packages(filename: str, content: str) -> List[str]:
+    name = filename.lower()
+    if fnmatch(name, "requirements*.txt"):
+        return [m.group(1).split("[")[0].lower() for line in content.splitlines()
+                if not line.strip().startswith(("#", "-")) and (m := _REQUIREMENT_NAME.match(line))]
+    if name == "package.json":
+        return re.findall(r'"(@?[a-z0-9][\w.\-/]*)"\s*:\s*"[\^~<>=]*\d', content)
+    return []
+
+
+def _headings(content: str) -> List[str]:
+    headings = []
+    for line in content.splitlines():
+        match = _MD_HEADING.match(line)
+        if match:
+            headings.append("  " * (len(match.group(1)) - 1) + match.group(2))
+            continue
+        match = _NUMBERED_HEADING.match(line.strip())
+        if match:
+            headings.append("  " * match.group(1).count(".") + f"{match.group(1)} {match.group(2)}")
+    return headings[:MAX_HEADINGS_PER_DOC]
+
+
+def _local_target(reference: str, modules: Dict[str, str]) -> Optional[str]:
+    """The uploaded file an import refers to, if any (matched on module / file stem)"""
+    for candidate in (reference, reference.split(".")[0], reference.rsplit(".", 1)[-1],
+                      os.path.splitext(reference.rsplit("/", 1)[-1])[0]):
+        if candidate in modules:
+            return modules[candidate]
+    return None
+
+
+def build_digest(file_contents: Dict[str, str]) -> Dict:
+    """Static digest of the uploaded files (file_contents as given to the phases)"""
+    modules = {
+        os.path.splitext(name)[0]: name for name, content in file_contents.items()
+        if file_kind(name, content if isinstance(content, str) else "") in ("code", "test", "notebook")
+    }
+    files, edges, frameworks = [], set(), Counter()
+    tests = {"files": [], "test_functions": 0}
+    deployment, docs = [], {}
+
+    for name, content in file_contents.items():
+        content = content if isinstance(content, str) else ""
+        kind = file_kind(name, content)
+        ext = os.path.splitext(name.lower())[1]
+        entry = {"name": name, "kind": kind, "language": CODE_EXTENSIONS.get(ext, ext.lstrip(".") or "none"),
+                 "lines": content.count("\n") + 1, "chars": len(content), "symbols": []}
+        imports, test_count = [], 0
+        if entry["language"] in ("python", "notebook"):
+            source = _notebook_python(content) if kind == "notebook" else content
+            imports, entry["symbols"], test_count = _python_facts(source)
+            references = imports
+        elif entry["language"] in ("javascript", "typescript", "vue"):
+            imports, test_count = _js_facts(content)
+            references = [i for i in imports if i.startswith(".")]
+        else:
+            references = []
+        for reference in references:
+            target = _local_target(reference, modules)
+            if target and target != name:
+                edges.add((name, target))
+        for module in imports + _declared_packages(name, content):
+            module = module.lower()
+            label = FRAMEWORKS.get(module) or FRAMEWORKS.get(module.split(".")[0]) \
+                or FRAMEWORKS.get(".".join(module.split(".")[:2]))
+            if label:
+                frameworks[label] += 1
+
+        if kind == "test":
+            tests["files"].append(name)
+            tests["test_functions"] += test_count
+        elif kind == "deploy" or (kind == "config" and _declared_packages(name, content)):
+            deployment.append(name)
+        elif kind == "doc":
+            docs[name] = _headings(content)
+        files.append(entry)
+
+    return {
+        "files": files,
+        "edges": sorted([a, b] for a, b in edges),
+        "frameworks": [label for label, _ in frameworks.most_common()],
+        "tests": tests,
+        "deployment": deployment,
+        "docs": docs,
+        "overview": None,  # filled by summarize(), when enabled
+    }
+
+
+def _degree(digest: Dict) -> Counter:
+    degree = Counter()
+    for source, target in digest["edges"]:
+        degree[target] += 2  # imported by others: central
+        degree[source] += 1
+    return degree
+
+
+def render(digest: Dict) -> str:
+    """The digest as compact prompt text"""
+    files = digest["files"]
+    by_kind = Counter(f["kind"] for f in files)
+    lines = ["PROJECT DIGEST",
+             f"Files: {len(files)} (" + ", ".join(f"{n} {k}" for k, n in by_kind.most_common()) + ")"]
+    if digest.get("overview"):
+        lines += ["", "Overview:", digest["overview"].strip()]
+    lines += ["", "Frameworks / libraries: " + (", ".join(digest["frameworks"]) or "none detected")]
+
+    lines += ["", "File inventory (name | kind | language | lines | top-level symbols):"]
+    degree = _degree(digest)
+    ranked = sorted(files, key=lambda f: (-degree[f["name"]], f["kind"], f["name"]))
+    for f in ranked[:MAX_INVENTORY_FILES]:
+        symbols = f["symbols"][:MAX_SYMBOLS_PER_FILE]
+        more = len(f["symbols"]) - len(symbols)
+        line = f"- {f['name']} | {f['kind']} | {f['language']} | {f['lines']}"
+        if symbols:
+            line += " | " + ", ".join(symbols) + (f", +{more} more" if more > 0 else "")
+        lines.append(line)
+    if len(files) > MAX_INVENTORY_FILES:
+        lines.append(f"- ... {len(files) - MAX_INVENTORY_FILES} more files")
+
+    lines += ["", "Module graph (file -> uploaded files it imports):"]
+    targets: Dict[str, List[str]] = {}
+    for source, target in digest["edges"]:
+        targets.setdefault(source, []).append(target)
+    lines += [f"- {source} -> {', '.join(t)}" for source, t in sorted(targets.items())] or ["- no local imports"]
+
+    tests = digest["tests"]
+    lines += ["", f"Tests: {len(tests['files'])} test files, {tests['test_functions']} test functions"
+              + (": " + ", ".join(tests["files"][:30]) if tests["files"] else "")]
+    lines += ["Deployment / build artifacts: " + (", ".join(digest["deployment"]) or "none")]
+
+    lines += ["", "Documentation outline:"]
+    for name, headings in digest["docs"].items():
+        lines.append(f"- {name}" + ("" if headings else " (no headings)"))
+        lines += [f"    {h}" for h in headings]
+    if not digest["docs"]:
+        lines.append("- no documents")
+    return "\n".join(lines) + "\n"
+
+
+def excerpt_files(digest: Dict, kinds: Iterable[str], hints: Iterable[str] = ()) -> List[str]:
+    """
+    Files of the given kinds, most relevant first: names matching a hint
+    (fnmatch, case-insensitive) first, then by kind order, then by how
+    central they are in the module graph
+    """
+    kinds, hints = list(kinds), [h.lower() for h in hints]
+    degree = _degree(digest)
+
+    def rank(f: Dict):
+        hint = next((i for i, h in enumerate(hints) if fnmatch(f["name"].lower(), h)), len(hints))
+        return hint, kinds.index(f["kind"]), -degree[f["name"]], f["name"]
+
+    return [f["name"] for f in sorted((f for f in digest["files"] if f["kind"] in kinds), key=rank)]
+
+
+OVERVIEW_PROMPT = """You are preparing a shared briefing for reviewers who will assess a software project.
+Using the project digest and documentation excerpts below, write at most 150 words covering:
+the project's purpose, its main components and how they interact, and its technology stack.
+State facts only; do not score or recommend anything.
+
+{digest}
+DOCUMENTATION EXCERPTS:
+{docs}
+"""
+
+
+def overview_prompt(digest: Dict, file_contents: Dict[str, str]) -> str:
+    docs = "".join(
+        f"--- {name} ---\n{file_contents[name]}\n"
+        for name in excerpt_files(digest, ("doc",), ("readme*", "*srs*", "*requirement*", "*design*"))
+    )
+    return OVERVIEW_PROMPT.format(digest=render(digest), docs=truncate_to_tokens(docs, OVERVIEW_DOCS_TOKENS) or "none")
+
+
+def summarize(digest: Dict, file_contents: Dict[str, str], model) -> Optional[str]:
+    """The one model call of the digest stage: a short project overview"""
+    return model.generate_content(overview_prompt(digest, file_contents)).text.strip() or None
@@ -0,0 +1,122 @@
+"""
+Process pool for CPU-bound PDF rendering.
+
+FPDF layout (multi_cell over long analysis texts) holds the GIL for the whole
+render, so running it inside an async endpoint stalls every other request on
+the worker. Renders are shipped to a small process pool instead; the number
+of queued renders is bounded and excess work is rejected up front so the
+pool cannot accumulate an unbounded backlog.
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from metrics import (
+    PDF_RENDER_PENDING,
+    PDF_RENDER_QUEUE_WAIT_SECONDS,
+    PDF_RENDER_REJECTED,
+    PDF_RENDER_SECONDS,
+)
+
+
+class RenderQueueFull(Exception):
+    """Raised when every render worker is busy and the queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"PDF render queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _timed_call(fn: Callable, args: tuple):
+    """Runs inside the worker process: returns (result, started, finished)"""
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+
+def _preload(module: str):
+    """Runs inside the worker process: import a module ahead of the first task"""
+    importlib.import_module(module)
+
+
+class RenderPool:
+    """Bounded front-end to a lazily started ProcessPoolExecutor"""
+
+    def __init__(self, workers: int, max_queue: int, start_method: str = "spawn"):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._avg_render_seconds = 1.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                )
+            return self._executor
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    async def warm(self, module: str):
+        """
+        Start the worker processes and import `module` in them, so the first
+        render doesn't pay for process start-up and imports. Best effort: one
+        preload task per worker, which the pool usually spreads across all of them.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, _preload, module) for _ in range(self.workers)
+        ))
+
+    def _reserve(self):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                PDF_RENDER_REJECTED.inc()
+                waves = self._pending / self.workers
+                raise RenderQueueFull(max(1, int(round(waves * self._avg_render_seconds))))
+            self._pending += 1
+        PDF_RENDER_PENDING.inc()
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        PDF_RENDER_PENDING.dec()
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in a render worker; fn must be a picklable module-level function"""
+        self._reserve()
+        try:
+            submitted = time.time()
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+            render_seconds = finished - started
+            PDF_RENDER_QUEUE_WAIT_SECONDS.observe(max(0.0, started - submitted))
+            PDF_RENDER_SECONDS.observe(render_seconds)
+            # EWMA of render time, used to estimate Retry-After
+            self._avg_render_seconds = 0.8 * self._avg_render_seconds + 0.2 * render_seconds
+            return result
+        finally:
+            self._release()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,162 @@
+"""
+Size-bounded on-disk LRU cache of rendered PDF reports.
+
+Reports are keyed by a hash of the canonical request payload (plus the
+renderer version), which doubles as the HTTP ETag. Rendering is
+deterministic, so a hit can be served straight from disk and a client
+holding the ETag can be answered with 304 Not Modified.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from metrics import PDF_CACHE_BYTES, PDF_CACHE_LOOKUPS
+
+
+def payload_hash(payload: Dict, version: str = "") -> str:
+    """sha256 of the canonical JSON form of a report payload"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{version}\0{canonical}".encode("utf-8")).hexdigest()
+
+
+class PDFDiskCache:
+    """
+    Rendered PDFs stored as <dir>/<hash>.pdf. Access time is tracked with the
+    file mtime, and the least recently used files are removed once the
+    directory grows past max_bytes. Usage is measured from the directory
+    itself when a file is added, so the limit holds for all the workers
+    sharing it, not per process.
+
+    Temp files are only cleaned up once they are older than
+    stale_tmp_seconds: a fresh one may be a render another worker is still
+    writing.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, stale_tmp_seconds: float = 3600.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stale_tmp_seconds = stale_tmp_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.remove_stale_temp_files()
+        PDF_CACHE_BYTES.set(self.total_bytes)
+
+    def remove_stale_temp_files(self) -> int:
+        """Remove temp files left behind by renders that never finished"""
+        cutoff = time.time() - self.stale_tmp_seconds
+        removed = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                except OSError:
+                    continue  # adopted or discarded meanwhile
+                self.discard(entry.path)
+                removed += 1
+        return removed
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(mtime, key, size) of every cached PDF currently in the directory"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".pdf"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # evicted by another worker meanwhile
+                entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        return entries
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(size for _mtime, _key, size in self._scan())
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Path of the cached PDF (marked as recently used), or None. Files
+        another worker rendered into the same directory count as hits.
+        """
+        path = self.path_for(key)
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        else:
+            PDF_CACHE_LOOKUPS.inc(result="hit")
+            return path
+        PDF_CACHE_LOOKUPS.inc(result="miss")
+        return None
+
+    def open(self, key: str):
+        """
+        Open binary handle on the cached PDF (marked as recently used), or
+        None. The handle stays readable if the file is evicted afterwards.
+        """
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None  # evicted by another worker between get() and open()
+
+    def peek(self, key: str) -> Optional[str]:
+        """Path of the cached PDF if it exists, without counting a lookup"""
+        path = self.path_for(key)
+        return path if os.path.exists(path) else None
+
+    def put(self, key: str, data: bytes) -> str:
+        """Store atomically (temp file + rename) and evict if over budget"""
+        tmp_path = self.temp_path()
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return self.adopt(key, tmp_path)
+
+    def temp_path(self) -> str:
+        """Fresh temp file in the cache directory, for a renderer to write into"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        return tmp_path
+
+    def discard(self, tmp_path: str):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    def adopt(self, key: str, tmp_path: str) -> str:
+        """Move a file written by a renderer (see temp_path) into place"""
+        path = self.path_for(key)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._evict_locked(keep=key)
+        return path
+
+    def _evict_locked(self, keep: str):
+        entries = self._scan()
+        total = sum(size for _mtime, _key, size in entries)
+        for _mtime, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass  # already removed by another worker
+            total -= size
+        PDF_CACHE_BYTES.set(total)
@@ -0,0 +1,24 @@
+"""
+Report format constants and helpers that don't need FPDF.
+
+Split out of pdf_generator so the API process can compute cache keys and
+normalize timestamps without importing the PDF library; pdf_generator is
+only imported when something is actually rendered.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+# Bump whenever the layout changes so cached renders are invalidated
+RENDER_VERSION = "1"
+
+
+def parse_timestamp(timestamp: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO-8601 timestamp (as sent by the frontend), or None"""
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
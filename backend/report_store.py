@@ -0,0 +1,450 @@
+"""
+Embedded SQLite store for reports sent to reviewers.
+
+Each submission keeps its metadata, per-phase scores and the rendered PDF
+blob, so reviewers never trigger a re-render. PDFs are read back in chunks
+through incremental blob I/O instead of being loaded whole. Listing queries
+use keyset pagination along the (status,) timestamp / score indexes: a page
+is an index range scan plus one row lookup per listed report, so its cost
+stays O(page size) no matter how many reports have accumulated. The "weak
+in phase X" filter looks up the matching report ids with a range scan of
+the per-phase score index and checks each scanned report against them.
+
+The same database holds the delivery outbox: a submission and its outbox
+row are written in one transaction, and the dispatcher (see outbox.py)
+claims due rows with a lease so a crashed worker's batch is retried.
+"""
+
+import base64
+import json
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id             TEXT PRIMARY KEY,
+    report_key     TEXT NOT NULL,
+    status         TEXT NOT NULL DEFAULT 'pending',
+    submitted_at   TEXT NOT NULL,
+    overall_score  REAL NOT NULL,
+    files_analyzed TEXT NOT NULL,
+    payload        TEXT NOT NULL,
+    pdf            BLOB,
+    pdf_size       INTEGER,
+    created_at     REAL NOT NULL,
+    updated_at     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_phases (
+    report_id TEXT NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    phase     TEXT NOT NULL,
+    score     REAL NOT NULL,
+    PRIMARY KEY (report_id, phase)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_status_time ON reports(status, submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_reports_time ON reports(submitted_at, id);
+CREATE INDEX IF NOT EXISTS idx_reports_status_score ON reports(status, overall_score, id);
+CREATE INDEX IF NOT EXISTS idx_reports_score ON reports(overall_score, id);
+CREATE INDEX IF NOT EXISTS idx_reports_key ON reports(report_key);
+CREATE INDEX IF NOT EXISTS idx_report_phases_score ON report_phases(phase, score);
+CREATE TABLE IF NOT EXISTS outbox (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id       TEXT NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until     REAL,
+    last_error      TEXT,
+    created_at      REAL NOT NULL,
+    delivered_at    REAL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+"""
+
+OUTBOX_STATUSES = ("pending", "in_flight", "delivered", "failed")
+
+REPORT_STATUSES = ("pending", "in_review", "approved", "rejected")
+
+# sort name -> column used for keyset pagination (always newest / highest first)
+_SORT_COLUMNS = {"timestamp": "submitted_at", "score": "overall_score"}
+
+_BLOB_CHUNK_SIZE = 64 * 1024
+
+_LIST_COLUMNS = "id, report_key, status, submitted_at, overall_score, files_analyzed, pdf_size"
+
+
+class ReportNotFound(KeyError):
+    pass
+
+
+class ReportNotReady(Exception):
+    """The report exists but its PDF has not been rendered yet"""
+
+
+class IdempotencyConflict(Exception):
+    """An outbox key was reused for a different report"""
+
+
+class PDFBlobReader:
+    """
+    Read-only file-like view of a stored PDF. Every read() opens the blob
+    under the store lock for that chunk only, so a slow consumer never holds
+    the connection.
+    """
+
+    def __init__(self, store: "ReportStore", rowid: int, size: int):
+        self._store = store
+        self._rowid = rowid
+        self.size = size
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        remaining = self.size - self._position
+        if size < 0 or size > remaining:
+            size = remaining
+        if size <= 0:
+            return b""
+        with self._store._lock:
+            with self._store._conn.blobopen("reports", "pdf", self._rowid, readonly=True) as blob:
+                blob.seek(self._position)
+                data = blob.read(size)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = {0: 0, 1: self._position, 2: self.size}[whence]
+        self._position = max(0, min(self.size, base + offset))
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _encode_cursor(value, report_id: str) -> str:
+    raw = json.dumps([value, report_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[object, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        value, report_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return value, report_id
+
+
+class ReportStore:
+    """Thread-safe wrapper around one SQLite connection (WAL mode)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def ping(self):
+        """Raises if the database can't be queried"""
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+
+    # ---- writes ----
+    def add_report(
+        self,
+        report_key: str,
+        submitted_at: str,
+        overall_score: float,
+        files_analyzed: List[str],
+        payload: Dict,
+        pdf: Optional[bytes],
+        status: str = "pending",
+        outbox_key: Optional[str] = None,
+    ) -> str:
+        """
+        Insert a report. With outbox_key, an outbox row is written in the same
+        transaction; resubmitting the same key returns the existing report id,
+        or raises IdempotencyConflict if that report has a different report_key.
+        """
+        report_id = uuid.uuid4().hex
+        now = time.time()
+        phases = payload.get("analysisResults", {}).get("phases", {}) or {}
+        existing = None
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if outbox_key is not None:
+                    existing = self._conn.execute(
+                        "SELECT o.report_id, r.report_key FROM outbox o JOIN reports r ON r.id = o.report_id"
+                        " WHERE o.idempotency_key = ?", (outbox_key,)
+                    ).fetchone()
+                if existing is None:
+                    self._conn.execute(
+                        "INSERT INTO reports (id, report_key, status, submitted_at, overall_score, files_analyzed,"
+                        " payload, pdf, pdf_size, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (report_id, report_key, status, submitted_at, float(overall_score),
+                         json.dumps(files_analyzed), json.dumps(payload),
+                         pdf, len(pdf) if pdf is not None else None, now, now),
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO report_phases (report_id, phase, score) VALUES (?, ?, ?)",
+                        [(report_id, phase, float((data or {}).get("score") or 0)) for phase, data in phases.items()],
+                    )
+                    if outbox_key is not None:
+                        self._conn.execute(
+                            "INSERT INTO outbox (report_id, idempotency_key, next_attempt_at, created_at)"
+                            " VALUES (?, ?, ?, ?)",
+                            (report_id, outbox_key, now, now),
+                        )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if existing is not None:
+            if existing["report_key"] != report_key:
+                raise IdempotencyConflict(outbox_key)
+            return existing["report_id"]
+        return report_id
+
+    def attach_pdf(self, report_id: str, pdf: BinaryIO, size: int):
+        """Store a PDF read from an open file, copied into the blob in chunks"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE reports SET pdf = zeroblob(?), pdf_size = ?, updated_at = ? WHERE id = ?",
+                    (size, size, time.time(), report_id),
+                )
+                row = self._conn.execute("SELECT rowid FROM reports WHERE id = ?", (report_id,)).fetchone()
+                if row is None:
+                    raise ReportNotFound(report_id)
+                with self._conn.blobopen("reports", "pdf", row["rowid"]) as blob:
+                    shutil.copyfileobj(pdf, blob, _BLOB_CHUNK_SIZE)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def set_status(self, report_id: str, status: str):
+        if status not in REPORT_STATUSES:
+            raise ValueError(f"Unknown status {status!r}")
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE reports SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), report_id)
+            )
+        if cur.rowcount == 0:
+            raise ReportNotFound(report_id)
+
+    # ---- reads ----
+    def get_report(self, report_id: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_LIST_COLUMNS}, payload FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+            if row is None:
+                raise ReportNotFound(report_id)
+            phases = self._conn.execute(
+                "SELECT phase, score FROM report_phases WHERE report_id = ? ORDER BY phase", (report_id,)
+            ).fetchall()
+        report = self._row_to_summary(row)
+        report["phaseScores"] = {p["phase"]: p["score"] for p in phases}
+        report["payload"] = json.loads(row["payload"])
+        report["delivery"] = self.delivery_status(report_id)
+        return report
+
+    def open_pdf(self, report_id: str) -> Tuple[PDFBlobReader, str]:
+        """(reader over the stored PDF, report_key)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT rowid, pdf_size, report_key FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+        if row is None:
+            raise ReportNotFound(report_id)
+        if row["pdf_size"] is None:
+            raise ReportNotReady(report_id)
+        return PDFBlobReader(self, row["rowid"], row["pdf_size"]), row["report_key"]
+
+    def resolve_id(self, id_or_key: str) -> Optional[str]:
+        """
+        Report id for a report id or report key (the /generate-pdf ETag);
+        for a key, the newest report with a stored PDF is preferred
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM reports WHERE id = ?", (id_or_key,)).fetchone()
+            if row is None:
+                row = self._conn.execute(
+                    "SELECT id FROM reports WHERE report_key = ?"
+                    " ORDER BY pdf_size IS NULL, created_at DESC LIMIT 1", (id_or_key,)
+                ).fetchone()
+        return row["id"] if row is not None else None
+
+    def has_pdf(self, report_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT pdf_size FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return row is not None and row["pdf_size"] is not None
+
+    # ---- outbox ----
+    def claim_outbox(self, limit: int, lease_seconds: float) -> List[Dict]:
+        """
+        Lease up to `limit` due deliveries (pending, or in flight with an
+        expired lease) and return them oldest first.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT o.id, o.report_id, o.idempotency_key, o.attempts, r.payload, r.report_key"
+                    " FROM outbox o JOIN reports r ON r.id = o.report_id"
+                    " WHERE (o.status = 'pending' AND o.next_attempt_at <= ?)"
+                    "    OR (o.status = 'in_flight' AND o.lease_until <= ?)"
+                    " ORDER BY o.next_attempt_at, o.id LIMIT ?",
+                    (now, now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'in_flight', lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(now + lease_seconds, r["id"]) for r in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [
+            {
+                "id": r["id"],
+                "reportId": r["report_id"],
+                "idempotencyKey": r["idempotency_key"],
+                "attempts": r["attempts"] + 1,
+                "reportKey": r["report_key"],
+                "payload": json.loads(r["payload"]),
+            }
+            for r in rows
+        ]
+
+    def mark_delivered(self, outbox_ids: List[int]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'delivered', delivered_at = ?, lease_until = NULL, last_error = NULL"
+                " WHERE id = ?",
+                [(now, i) for i in outbox_ids],
+            )
+
+    def mark_retry(self, outbox_id: int, error: str, next_attempt_at: Optional[float]):
+        """Schedule another attempt, or fail permanently when next_attempt_at is None"""
+        with self._lock:
+            if next_attempt_at is None:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'failed', lease_until = NULL, last_error = ? WHERE id = ?",
+                    (error, outbox_id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE outbox SET status = 'pending', lease_until = NULL, last_error = ?, next_attempt_at = ?"
+                    " WHERE id = ?",
+                    (error, next_attempt_at, outbox_id),
+                )
+
+    def outbox_counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        counts = {status: 0 for status in OUTBOX_STATUSES}
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
+
+    def delivery_status(self, report_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, attempts, last_error, delivered_at FROM outbox WHERE report_id = ?", (report_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "lastError": row["last_error"],
+            "deliveredAt": row["delivered_at"],
+        }
+
+    def list_reports(
+        self,
+        status: Optional[str] = None,
+        sort: str = "timestamp",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        phase: Optional[str] = None,
+        max_phase_score: Optional[float] = None,
+    ) -> Dict:
+        """
+        One page of report summaries, newest (or highest score) first.
+        Pass the returned nextCursor to fetch the following page. With phase
+        (and max_phase_score), only reports whose score in that phase is at
+        most max_phase_score are listed, e.g. the ones weak in testing.
+        """
+        column = _SORT_COLUMNS.get(sort)
+        if column is None:
+            raise ValueError(f"Unknown sort {sort!r}")
+        if max_phase_score is not None and phase is None:
+            raise ValueError("max_phase_score needs a phase")
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if phase is not None:
+            # range scan of idx_report_phases_score
+            subquery = "SELECT report_id FROM report_phases WHERE phase = ?"
+            params.append(phase)
+            if max_phase_score is not None:
+                subquery += " AND score <= ?"
+                params.append(float(max_phase_score))
+            where.append(f"id IN ({subquery})")
+        if cursor:
+            value, last_id = _decode_cursor(cursor)
+            where.append(f"({column}, id) < (?, ?)")
+            params.extend([value, last_id])
+        sql = f"SELECT {_LIST_COLUMNS} FROM reports"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {column} DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        page = [self._row_to_summary(r) for r in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = _encode_cursor(last[column], last["id"])
+        return {"reports": page, "nextCursor": next_cursor}
+
+    @staticmethod
+    def _row_to_summary(row) -> Dict:
+        return {
+            "id": row["id"],
+            "reportKey": row["report_key"],
+            "status": row["status"],
+            "timestamp": row["submitted_at"],
+            "overallScore": row["overall_score"],
+            "filesAnalyzed": json.loads(row["files_analyzed"]),
+            "pdfSize": row["pdf_size"],
+        }
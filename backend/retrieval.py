@@ -0,0 +1,218 @@
+"""
+Chunked BM25 index over uploaded file contents, used to ground /chat answers.
+
+Files are split into line-aligned chunks and indexed lexically. The index is
+updated incrementally: only files whose content hash changed are re-chunked,
+and corpus statistics (postings per term, average length) are adjusted
+in place, so upload cost is proportional to what was uploaded. A query
+scores only the chunks in its terms' postings, not the whole corpus.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from tokens import estimate_tokens
+from workspace import scan_manifest, read_text
+
+# Chunking / ranking parameters (tunable)
+CHUNK_MAX_CHARS = 1500
+CHUNK_OVERLAP_LINES = 2
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or "
+    "that the this to was were what when where which who why will with you "
+    "your do does can should".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; snake_case splits naturally and camelCase is split too"""
+    terms = []
+    for word in _WORD_RE.findall(text):
+        lower = word.lower()
+        if lower not in _STOPWORDS:
+            terms.append(lower)
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            terms.extend(p.lower() for p in parts if p.lower() not in _STOPWORDS)
+    return terms
+
+
+@dataclass
+class Chunk:
+    filename: str
+    start_line: int
+    end_line: int
+    text: str
+    term_freqs: Counter = field(repr=False, default_factory=Counter)
+    length: int = 0
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def _split_line(line: str) -> List[str]:
+    """A line cut into pieces of at most CHUNK_MAX_CHARS, at whitespace where possible"""
+    pieces = []
+    while len(line) > CHUNK_MAX_CHARS:
+        cut = line.rfind(" ", CHUNK_MAX_CHARS // 2, CHUNK_MAX_CHARS)
+        cut = cut + 1 if cut > 0 else CHUNK_MAX_CHARS
+        pieces.append(line[:cut])
+        line = line[cut:]
+    pieces.append(line)
+    return pieces
+
+
+def chunk_text(filename: str, text: str) -> List[Chunk]:
+    """
+    Split text into chunks of at most CHUNK_MAX_CHARS, on line boundaries.
+    Lines longer than that (minified code, long data rows) are split across
+    consecutive chunks, which then share the line number.
+    """
+    segments = [
+        (number, piece)
+        for number, line in enumerate(text.splitlines(), start=1)
+        for piece in _split_line(line)
+    ]
+    chunks: List[Chunk] = []
+    start = 0
+    while start < len(segments):
+        size = 0
+        end = start
+        while end < len(segments) and (size == 0 or size + len(segments[end][1]) + 1 <= CHUNK_MAX_CHARS):
+            size += len(segments[end][1]) + 1
+            end += 1
+        body = "\n".join(piece for _number, piece in segments[start:end])
+        if body.strip():
+            terms = tokenize(body)
+            chunks.append(Chunk(filename, segments[start][0], segments[end - 1][0], body, Counter(terms), len(terms)))
+        if end >= len(segments):
+            break
+        start = max(end - CHUNK_OVERLAP_LINES, start + 1)
+    return chunks
+
+
+class BM25Index:
+    """Incrementally maintained BM25 index over file chunks"""
+
+    def __init__(self, text_loader: Callable[[str], Optional[str]] = read_text):
+        self._text_loader = text_loader
+        self._lock = threading.RLock()
+        self._files: Dict[str, str] = {}          # filename -> sha256 indexed
+        self._chunks: Dict[str, List[Chunk]] = {}  # filename -> chunks
+        self._postings: Dict[str, Dict[int, Chunk]] = {}  # term -> chunks containing it, by id()
+        self._total_length = 0
+        self._num_chunks = 0
+
+    # ---- maintenance ----
+    def _remove_locked(self, filename: str):
+        for chunk in self._chunks.pop(filename, []):
+            for term in chunk.term_freqs:
+                posting = self._postings[term]
+                del posting[id(chunk)]
+                if not posting:
+                    del self._postings[term]
+            self._total_length -= chunk.length
+            self._num_chunks -= 1
+        self._files.pop(filename, None)
+
+    def _add_locked(self, filename: str, sha256: str, text: str):
+        chunks = chunk_text(filename, text)
+        for chunk in chunks:
+            for term in chunk.term_freqs:
+                self._postings.setdefault(term, {})[id(chunk)] = chunk
+            self._total_length += chunk.length
+        self._num_chunks += len(chunks)
+        self._chunks[filename] = chunks
+        self._files[filename] = sha256
+
+    def sync(self, upload_dir: str) -> Dict[str, int]:
+        """
+        Bring the index in line with upload_dir. Unchanged files are skipped,
+        changed files are re-chunked and deleted files are dropped.
+        """
+        manifest = scan_manifest(upload_dir)
+        added = removed = 0
+        with self._lock:
+            for filename in list(self._files):
+                if filename not in manifest:
+                    self._remove_locked(filename)
+                    removed += 1
+            for filename, entry in manifest.items():
+                if self._files.get(filename) == entry.sha256:
+                    continue
+                text = self._text_loader(os.path.join(upload_dir, filename))
+                self._remove_locked(filename)
+                if text is None:
+                    # binary files are remembered so they are not re-read every sync
+                    self._files[filename] = entry.sha256
+                    self._chunks[filename] = []
+                    continue
+                self._add_locked(filename, entry.sha256, text)
+                added += 1
+        return {"indexed": added, "removed": removed}
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._chunks.clear()
+            self._postings.clear()
+            self._total_length = 0
+            self._num_chunks = 0
+
+    # ---- querying ----
+    def search(self, query: str, top_k: int = 8, token_budget: int = 2000) -> List[Chunk]:
+        """Best-scoring chunks for query, greedily packed into token_budget"""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._num_chunks:
+                return []
+            avg_len = self._total_length / self._num_chunks
+            postings = {t: self._postings[t] for t in terms if t in self._postings}
+            if not postings:
+                return []
+
+            # only chunks containing a query term can score above zero
+            scores: Dict[int, float] = {}
+            candidates: Dict[int, Chunk] = {}
+            for term, posting in postings.items():
+                df = len(posting)
+                idf = math.log(1 + (self._num_chunks - df + 0.5) / (df + 0.5))
+                for key, chunk in posting.items():
+                    tf = chunk.term_freqs[term]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk.length / avg_len)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    candidates[key] = chunk
+            scored = [(score, candidates[key]) for key, score in scores.items() if score > 0]
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        selected, used = [], 0
+        for _score, chunk in scored:
+            if len(selected) >= top_k:
+                break
+            if used + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used += chunk.tokens
+        return selected
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._files), "chunks": self._num_chunks, "terms": len(self._postings)}
+
+
+def format_excerpts(chunks: List[Chunk]) -> str:
+    """Render retrieved chunks for inclusion in a prompt"""
+    return "\n\n".join(
+        f"--- {c.filename} (lines {c.start_line}-{c.end_line}) ---\n{c.text}" for c in chunks
+    )
@@ -0,0 +1,183 @@
+"""
+Priority scheduling of the shared LLM thread pool.
+
+Chat questions, interactive analyses and batch / API analyses all make
+their model calls on one bounded pool. First come, first served, a single
+six-phase analysis queues six calls ahead of the next chat question and
+chat feels frozen until they are done. PriorityExecutor keeps one queue per
+priority class instead, and whenever a worker is free it runs:
+
+1. the oldest call that has waited aging_seconds or more, whatever its
+   class - so low-weight work is delayed, never starved
+2. otherwise the head of the class that is furthest behind its weighted
+   share (stride scheduling): with weights 8:3:1, busy chat, analysis and
+   batch queues get 8, 3 and 1 of every 12 calls started
+
+A class never occupies more than its limit of workers, which keeps workers
+free for the others: batch work can leave room for interactive analyses,
+and both can leave room for chat.
+
+It is a concurrent.futures.Executor; for_class(name) is the executor view
+that submits into a given class (plain submit() uses default_class).
+Cancelled futures are dropped from the queues without running.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from metrics import LLM_SCHEDULER_AGED, LLM_SCHEDULER_QUEUED, LLM_SCHEDULER_WAIT_SECONDS
+
+
+class _WorkItem:
+    __slots__ = ("future", "fn", "args", "kwargs", "enqueued")
+
+    def __init__(self, future: Future, fn: Callable, args: tuple, kwargs: dict):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued = time.monotonic()
+
+
+class PriorityClass:
+    def __init__(self, name: str, weight: float, limit: int):
+        if weight <= 0:
+            raise ValueError(f"Priority class {name!r} needs a positive weight")
+        self.name = name
+        self.weight = weight
+        self.limit = max(0, limit)  # 0: may use every worker
+        self.queue: Deque[_WorkItem] = deque()
+        self.running = 0
+        self.pass_value = 0.0  # stride scheduling: advances by 1/weight per call started
+
+    def eligible(self) -> bool:
+        return bool(self.queue) and (not self.limit or self.running < self.limit)
+
+
+class PriorityExecutor(Executor):
+    """Thread pool that starts queued calls by priority class; see the module docstring"""
+
+    def __init__(self, max_workers: int, classes: Dict[str, Tuple[float, int]], default_class: str,
+                 aging_seconds: float = 30.0, thread_name_prefix: str = "llm"):
+        if default_class not in classes:
+            raise ValueError(f"Unknown default priority class {default_class!r}")
+        self.max_workers = max(1, max_workers)
+        self.classes = {name: PriorityClass(name, weight, limit) for name, (weight, limit) in classes.items()}
+        self.default_class = default_class
+        self.aging_seconds = aging_seconds
+        self.thread_name_prefix = thread_name_prefix
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._virtual = 0.0  # pass value of the last class picked by weight
+        self._shutdown = False
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self.submit_to(self.default_class, fn, *args, **kwargs)
+
+    def submit_to(self, name: str, fn, /, *args, **kwargs) -> Future:
+        priority = self.classes[name]
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if not priority.queue and not priority.running:
+                # an idle class rejoins at the current virtual time, without credit saved up while idle
+                priority.pass_value = max(priority.pass_value, self._virtual)
+            priority.queue.append(_WorkItem(future, fn, args, kwargs))
+            LLM_SCHEDULER_QUEUED.set(len(priority.queue), priority=name)
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name=f"{self.thread_name_prefix}_{len(self._threads)}",
+                                          daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def for_class(self, name: str) -> "ClassExecutor":
+        if name not in self.classes:
+            raise ValueError(f"Unknown priority class {name!r}")
+        return ClassExecutor(self, name)
+
+    def _next(self) -> Optional[Tuple[PriorityClass, _WorkItem]]:
+        """Pick the next call to start (lock held)"""
+        for priority in self.classes.values():
+            while priority.queue and priority.queue[0].future.cancelled():
+                priority.queue.popleft()
+        eligible = [p for p in self.classes.values() if p.eligible()]
+        if not eligible:
+            return None
+        now = time.monotonic()
+        aged = [p for p in eligible if now - p.queue[0].enqueued >= self.aging_seconds]
+        if aged:
+            priority = min(aged, key=lambda p: p.queue[0].enqueued)
+            LLM_SCHEDULER_AGED.inc(priority=priority.name)
+        else:
+            priority = min(eligible, key=lambda p: (p.pass_value, -p.weight))
+            self._virtual = priority.pass_value
+        priority.pass_value += 1.0 / priority.weight
+        item = priority.queue.popleft()
+        priority.running += 1
+        LLM_SCHEDULER_QUEUED.set(len(priority.queue), priority=priority.name)
+        LLM_SCHEDULER_WAIT_SECONDS.observe(now - item.enqueued, priority=priority.name)
+        return priority, item
+
+    def _work(self):
+        while True:
+            with self._cond:
+                picked = self._next()
+                while picked is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    picked = self._next()
+            priority, item = picked
+            try:
+                if item.future.set_running_or_notify_cancel():
+                    try:
+                        result = item.fn(*item.args, **item.kwargs)
+                    except BaseException as e:
+                        item.future.set_exception(e)
+                    else:
+                        item.future.set_result(result)
+            finally:
+                with self._cond:
+                    priority.running -= 1
+                    # a class below its limit again may unblock a waiting worker
+                    self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._cond:
+            return {
+                name: {"queued": len(p.queue), "running": p.running, "weight": p.weight, "limit": p.limit}
+                for name, p in self.classes.items()
+            }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for priority in self.classes.values():
+                    while priority.queue:
+                        priority.queue.popleft().future.cancel()
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+class ClassExecutor(Executor):
+    """The PriorityExecutor as seen by one priority class"""
+
+    def __init__(self, executor: PriorityExecutor, name: str):
+        self._executor = executor
+        self.name = name
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return self._executor.submit_to(self.name, fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        pass  # the pool is shared; shut down the PriorityExecutor itself
@@ -0,0 +1,515 @@
+"""
+Shared state for several uvicorn workers on one node.
+
+Every worker process has its own memory: a cache filled by one worker is a
+miss on the others, and two workers can run the same analysis at the same
+time. A StateBackend is a small key/value store (JSON values, optional TTL)
+with leased locks that all workers of a node share:
+
+- SQLiteBackend: a WAL database file that every worker opens directly.
+- SocketBackend: client of StateServer, an in-memory server on a unix
+  socket (or a localhost TCP port), run next to the workers with
+      python shared_state.py --listen unix:/tmp/sdlc-state.sock
+- MemoryBackend: process-local; the default for a single worker, and what
+  StateServer serves.
+
+It holds workspace manifests (file hashes), analysis results, chat answers
+and in-flight locks. InflightGuard uses the locks so that one worker runs
+an expensive computation while the others wait and read its result.
+
+Backend errors are logged and counted and degrade to a cache miss or an
+uncontended lock: losing the shared state costs duplicate work, never a
+failed request. ping() is the exception, it raises (used by /readyz).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import INFLIGHT_DEDUP, SHARED_STATE_OPS
+
+logger = logging.getLogger("sdlc.shared_state")
+
+DEFAULT_SOCKET = "unix:/tmp/sdlc-state.sock"
+
+# Operations a backend implements as _<op>(); also the StateServer protocol
+OPS = ("get", "get_many", "set", "set_many", "delete", "acquire", "release", "ping")
+
+
+class StateError(Exception):
+    """The state backend answered with an error"""
+
+
+_BACKEND_ERRORS = (OSError, sqlite3.Error, StateError, ValueError)
+
+
+class StateBackend:
+    """Namespaced key/value store with TTLs and leased locks"""
+
+    name = "state"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        return self._safe("get", None, namespace, key)
+
+    def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, Any]:
+        return self._safe("get_many", {}, namespace, list(keys))
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        self._safe("set", None, namespace, key, value, ttl)
+
+    def set_many(self, namespace: str, items: Dict[str, Any], ttl: Optional[float] = None):
+        if items:
+            self._safe("set_many", None, namespace, items, ttl)
+
+    def delete(self, namespace: str, key: str):
+        self._safe("delete", None, namespace, key)
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take (or renew, for the same owner) a lock that expires after ttl seconds"""
+        return self._safe("acquire", True, name, owner, ttl)
+
+    def release(self, name: str, owner: str):
+        self._safe("release", None, name, owner)
+
+    def ping(self):
+        """Raises if the backend can't be reached"""
+        self._invoke("ping")
+
+    def close(self):
+        pass
+
+    def _invoke(self, op: str, *args):
+        if op not in OPS:
+            raise StateError(f"Unknown operation {op!r}")
+        return getattr(self, "_" + op)(*args)
+
+    def _safe(self, op: str, fallback, *args):
+        try:
+            result = self._invoke(op, *args)
+        except _BACKEND_ERRORS as e:
+            SHARED_STATE_OPS.inc(backend=self.name, op=op, result="error")
+            logger.warning("shared state %s via %s failed: %s", op, self.name, e)
+            return fallback
+        SHARED_STATE_OPS.inc(backend=self.name, op=op, result="ok")
+        return result
+
+    def _get(self, namespace, key):
+        return self._get_many(namespace, [key]).get(key)
+
+    def _set(self, namespace, key, value, ttl):
+        self._set_many(namespace, {key: value}, ttl)
+
+    def _ping(self):
+        return True
+
+
+class MemoryBackend(StateBackend):
+    """
+    Process-local store, LRU-bounded. Values are kept JSON-encoded so they
+    behave exactly as with the other backends (no shared mutable objects).
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Tuple[str, str], Tuple[str, Optional[float]]]" = OrderedDict()
+        self._locks: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _get_many(self, namespace, keys):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._data.get((namespace, key))
+                if item is None:
+                    continue
+                value, expires_at = item
+                if expires_at is not None and expires_at <= now:
+                    del self._data[(namespace, key)]
+                    continue
+                self._data.move_to_end((namespace, key))
+                found[key] = json.loads(value)
+        return found
+
+    def _set_many(self, namespace, items, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        encoded = {key: json.dumps(value) for key, value in items.items()}
+        with self._lock:
+            for key, value in encoded.items():
+                self._data[(namespace, key)] = (value, expires_at)
+                self._data.move_to_end((namespace, key))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    def _acquire(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            holder = self._locks.get(name)
+            if holder is not None and holder[0] != owner and holder[1] > now:
+                return False
+            self._locks[name] = (owner, now + ttl)
+            if len(self._locks) > 1024:
+                # holders that died without releasing
+                for stale in [n for n, (_o, exp) in self._locks.items() if exp <= now]:
+                    del self._locks[stale]
+            return True
+
+    def _release(self, name, owner):
+        with self._lock:
+            holder = self._locks.get(name)
+            if holder is not None and holder[0] == owner:
+                del self._locks[name]
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_state (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE TABLE IF NOT EXISTS shared_locks (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Stay below SQLite's host-parameter limit in IN (...) lookups
+_MAX_PARAMS = 500
+
+
+class SQLiteBackend(StateBackend):
+    """Shared SQLite database in WAL mode; each worker has its own connection"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, purge_every: int = 500):
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _get_many(self, namespace, keys):
+        now = time.time()
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _MAX_PARAMS):
+                batch = keys[start:start + _MAX_PARAMS]
+                rows = self._conn.execute(
+                    "SELECT key, value FROM shared_state WHERE namespace = ?"
+                    f" AND key IN ({', '.join('?' * len(batch))})"
+                    " AND (expires_at IS NULL OR expires_at > ?)",
+                    [namespace, *batch, now],
+                ).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def _set_many(self, namespace, items, ttl):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        rows = [(namespace, key, json.dumps(value), expires_at) for key, value in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (namespace, key) DO UPDATE SET"
+                " value = excluded.value, expires_at = excluded.expires_at",
+                rows,
+            )
+            self._writes += len(rows)
+            if self._writes >= self.purge_every:
+                self._writes = 0
+                self._conn.execute("DELETE FROM shared_state WHERE expires_at <= ?", (now,))
+                self._conn.execute("DELETE FROM shared_locks WHERE expires_at <= ?", (now,))
+
+    def _delete(self, namespace, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _acquire(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            # one statement, so two workers can't both see the lock as free
+            cursor = self._conn.execute(
+                "INSERT INTO shared_locks (name, owner, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+                " WHERE shared_locks.expires_at <= ? OR shared_locks.owner = excluded.owner",
+                (name, owner, now + ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def _release(self, name, owner):
+        with self._lock:
+            self._conn.execute("DELETE FROM shared_locks WHERE name = ? AND owner = ?", (name, owner))
+
+    def _ping(self):
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+        return True
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """'unix:/path/to.sock' or '[tcp:]host:port' -> (socket family, address)"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.removeprefix("tcp:").rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+class SocketBackend(StateBackend):
+    """
+    Client of a StateServer: one JSON request per line, one connection per
+    thread (reconnecting once if the server went away).
+    """
+
+    name = "socket"
+
+    def __init__(self, address: str, timeout: float = 2.0):
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        family, target = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(target)
+        except OSError:
+            sock.close()
+            raise
+        with self._lock:
+            self._connections.append(sock)
+        return sock, sock.makefile("rwb")
+
+    def _disconnect(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            sock, stream = conn
+            with self._lock:
+                if sock in self._connections:
+                    self._connections.remove(sock)
+            for closeable in (stream, sock):
+                try:
+                    closeable.close()
+                except OSError:
+                    pass
+
+    def _invoke(self, op: str, *args):
+        payload = (json.dumps({"op": op, "args": args}) + "\n").encode("utf-8")
+        for attempt in (1, 2):
+            try:
+                if getattr(self._local, "conn", None) is None:
+                    self._local.conn = self._connect()
+                _sock, stream = self._local.conn
+                stream.write(payload)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("state server closed the connection")
+                break
+            except OSError:
+                self._disconnect()
+                if attempt == 2:
+                    raise
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise StateError(reply.get("error", "unknown error"))
+        return reply.get("result")
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for sock in connections:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class StateServer:
+    """Serves a MemoryBackend to SocketBackend clients"""
+
+    def __init__(self, address: str, max_entries: int = 100000):
+        self.address = address
+        self.backend = MemoryBackend(max_entries)
+        backend = self.backend
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        reply = {"ok": True, "result": backend._invoke(request["op"], *request.get("args", []))}
+                    except Exception as e:
+                        reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                    self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+
+        family, target = parse_address(address)
+        if family == socket.AF_UNIX:
+            self._claim_socket_path(target)
+            self.server = _UnixServer(target, Handler)
+        else:
+            self.server = _TCPServer(target, Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _claim_socket_path(path: str):
+        if not os.path.exists(path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)  # left behind by a server that is gone
+        else:
+            raise RuntimeError(f"A state server is already listening on {path}")
+        finally:
+            probe.close()
+
+    def start(self):
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name="state-server", daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        family, target = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+
+def make_backend(kind: str, target: str = "") -> StateBackend:
+    if kind == "memory":
+        return MemoryBackend()
+    if kind == "sqlite":
+        return SQLiteBackend(target)
+    if kind == "socket":
+        return SocketBackend(target or DEFAULT_SOCKET)
+    raise ValueError(f"Unknown state backend {kind!r} (expected memory, sqlite or socket)")
+
+
+class InflightGuard:
+    """
+    Cross-worker single flight. run(key, lookup, compute) returns what
+    lookup() finds; otherwise one caller per key, across all workers that
+    share the backend, runs compute() (which must store its result where
+    lookup() finds it) while the others poll lookup(). The lock is a lease
+    renewed while compute() runs, so a worker that dies only holds up the
+    others until the lease expires and one of them takes over.
+    """
+
+    def __init__(self, backend: StateBackend, kind: str, lease_seconds: float = 30.0,
+                 poll_seconds: float = 0.25, wait_seconds: float = 600.0):
+        self.backend = backend
+        self.kind = kind
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.wait_seconds = wait_seconds
+
+    async def run(self, key: str, lookup: Callable[[], Awaitable[Optional[Any]]],
+                  compute: Callable[[], Awaitable[Any]]) -> Any:
+        lock = f"{self.kind}:{key}"
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        deadline = time.monotonic() + self.wait_seconds
+        waited = False
+        while True:
+            found = await lookup()
+            if found is not None:
+                if waited:
+                    INFLIGHT_DEDUP.inc(kind=self.kind, outcome="shared")
+                return found
+            if await asyncio.to_thread(self.backend.acquire, lock, owner, self.lease_seconds):
+                break
+            if time.monotonic() >= deadline:
+                # waited long enough for the holder; do the work ourselves
+                INFLIGHT_DEDUP.inc(kind=self.kind, outcome="timeout")
+                return await compute()
+            waited = True
+            await asyncio.sleep(self.poll_seconds)
+
+        renewer = asyncio.create_task(self._renew(lock, owner))
+        try:
+            # the previous holder may have finished between lookup and acquire
+            found = await lookup()
+            if found is not None:
+                return found
+            if waited:
+                INFLIGHT_DEDUP.inc(kind=self.kind, outcome="takeover")
+            return await compute()
+        finally:
+            renewer.cancel()
+            await asyncio.to_thread(self.backend.release, lock, owner)
+
+    async def _renew(self, lock: str, owner: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await asyncio.to_thread(self.backend.acquire, lock, owner, self.lease_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared state server for the backend's uvicorn workers")
+    parser.add_argument("--listen", default=os.getenv("STATE_TARGET", DEFAULT_SOCKET),
+                        help="unix:/path/to.sock or host:port (default %(default)s)")
+    parser.add_argument("--max-entries", type=int, default=100000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    server = StateServer(args.listen, args.max_entries)
+    logger.info("shared state server listening on %s", args.listen)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
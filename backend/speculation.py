@@ -0,0 +1,191 @@
+"""
+Speculative pre-analysis: work started when an upload completes, before
+anyone asks for it.
+
+/analyze nearly always follows a successful /upload, so the Speculator
+starts that work in the background as soon as the upload is in - reading
+and extracting the files, building the prompt context and, optionally,
+running the phases - keyed by the workspace content digest. A later
+/analyze for the same digest attaches to it: results already stored are
+cache hits, a run still in progress is waited for (join()), and prepared
+file contents are reused instead of read again.
+
+Speculation must not cost much when nobody analyzes the upload:
+- it starts after a short delay, and a newer upload to the same workspace
+  cancels (supersedes) the previous run, so a project uploaded in several
+  requests is speculated on once
+- each run has a CancelToken; cancel() (DELETE /speculation), supersession
+  and shutdown trip it, which stops queued and in-flight model calls
+- the phase work is capped per run and per workspace per UTC day
+  (tokens spent speculatively, tracked per process), runs as batch work
+  (lowest LLM priority) and is shed when no batch slot is free
+"""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from admission import Overloaded
+from cancellation import AnalysisCancelled, CancelToken
+from metrics import SPECULATIVE_ANALYSIS
+from usage import BudgetExceeded, utc_day
+
+logger = logging.getLogger("sdlc.speculation")
+
+MODES = ("off", "ingest", "full")
+
+
+class DetachedRequest:
+    """Stands in for the HTTP request of background work: never disconnects (cancel through the token)"""
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+class SpeculativeRun:
+    def __init__(self, workspace: str, key: str):
+        self.workspace = workspace
+        self.key = key
+        self.token = CancelToken()
+        self.started = False  # past the delay, doing real work
+        self.task: Optional[asyncio.Task] = None
+
+
+class Speculator:
+    """At most one speculative run per workspace; see the module docstring"""
+
+    def __init__(self, mode: str = "off", delay_seconds: float = 2.0, max_tokens_per_run: int = 0,
+                 max_tokens_per_day: int = 0, max_prepared: int = 8):
+        if mode not in MODES:
+            raise ValueError(f"Unknown speculative mode {mode!r} (expected {', '.join(MODES)})")
+        self.mode = mode
+        self.delay_seconds = delay_seconds
+        self.max_tokens_per_run = max_tokens_per_run
+        self.max_tokens_per_day = max_tokens_per_day
+        self.max_prepared = max_prepared
+        self._runs: Dict[str, SpeculativeRun] = {}
+        self._spent: Dict[Tuple[str, str], int] = {}  # (workspace, day) -> tokens
+        self._prepared: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def runs_phases(self) -> bool:
+        return self.mode == "full"
+
+    # ---- budget ----
+    def admit(self, workspace: str, estimate: int):
+        """
+        Charge a run's token estimate to the workspace's speculative allowance,
+        or raise BudgetExceeded if it exceeds the per-run or daily cap. Charged
+        up front so runs that are cancelled midway still count; settle() later.
+        """
+        if self.max_tokens_per_run and estimate > self.max_tokens_per_run:
+            raise BudgetExceeded("speculative", estimate, self.max_tokens_per_run, self.max_tokens_per_run)
+        with self._lock:
+            day = utc_day()
+            self._spent = {k: v for k, v in self._spent.items() if k[1] == day}
+            spent = self._spent.get((workspace, day), 0)
+            if self.max_tokens_per_day and spent + estimate > self.max_tokens_per_day:
+                raise BudgetExceeded("speculative", estimate, max(0, self.max_tokens_per_day - spent),
+                                     self.max_tokens_per_day)
+            self._spent[(workspace, day)] = spent + estimate
+
+    def settle(self, workspace: str, estimate: int, actual: int):
+        """Replace an admitted estimate by the tokens the run actually used"""
+        with self._lock:
+            key = (workspace, utc_day())
+            if key in self._spent:
+                self._spent[key] = max(0, self._spent[key] - estimate + actual)
+
+    # ---- prepared inputs ----
+    def remember(self, key: str, prepared):
+        with self._lock:
+            self._prepared[key] = prepared
+            self._prepared.move_to_end(key)
+            while len(self._prepared) > self.max_prepared:
+                self._prepared.popitem(last=False)
+
+    def prepared(self, key: str):
+        """What a speculative run prepared for this content digest, if anything"""
+        with self._lock:
+            return self._prepared.get(key)
+
+    # ---- runs ----
+    def schedule(self, workspace: str, key: str, work: Callable[[CancelToken], Awaitable[None]]):
+        """Start speculating on `key`, superseding the workspace's previous run"""
+        if not self.enabled:
+            return
+        previous = self._runs.get(workspace)
+        if previous is not None and previous.key == key and not previous.task.done():
+            return  # same content, already being speculated on
+        self.cancel(workspace, "superseded")
+        run = SpeculativeRun(workspace, key)
+        run.task = asyncio.create_task(self._run(run, work))
+        self._runs[workspace] = run
+        SPECULATIVE_ANALYSIS.inc(event="scheduled")
+
+    async def _run(self, run: SpeculativeRun, work: Callable[[CancelToken], Awaitable[None]]):
+        event = "completed"
+        try:
+            await asyncio.sleep(self.delay_seconds)
+            run.token.raise_if_cancelled()
+            run.started = True
+            await work(run.token)
+        except (AnalysisCancelled, asyncio.CancelledError):
+            event = run.token.reason if run.token.reason in ("superseded", "requested", "shutdown") else "cancelled"
+        except BudgetExceeded as e:
+            event = "over_budget"
+            logger.info("Speculative analysis of %s skipped: %s", run.workspace, e)
+        except Overloaded:
+            event = "shed"  # speculation never queues behind requested work
+        except Exception:
+            event = "failed"
+            logger.exception("Speculative analysis of %s failed", run.workspace)
+        finally:
+            SPECULATIVE_ANALYSIS.inc(event=event)
+            if self._runs.get(run.workspace) is run:
+                del self._runs[run.workspace]
+
+    async def join(self, workspace: str, key: str) -> bool:
+        """
+        Wait for the workspace's speculative run on `key` if it is doing real
+        work; a run still in its start delay is cancelled instead (the caller
+        is about to do the work itself). Returns whether a run was joined.
+        """
+        run = self._runs.get(workspace)
+        if run is None or run.key != key or run.task.done():
+            return False
+        if not run.started:
+            self.cancel(workspace, "requested")
+            return False
+        SPECULATIVE_ANALYSIS.inc(event="joined")
+        # shielded: a caller that goes away must not cancel the shared run
+        await asyncio.shield(run.task)
+        return True
+
+    def cancel(self, workspace: str, reason: str = "requested") -> bool:
+        run = self._runs.pop(workspace, None)
+        if run is None or run.task.done():
+            return False
+        run.token.cancel(reason)
+        if not run.started:
+            run.task.cancel()
+        return True
+
+    def status(self, workspace: str) -> Optional[Dict]:
+        run = self._runs.get(workspace)
+        if run is None:
+            return None
+        return {"key": run.key, "state": "running" if run.started else "pending"}
+
+    async def shutdown(self):
+        runs = list(self._runs.values())
+        for run in runs:
+            self.cancel(run.workspace, "shutdown")
+        await asyncio.gather(*(run.task for run in runs), return_exceptions=True)
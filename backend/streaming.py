@@ -0,0 +1,175 @@
+"""
+Server-Sent Events streaming of model output.
+
+The blocking Gemini stream is consumed on an LLM worker thread and each chunk
+is handed to the event loop through an asyncio.Queue, so tokens reach the
+client as soon as the model produces them. The last event summarises token
+counts and timing (time-to-first-token and total).
+"""
+
+import asyncio
+import inspect
+import json
+import time
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from cancellation import AnalysisCancelled, CancelToken
+from metrics import (
+    LLM_CALL_ERRORS,
+    LLM_CALL_SECONDS,
+    LLM_COMPLETION_TOKENS,
+    LLM_INFLIGHT,
+    LLM_PROMPT_CHARS,
+    LLM_PROMPT_TOKENS,
+    LLM_TASKS_CANCELLED,
+    LLM_TTFT_SECONDS,
+    REQUESTS_CANCELLED,
+)
+from tokens import estimate_tokens
+from tracing import bind
+
+_END = object()
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one SSE frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _chunk_text(chunk) -> str:
+    # chunk.text raises if the chunk carries no text part (e.g. safety stop)
+    try:
+        return chunk.text or ""
+    except Exception:
+        return ""
+
+
+def usage_counts(usage, prompt: str, completion: str) -> Dict:
+    """Token counts from response.usage_metadata, or estimates if unavailable"""
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    completion_tokens = getattr(usage, "candidates_token_count", None)
+    if prompt_tokens is None or completion_tokens is None:
+        return {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(completion),
+            "estimated": True,
+        }
+    return {"prompt_tokens": int(prompt_tokens), "completion_tokens": int(completion_tokens), "estimated": False}
+
+
+async def stream_text(text: str, extra: Optional[Dict] = None) -> AsyncIterator[str]:
+    """SSE frames for an answer that is already known (e.g. served from cache)"""
+    yield sse_event("token", {"text": text})
+    summary = {"prompt_tokens": 0, "completion_tokens": 0, "estimated": False,
+               "ttft_ms": 0.0, "total_ms": 0.0, "chunks": 1}
+    summary.update(extra or {})
+    yield sse_event("done", summary)
+
+
+async def stream_generation(
+    model,
+    prompt: str,
+    executor: Executor,
+    token: Optional[CancelToken] = None,
+    endpoint: str = "/chat/stream",
+    on_complete: Optional[Callable[[str], Any]] = None,
+    extra: Optional[Dict] = None,
+    phase: str = "chat_stream",
+    on_usage: Optional[Callable[[Dict], None]] = None,
+) -> AsyncIterator[str]:
+    """
+    Yield SSE frames: `token` events with text deltas, then one `done` event
+    (or `error`). If the consumer stops early (client disconnect), the worker
+    thread is told to abandon the model stream.
+    on_complete receives the full text once the stream finished normally
+    (and is awaited if it returns an awaitable, e.g. an async function);
+    `extra` is merged into the `done` and `error` payloads; `phase` labels the
+    call metrics and on_usage receives the token counts of a finished stream.
+    """
+    token = token or CancelToken()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def pump():
+        LLM_INFLIGHT.inc()
+        try:
+            token.raise_if_cancelled()
+            response = model.generate_content(prompt, stream=True)
+            for chunk in response:
+                token.raise_if_cancelled()
+                text = _chunk_text(chunk)
+                if text:
+                    emit(("token", text))
+            emit(("usage", getattr(response, "usage_metadata", None)))
+        except AnalysisCancelled:
+            pass
+        except Exception as e:
+            LLM_CALL_ERRORS.inc(phase=phase, error=type(e).__name__)
+            emit(("error", str(e)))
+        finally:
+            LLM_INFLIGHT.dec()
+            emit(_END)
+
+    LLM_PROMPT_CHARS.observe(len(prompt), phase=phase)
+    started = time.perf_counter()
+    first_token_at = None
+    parts = []
+    usage = None
+    finished = False
+    worker = loop.run_in_executor(executor, bind(pump))
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            kind, payload = item
+            if kind == "token":
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                parts.append(payload)
+                yield sse_event("token", {"text": payload})
+            elif kind == "usage":
+                usage = payload
+            else:
+                finished = True
+                LLM_CALL_SECONDS.observe(time.perf_counter() - started, phase=phase, outcome="error")
+                error = {"message": f"Chat error: {payload}"}
+                error.update(extra or {})
+                yield sse_event("error", error)
+                return
+
+        finished = True
+        completion = "".join(parts)
+        if on_complete is not None:
+            result = on_complete(completion)
+            if inspect.isawaitable(result):
+                await result
+        now = time.perf_counter()
+        summary = usage_counts(usage, prompt, completion)
+        LLM_CALL_SECONDS.observe(now - started, phase=phase, outcome="ok")
+        LLM_TTFT_SECONDS.observe((first_token_at or now) - started, phase=phase)
+        LLM_PROMPT_TOKENS.observe(summary["prompt_tokens"], phase=phase)
+        LLM_COMPLETION_TOKENS.observe(summary["completion_tokens"], phase=phase)
+        if on_usage is not None:
+            on_usage(summary)
+        summary.update({
+            "ttft_ms": round(((first_token_at or now) - started) * 1000, 1),
+            "total_ms": round((now - started) * 1000, 1),
+            "chunks": len(parts),
+        })
+        summary.update(extra or {})
+        yield sse_event("done", summary)
+
+    finally:
+        if not finished:
+            # generator closed early: the client went away mid-stream
+            token.cancel("client_disconnected")
+            worker.cancel()
+            REQUESTS_CANCELLED.inc(endpoint=endpoint)
+            LLM_CALL_SECONDS.observe(time.perf_counter() - started, phase=phase, outcome="cancelled")
+            LLM_TASKS_CANCELLED.inc(endpoint=endpoint, state="in_flight")
@@ -0,0 +1,165 @@
+"""
+Compact profiles of tabular uploads (CSV / TSV / Parquet) for prompts.
+
+Raw rows tell the model little about a dataset and cost a token per few
+characters, so data files are summarized instead: schema and dtypes, null
+rates, cardinalities, basic statistics and a few example rows.
+
+Tables are read in chunks of CHUNK_ROWS and the statistics are merged per
+chunk with vectorized pandas/numpy operations, so memory is bounded by the
+chunk size (and the per-column distinct-value cap), not the file size.
+Files longer than max_rows are profiled from their first max_rows rows.
+
+pandas is imported on first use; Parquet needs pyarrow (optional).
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+CHUNK_ROWS = 50_000
+# Distinct values tracked per column; beyond that the cardinality is reported as "> cap"
+DISTINCT_CAP = 1000
+MAX_COLUMNS = 100
+MAX_CELL_CHARS = 60
+TOP_VALUES = 3
+
+
+class ColumnStats:
+    """Statistics of one column, merged chunk by chunk"""
+
+    def __init__(self, name: str, dtype: str):
+        self.name = name
+        self.dtype = dtype
+        self.numeric = False
+        self.count = 0        # non-null values
+        self.nulls = 0
+        self.values: Optional[Dict] = {}  # value -> count, None once over DISTINCT_CAP
+        self.n = 0            # numeric: values folded into mean / m2
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.max_len = 0      # text: longest value
+
+    def update(self, series):
+        import pandas as pd
+
+        dtype = str(series.dtype)
+        if self.count == 0 and self.nulls == 0:
+            self.dtype = dtype
+            self.numeric = pd.api.types.is_numeric_dtype(series.dtype)
+        elif dtype != self.dtype:
+            # e.g. int64 in one chunk, float64 (NaN) or object in the next
+            both_numeric = self.numeric and pd.api.types.is_numeric_dtype(series.dtype)
+            self.dtype = "float64" if both_numeric else "object"
+            self.numeric = both_numeric
+
+        non_null = series.dropna()
+        self.nulls += len(series) - len(non_null)
+        self.count += len(non_null)
+        if not len(non_null):
+            return
+
+        if self.values is not None:
+            counts = non_null.value_counts(sort=False)
+            if len(counts) > DISTINCT_CAP:
+                self.values = None
+        if self.values is not None:
+            for value, n in counts.items():
+                self.values[value] = self.values.get(value, 0) + int(n)
+            if len(self.values) > DISTINCT_CAP:
+                self.values = None
+
+        if self.numeric:
+            values = non_null.to_numpy(dtype="float64")
+            n, mean = len(values), float(values.mean())
+            m2 = float(((values - mean) ** 2).sum())
+            # Chan et al. parallel merge of (n, mean, M2)
+            total = self.n + n
+            delta = mean - self.mean
+            self.m2 += m2 + delta * delta * self.n * n / total
+            self.mean += delta * n / total
+            self.n = total
+            low, high = values.min(), values.max()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        else:
+            self.max_len = max(self.max_len, int(non_null.astype(str).str.len().max()))
+
+    def describe(self, rows: int) -> str:
+        null_rate = self.nulls / rows * 100 if rows else 0.0
+        distinct = len(self.values) if self.values is not None else f">{DISTINCT_CAP}"
+        parts = [f"{self.name}: {self.dtype}", f"nulls {null_rate:.1f}%", f"distinct {distinct}"]
+        if self.numeric and self.n:
+            std = (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else 0.0
+            parts.append(f"min {_number(self.min)}, max {_number(self.max)}, "
+                         f"mean {_number(self.mean)}, std {_number(std)}")
+        elif self.count:
+            parts.append(f"max length {self.max_len}")
+            if self.values:
+                top = sorted(self.values.items(), key=lambda kv: kv[1], reverse=True)[:TOP_VALUES]
+                parts.append("top " + ", ".join(f"{_cell(v)!r} ({n})" for v, n in top))
+        return "; ".join(parts)
+
+
+def _number(value) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() and abs(value) < 1e15 else f"{value:.4g}"
+
+
+def _cell(value) -> str:
+    text = str(value)
+    return text if len(text) <= MAX_CELL_CHARS else text[:MAX_CELL_CHARS] + "..."
+
+
+def profile_frames(frames: Iterator, kind: str, max_rows: int, sample_rows: int,
+                   total_rows: Optional[int] = None) -> str:
+    """Profile a table given as an iterator of DataFrame chunks"""
+    columns: List[str] = []
+    stats: Dict[str, ColumnStats] = {}
+    examples = None
+    rows = 0
+    truncated = False
+    for frame in frames:
+        if rows + len(frame) > max_rows:
+            frame = frame.iloc[:max_rows - rows]
+            truncated = True
+        if not columns:
+            columns = [str(c) for c in frame.columns]
+            stats = {c: ColumnStats(c, str(frame[c].dtype)) for c in columns[:MAX_COLUMNS]}
+            examples = frame.head(sample_rows)
+        for name, column in zip(columns[:MAX_COLUMNS], frame.columns[:MAX_COLUMNS]):
+            stats[name].update(frame[column])
+        rows += len(frame)
+        if truncated:
+            break
+
+    if total_rows is not None and total_rows > rows:
+        truncated = True
+    size = f"{total_rows if total_rows is not None else rows} rows" if not truncated else (
+        f"first {rows} of {total_rows} rows" if total_rows is not None else f"first {rows} rows"
+    )
+    lines = [f"# Tabular data profile ({kind}, {size} x {len(columns)} columns; raw rows not included)",
+             "columns:"]
+    lines += [f"- {stats[name].describe(rows)}" for name in columns[:MAX_COLUMNS]]
+    if len(columns) > MAX_COLUMNS:
+        lines.append(f"- ... {len(columns) - MAX_COLUMNS} more columns: " + ", ".join(columns[MAX_COLUMNS:]))
+    if examples is not None and len(examples) and sample_rows:
+        lines.append(f"example rows (first {len(examples)}):")
+        lines.append(examples.iloc[:, :MAX_COLUMNS].map(_cell).to_csv(index=False).rstrip("\n"))
+    return "\n".join(lines) + "\n"
+
+
+def profile_csv(path: str, sep: str = ",", max_rows: int = 1_000_000, sample_rows: int = 5) -> str:
+    import pandas as pd
+
+    frames = pd.read_csv(path, sep=sep, chunksize=CHUNK_ROWS, encoding_errors="replace")
+    with frames:
+        return profile_frames(frames, "CSV" if sep == "," else "TSV", max_rows, sample_rows)
+
+
+def profile_parquet(path: str, max_rows: int = 1_000_000, sample_rows: int = 5) -> str:
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    frames = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=CHUNK_ROWS))
+    return profile_frames(frames, "Parquet", max_rows, sample_rows, total_rows=parquet.metadata.num_rows)
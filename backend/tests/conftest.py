@@ -0,0 +1,29 @@
+"""
+Backend modules are flat top-level modules (run from backend/), so tests
+import them the same way.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The FastAPI app module, with its databases and caches under a temp dir"""
+    root = tmp_path_factory.mktemp("app")
+    for name, path in (("REPORT_CACHE_DIR", "report_cache"), ("REPORT_DB_PATH", "reports.db"),
+                       ("OUTBOX_SINK_PATH", "deliveries"), ("USAGE_DB_PATH", "usage.db"),
+                       ("PROFILE_DIR", "profiles")):
+        os.environ.setdefault(name, str(root / path))
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    from fastapi.testclient import TestClient
+    return TestClient(app_module.app)
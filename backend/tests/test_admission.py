@@ -0,0 +1,222 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, Overloaded, WorkClass
+from metrics import ADMISSION_DECISIONS
+
+
+def test_admits_up_to_max_inflight_then_rejects_without_wait():
+    async def main():
+        work = WorkClass("t", max_inflight=2, max_queue=1, max_wait_seconds=5)
+        slots = [await work.acquire(), await work.acquire()]
+        assert work.inflight == 2
+        with pytest.raises(Overloaded) as excinfo:
+            await work.acquire(wait=False)
+        assert excinfo.value.reason == "busy"
+        slots[0].release()
+        slots[0].release()  # idempotent
+        assert work.inflight == 1
+
+    asyncio.run(main())
+
+
+def test_release_hands_the_slot_to_the_queue_in_order():
+    async def main():
+        work = WorkClass("t", max_inflight=1, max_queue=2, max_wait_seconds=5, expected_seconds=0.1)
+        first = await work.acquire()
+        order = []
+
+        async def waiter(name):
+            slot = await work.acquire()
+            order.append(name)
+            return slot
+
+        tasks = [asyncio.create_task(waiter("a")), asyncio.create_task(waiter("b"))]
+        await asyncio.sleep(0.01)
+        assert work.queued == 2 and work.stats()["queued"] == 2
+        first.release()
+        slot_a = await tasks[0]
+        assert order == ["a"] and work.inflight == 1 and work.queued == 1  # handed over, not released
+        slot_a.release()
+        (await tasks[1]).release()
+        assert order == ["a", "b"] and work.inflight == 0 and work.queued == 0
+
+    asyncio.run(main())
+
+
+def test_newcomers_do_not_jump_the_queue():
+    async def main():
+        work = WorkClass("t", max_inflight=1, max_queue=2, max_wait_seconds=5, expected_seconds=0.1)
+        slot = await work.acquire()
+        queued = asyncio.create_task(work.acquire())
+        await asyncio.sleep(0.01)
+        slot.release()  # hands over to the waiter before anyone else can take it
+        with pytest.raises(Overloaded):
+            await work.acquire(wait=False)
+        (await queued).release()
+
+    asyncio.run(main())
+
+
+def test_queue_full():
+    async def main():
+        work = WorkClass("t", max_inflight=1, max_queue=1, max_wait_seconds=5, expected_seconds=0.1)
+        slot = await work.acquire()
+        queued = asyncio.create_task(work.acquire())
+        await asyncio.sleep(0.01)
+        before = ADMISSION_DECISIONS.value(work="t", outcome="queue_full")
+        with pytest.raises(Overloaded) as excinfo:
+            await work.acquire()
+        assert excinfo.value.reason == "queue_full"
+        assert ADMISSION_DECISIONS.value(work="t", outcome="queue_full") == before + 1
+        slot.release()
+        (await queued).release()
+
+    asyncio.run(main())
+
+
+def test_wait_too_long_is_rejected_on_arrival():
+    async def main():
+        # the one in-flight request is expected to take 10s; nobody should wait that long for 1s
+        work = WorkClass("t", max_inflight=1, max_queue=5, max_wait_seconds=1, expected_seconds=10)
+        slot = await work.acquire()
+        with pytest.raises(Overloaded) as excinfo:
+            await work.acquire()
+        assert excinfo.value.reason == "wait_too_long"
+        assert excinfo.value.retry_after == 10
+        assert work.queued == 0
+        slot.release()
+
+    asyncio.run(main())
+
+
+def test_timeout_leaves_the_queue():
+    async def main():
+        work = WorkClass("t", max_inflight=1, max_queue=5, max_wait_seconds=0.05, expected_seconds=0.01)
+        slot = await work.acquire()
+        with pytest.raises(Overloaded) as excinfo:
+            await work.acquire()
+        assert excinfo.value.reason == "timeout"
+        assert work.queued == 0 and work.inflight == 1
+        slot.release()
+        assert work.inflight == 0
+
+    asyncio.run(main())
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_not_lost():
+    async def main():
+        work = WorkClass("t", max_inflight=1, max_queue=5, max_wait_seconds=5, expected_seconds=0.01)
+        slot = await work.acquire()
+        gone = asyncio.create_task(work.acquire())
+        nxt = asyncio.create_task(work.acquire())
+        await asyncio.sleep(0.01)
+        slot.release()   # hands the slot to `gone`...
+        gone.cancel()    # ...which is cancelled before it could run
+        try:
+            # Python < 3.12 wait_for returns the result when it is already there
+            (await gone).release()
+        except asyncio.CancelledError:
+            pass
+        (await asyncio.wait_for(nxt, 1)).release()
+        assert work.inflight == 0 and work.queued == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        work = WorkClass("t", max_inflight=1, max_queue=5, max_wait_seconds=5, expected_seconds=0.01)
+        slot = await work.acquire()
+        gone = asyncio.create_task(work.acquire())
+        await asyncio.sleep(0.01)
+        gone.cancel()
+        await asyncio.sleep(0.01)
+        assert work.queued == 0
+        slot.release()
+        assert work.inflight == 0
+
+    asyncio.run(main())
+
+
+def test_unlimited_class():
+    async def main():
+        work = WorkClass("t", max_inflight=0, max_queue=0, max_wait_seconds=0)
+        slots = [await work.acquire(wait=False) for _ in range(50)]
+        assert work.inflight == 50 and work.expected_wait(10) == 0.0
+        for slot in slots:
+            slot.release()
+
+    asyncio.run(main())
+
+
+def test_retry_after_follows_service_time():
+    work = WorkClass("t", max_inflight=2, max_queue=10, max_wait_seconds=100, expected_seconds=10)
+    assert [work.expected_wait(p) for p in (0, 1, 2, 3)] == [10, 10, 20, 20]
+    work.inflight = 1
+    work._release(20.0)
+    assert work.stats()["avg_seconds"] == 12.0
+
+
+def test_controller_slot_releases_on_error():
+    async def main():
+        admission = AdmissionController()
+        admission.add("analysis", 1, 0, 1)
+        with pytest.raises(RuntimeError):
+            async with admission.slot("analysis"):
+                assert admission.stats()["analysis"]["inflight"] == 1
+                raise RuntimeError("boom")
+        assert admission.stats()["analysis"]["inflight"] == 0
+
+    asyncio.run(main())
+
+
+def test_overloaded_analysis_is_503_with_retry_after(app_module, client, tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "main.py").write_text(f"# {tmp_path.name}\n", encoding="utf-8")
+    monkeypatch.setattr(app_module, "UPLOAD_DIR", str(uploads))
+    admission = AdmissionController()
+    admission.add("analysis", 1, 0, 30, expected_seconds=7).inflight = 1  # busy, no queue
+    monkeypatch.setattr(app_module, "admission", admission)
+
+    response = client.post("/analyze?phases=testing")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+    assert response.json()["overload"] == {"work": "analysis", "reason": "queue_full", "retry_after": 7}
+
+
+def test_chat_stream_that_never_starts_gives_its_slot_back(app_module, monkeypatch):
+    from starlette.requests import Request
+
+    monkeypatch.setattr(app_module, "model", object())
+    chat = app_module.admission.classes["chat"]
+    request = Request({"type": "http", "method": "POST", "path": "/chat/stream", "headers": [],
+                       "query_string": b""})
+
+    async def main():
+        response = await app_module.chat_stream(request, message="what does train.py do?", session_id=None)
+        assert chat.inflight == 1 and app_module.token_budget._reserved
+        await response.background()  # the client left before the body was sent
+        assert chat.inflight == 0 and not app_module.token_budget._reserved
+
+    asyncio.run(main())
+
+
+def test_chat_stream_start_guard_releases_an_unsent_response(app_module, monkeypatch):
+    from starlette.requests import Request
+
+    monkeypatch.setattr(app_module, "model", object())
+    monkeypatch.setattr(app_module, "CHAT_STREAM_START_SECONDS", 0.01)
+    chat = app_module.admission.classes["chat"]
+    request = Request({"type": "http", "method": "POST", "path": "/chat/stream", "headers": [],
+                       "query_string": b""})
+
+    async def main():
+        await app_module.chat_stream(request, message="what does train.py do?", session_id=None)
+        assert chat.inflight == 1
+        await asyncio.sleep(0.2)
+        assert chat.inflight == 0 and not app_module.token_budget._reserved
+
+    asyncio.run(main())
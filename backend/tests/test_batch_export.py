@@ -0,0 +1,67 @@
+import asyncio
+import io
+import json
+import zipfile
+
+from batch_export import stream_zip
+
+
+async def ready(path):
+    return path
+
+
+async def failing():
+    raise RuntimeError("render failed")
+
+
+async def slow(path, delay):
+    await asyncio.sleep(delay)
+    return path
+
+
+def collect(jobs):
+    async def run():
+        return b"".join([chunk async for chunk in stream_zip(jobs)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(run())))
+
+
+def test_entries_in_completion_order_with_manifest(tmp_path):
+    first, second = tmp_path / "1.pdf", tmp_path / "2.pdf"
+    first.write_bytes(b"%PDF-first")
+    second.write_bytes(b"%PDF-second" * 10000)
+    archive = collect({"slow.pdf": slow(str(first), 0.05), "fast.pdf": ready(str(second)), "bad.pdf": failing()})
+    assert archive.namelist() == ["fast.pdf", "slow.pdf", "manifest.json"]
+    assert archive.read("slow.pdf") == b"%PDF-first"
+    assert archive.read("fast.pdf") == b"%PDF-second" * 10000
+    assert json.loads(archive.read("manifest.json")) == [
+        {"file": "bad.pdf", "status": "error", "error": "render failed"},
+        {"file": "fast.pdf", "status": "ok"},
+        {"file": "slow.pdf", "status": "ok"},
+    ]
+
+
+def test_duplicate_report_ids_yield_one_entry_each(app_module, client):
+    key = "ab" * 32
+    app_module.report_cache.put(key, b"%PDF-cached")
+    response = client.post("/generate-pdf/batch", json={"reportIds": [key, f'"{key}"', key]})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith("_1.zip")
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.namelist() == [f"SDLC_Verification_Report_{key[:12]}.pdf", "manifest.json"]
+
+
+def test_unknown_report_ids_are_rejected(client):
+    response = client.post("/generate-pdf/batch", json={"reportIds": ["nope", "nope"]})
+    assert response.status_code == 404
+    assert response.json()["detail"]["reportIds"] == ["nope"]
+
+
+def test_report_ids_fall_back_to_the_report_store(app_module, client):
+    key = "cd" * 32  # never in the PDF cache (evicted)
+    stored = app_module.report_store.add_report(key, "2026-01-01T00:00:00Z", 50, [], {}, b"%PDF-stored")
+    response = client.post("/generate-pdf/batch", json={"reportIds": [stored, key]})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.read(f"SDLC_Verification_Report_{stored[:12]}.pdf") == b"%PDF-stored"
+    assert archive.read(f"SDLC_Verification_Report_{key[:12]}.pdf") == b"%PDF-stored"
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cancellation import AnalysisCancelled, CancellableModel, CancelToken, run_cancellable
+from metrics import LLM_TASKS_CANCELLED, REQUESTS_CANCELLED
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after: float = None):
+        self._disconnect_at = None if disconnect_after is None else time.monotonic() + disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        return self._disconnect_at is not None and time.monotonic() >= self._disconnect_at
+
+
+class StreamingModel:
+    """Yields `chunks` chunks, `delay` seconds apart, counting how many were consumed"""
+
+    def __init__(self, chunks: int = 5, delay: float = 0.0):
+        self.chunks = chunks
+        self.delay = delay
+        self.consumed = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        model = self
+
+        class Response:
+            text = "done"
+
+            def __iter__(self):
+                for _ in range(model.chunks):
+                    time.sleep(model.delay)
+                    model.consumed += 1
+                    yield object()
+
+        return Response()
+
+
+def test_token_keeps_first_reason():
+    token = CancelToken()
+    token.cancel("first")
+    token.cancel("second")
+    assert token.cancelled and token.reason == "first"
+    with pytest.raises(AnalysisCancelled, match="first"):
+        token.raise_if_cancelled()
+
+
+def test_cancellable_model_resolves_the_stream():
+    model = StreamingModel(chunks=3)
+    response = CancellableModel(model, CancelToken()).generate_content("prompt")
+    assert response.text == "done" and model.consumed == 3
+
+
+def test_cancellable_model_stops_consuming_after_cancel():
+    model = StreamingModel(chunks=100, delay=0.01)
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(AnalysisCancelled):
+        CancellableModel(model, token).generate_content("prompt")
+    assert model.consumed < 100
+
+
+def test_run_cancellable_returns_results_by_name():
+    async def run():
+        with ThreadPoolExecutor(2) as executor:
+            return await run_cancellable(FakeRequest(), executor, {"a": lambda: 1, "b": lambda: 2},
+                                         CancelToken(), endpoint="/test")
+
+    assert asyncio.run(run()) == {"a": 1, "b": 2}
+
+
+def test_run_cancellable_reraises_task_errors():
+    def fail():
+        raise ValueError("boom")
+
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            await run_cancellable(FakeRequest(), executor, {"a": fail}, CancelToken(), endpoint="/test")
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(run())
+
+
+def test_disconnect_drops_queued_tasks_and_raises():
+    ran = []
+    cancelled_before = REQUESTS_CANCELLED.value(endpoint="/test-disconnect")
+    queued_before = LLM_TASKS_CANCELLED.value(endpoint="/test-disconnect", state="queued")
+
+    def slow(name):
+        def call():
+            ran.append(name)
+            time.sleep(0.8)  # outlasts the first disconnect poll after the client leaves
+        return call
+
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            await run_cancellable(FakeRequest(disconnect_after=0.05), executor,
+                                  {name: slow(name) for name in "abcd"}, CancelToken(),
+                                  endpoint="/test-disconnect")
+
+    with pytest.raises(AnalysisCancelled):
+        asyncio.run(run())
+    assert ran == ["a"]  # one worker: the other three never started
+    assert REQUESTS_CANCELLED.value(endpoint="/test-disconnect") == cancelled_before + 1
+    assert LLM_TASKS_CANCELLED.value(endpoint="/test-disconnect", state="queued") == queued_before + 3
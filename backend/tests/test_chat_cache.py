@@ -0,0 +1,51 @@
+from chat_cache import ChatAnswerCache, normalize_question, question_terms
+from shared_state import MemoryBackend
+
+
+def test_normalization_ignores_case_punctuation_and_spacing():
+    assert normalize_question("  What's   MISSING in testing?? ") == "whats missing in testing"
+    assert question_terms("What's missing in testing?") == frozenset({"missing", "testing"})
+
+
+def test_exact_hit_is_scoped_to_model_and_workspace():
+    cache = ChatAnswerCache()
+    cache.put("What is missing?", "digest-1", "model-a", "tests")
+    assert cache.get("what is missing", "digest-1", "model-a") == ("tests", "exact")
+    assert cache.get("what is missing", "digest-2", "model-a") == (None, None)
+    assert cache.get("what is missing", "digest-1", "model-b") == (None, None)
+
+
+def test_ttl_and_lru_eviction():
+    cache = ChatAnswerCache(max_entries=2, ttl_seconds=60)
+    cache.put("q1", "d", "m", "a1")
+    cache.put("q2", "d", "m", "a2")
+    cache.get("q1", "d", "m")
+    cache.put("q3", "d", "m", "a3")  # evicts q2
+    assert cache.get("q2", "d", "m") == (None, None)
+    assert cache.get("q1", "d", "m") == ("a1", "exact")
+
+    key = cache.make_key("q1", "d", "m")
+    cache._entries[key].created -= 120
+    assert cache.get("q1", "d", "m") == (None, None)
+    assert len(cache) == 1
+
+
+def test_fuzzy_tier_is_opt_in():
+    question, similar = "What is missing in the testing phase", "what's missing in testing phase?"
+    strict = ChatAnswerCache()
+    strict.put(question, "d", "m", "answer")
+    assert strict.get(similar, "d", "m") == (None, None)
+
+    fuzzy = ChatAnswerCache(fuzzy=True, fuzzy_threshold=0.6)
+    fuzzy.put(question, "d", "m", "answer")
+    assert fuzzy.get(similar, "d", "m") == ("answer", "fuzzy")
+    assert fuzzy.get("how is deployment done", "d", "m") == (None, None)
+    assert fuzzy.get(similar, "other-digest", "m") == (None, None)
+
+
+def test_shared_backend_serves_other_workers():
+    shared = MemoryBackend()
+    ChatAnswerCache(shared=shared).put("q", "d", "m", "from worker 1")
+    other = ChatAnswerCache(shared=shared)
+    assert other.get("q", "d", "m") == ("from worker 1", "exact")
+    assert len(other) == 1  # copied into the local tier
@@ -0,0 +1,127 @@
+import re
+import types
+
+from chat_memory import ChatSessionStore
+from tokens import estimate_tokens
+
+
+def make_session(max_turns=2, summary_max_tokens=200):
+    store = ChatSessionStore(max_sessions=10, ttl_seconds=3600, max_turns=max_turns,
+                             summary_max_tokens=summary_max_tokens)
+    return store.get_or_create(None, "ws")
+
+
+def test_window_keeps_last_turns_and_queues_older_ones():
+    session = make_session(max_turns=2)
+    assert not session.has_history()
+    for i in range(4):
+        session.add_turn(f"question {i}?", f"answer {i}.")
+    assert [t.question for t in session.turns] == ["question 2?", "question 3?"]
+    assert [t.question for t in session.pending] == ["question 0?", "question 1?"]
+    assert session.needs_fold()
+
+
+def test_pending_turns_are_shown_condensed_before_folding():
+    session = make_session(max_turns=1)
+    session.add_turn("Which framework is used? More detail here.", "FastAPI. It serves the API.")
+    session.add_turn("And tests?", "pytest.")
+    summary, recent = session.render_memory(max_tokens=500)
+    assert summary == "- Q: Which framework is used? A: FastAPI."
+    assert recent == "User: And tests?\nAssistant: pytest."
+
+
+def test_fold_uses_summarizer_and_clears_pending():
+    session = make_session(max_turns=1)
+    session.add_turn("q1", "a1")
+    session.add_turn("q2", "a2")
+    prompts = []
+
+    def summarize(prompt):
+        prompts.append(prompt)
+        return "  user asked q1  "
+
+    session.fold(summarize)
+    assert "User: q1\nAssistant: a1" in prompts[0]
+    assert session.summary == "user asked q1"
+    assert not session.pending and not session.needs_fold()
+
+
+def test_fold_falls_back_to_extractive_summary():
+    session = make_session(max_turns=1)
+    session.add_turn("q1", "a1")
+    session.add_turn("q2", "a2")
+
+    def failing(prompt):
+        raise RuntimeError("model down")
+
+    session.fold(failing)
+    assert session.summary == "- Q: q1 A: a1"
+
+
+def test_memory_respects_token_budget_dropping_oldest_turns_first():
+    session = make_session(max_turns=10, summary_max_tokens=20)
+    session.summary = "s" * 400
+    for i in range(5):
+        session.add_turn(f"question {i}", "x" * 80)
+    summary, recent = session.render_memory(max_tokens=80)
+    assert estimate_tokens(summary) <= 20
+    assert estimate_tokens(summary) + estimate_tokens(recent) <= 80
+    assert "question 4" in recent and "question 0" not in recent
+
+
+def test_store_reuses_sessions_and_evicts_lru():
+    store = ChatSessionStore(max_sessions=2, ttl_seconds=3600, max_turns=2, summary_max_tokens=100)
+    first = store.get_or_create(None, "ws")
+    assert store.get_or_create(first.session_id, "ws") is first
+    second = store.get_or_create(None, "ws")
+    store.get_or_create(first.session_id, "ws")
+    third = store.get_or_create(None, "ws")  # evicts the second, the least recently used
+    assert store.get_or_create(first.session_id, "ws") is first
+    assert store.delete(third.session_id, "ws") and not store.delete(second.session_id, "ws")
+
+
+def test_store_expires_idle_sessions():
+    store = ChatSessionStore(max_sessions=10, ttl_seconds=60, max_turns=2, summary_max_tokens=100)
+    session = store.get_or_create(None, "ws")
+    session.last_used -= 120
+    store.get_or_create(None, "ws")
+    assert store.get_or_create(session.session_id, "ws") is not session
+
+
+def test_client_ids_are_never_adopted_and_sessions_stay_in_their_workspace():
+    store = ChatSessionStore(max_sessions=10, ttl_seconds=3600, max_turns=2, summary_max_tokens=100)
+    made_up = store.get_or_create("x" * 10000, "ws")
+    assert re.fullmatch(r"[0-9a-f]{32}", made_up.session_id)
+    session = store.get_or_create(None, "ws-a")
+    session.add_turn("secret plan?", "yes.")
+    other = store.get_or_create(session.session_id, "ws-b")
+    assert other is not session and other.session_id != session.session_id and not other.has_history()
+    assert not store.delete(session.session_id, "ws-b")
+    assert store.get_or_create(session.session_id, "ws-a") is session
+
+
+def test_app_sessions_are_scoped_to_the_workspace(app_module, client):
+    session = app_module.chat_sessions.get_or_create(None, "ws-a")
+    url = f"/chat/sessions/{session.session_id}"
+    assert client.delete(url, headers={"X-Workspace-Id": "ws-b"}).status_code == 404
+    assert client.delete(url, headers={"X-Workspace-Id": "ws-a"}).status_code == 200
+
+
+def test_app_folds_chat_memory_in_the_chat_class(app_module, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app_module.llm_executor, "submit_to", lambda name, fn, *args: submitted.append(name))
+    session = make_session(max_turns=1)
+    app_module.remember_turn(session, "first?", "one.", "ws")
+    app_module.remember_turn(session, "second?", "two.", "ws")
+    assert submitted == ["chat"]
+
+
+def test_app_summaries_are_charged_to_the_workspace(app_module, monkeypatch):
+    class Model:
+        def generate_content(self, prompt):
+            return types.SimpleNamespace(text="summary of the chat")
+
+    monkeypatch.setattr(app_module, "model", Model())
+    before = app_module.token_budget.ledger.spent("ws-summary")
+    assert app_module.summarize_text("fold these turns " * 20, workspace="ws-summary") == "summary of the chat"
+    assert app_module.token_budget.ledger.spent("ws-summary") > before
@@ -0,0 +1,170 @@
+import ast
+
+import pytest
+
+import code_condense
+import phase_engine
+from code_condense import condense, condense_python
+from metrics import CONDENSE_CACHE_LOOKUPS
+
+SOURCE = '''"""Module doc.
+
+More detail.
+"""
+import os
+from typing import List
+
+LIMIT = 10  # a comment
+
+
+class Store(Base):
+    """A store.
+
+    Details.
+    """
+
+    def get(self, key: str) -> int:
+        """Fetch one."""
+        # looked up twice
+        if key in self.data:
+            return self.data[key]
+        for k in self.data:
+            while True:
+                break
+        raise KeyError(key)
+
+    def put(self, key, value):
+        self.data[key] = value
+
+
+@decorator(1)
+async def main():
+    try:
+        await run()
+    except ValueError as e:
+        return None
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    code_condense._cache.clear()
+    yield
+    code_condense._cache.clear()
+
+
+def test_roomy_limit_keeps_all_bodies_without_comments():
+    out = condense_python(SOURCE, 10_000)
+    assert out.startswith("# [condensed: comments and blank lines removed; 0 of 3 function bodies")
+    assert "# a comment" not in out and "# looked up twice" not in out
+    assert "        raise KeyError(key)\n    def put(self, key, value):\n        self.data[key] = value\n" in out
+    assert '@decorator(1)\nasync def main():\n    try:\n        await run()\n' in out
+    ast.parse(out)
+
+
+def test_control_flow_outline():
+    # room for the flow skeleton; only bodies no longer than their outline fit
+    skeleton = code_condense._PythonSkeleton(SOURCE.splitlines(), ast.parse(SOURCE).body, set()).text()
+    out = condense_python(SOURCE, len(code_condense._note(3, 0, code_condense.FLOW) + skeleton))
+    assert "2 of 3 function bodies reduced to signatures, docstrings and control flow" in out
+    assert (
+        '    def get(self, key: str) -> int:\n'
+        '        """Fetch one."""\n'
+        '        if key in self.data:\n'
+        '            return self.data[key]\n'
+        '        for k in self.data:\n'
+        '            while True:\n'
+        '                ...\n'
+        '        raise KeyError(key)\n'
+    ) in out
+    assert "    def put(self, key, value):\n        ...\n" in out
+    assert "    try:\n        await run()\n" in out  # as short as its outline
+    assert "if __name__ == '__main__':\n    ...\n" in out
+    ast.parse(out)
+
+
+@pytest.mark.parametrize("limit, note", [
+    (400, "2 of 3 function bodies reduced to signatures and docstring summaries"),
+    (300, "2 of 3 function bodies reduced to signatures]"),
+    (280, "3 of 3 function bodies reduced to signatures]"),
+])
+def test_detail_drops_until_it_fits(limit, note):
+    out = condense_python(SOURCE, limit)
+    assert note in out
+    assert len(out) <= limit
+    ast.parse(out)
+
+
+def test_signatures_are_the_floor():
+    # nothing smaller exists; phase_engine truncates it if it's still too long
+    out = condense_python(SOURCE, 100)
+    assert len(out) > 100
+    assert out.split("\n", 1)[1] == (
+        "import os\n"
+        "from typing import List\n"
+        "class Store(Base):\n"
+        "    def get(self, key: str) -> int:\n"
+        "        ...\n"
+        "    def put(self, key, value):\n"
+        "        ...\n"
+        "@decorator(1)\n"
+        "async def main():\n"
+        "    ...\n"
+    )
+
+
+def test_bodies_are_restored_in_file_order():
+    small = "def a():\n    return 1\n\n\ndef b():\n    return 2\n"
+    out = condense_python(small, len(condense_python(small, 0)) + len("    return 1\n") - len("    ...\n"))
+    assert "def a():\n    return 1\ndef b():\n    ...\n" in out
+
+
+def test_long_expressions_are_shortened():
+    out = condense_python("VALUES = [" + ", ".join(str(i) for i in range(200)) + "]\n", 10_000)
+    assert out.endswith("...\n")
+    assert len(out.splitlines()[1]) == code_condense.MAX_EXPR_CHARS + 3
+
+
+def test_condense_dispatch_and_failures():
+    assert condense("notes.txt", SOURCE, 300) is None
+    assert condense("broken.py", "def (:\n", 300) is None
+    assert condense("MAIN.PY", SOURCE, 300) == condense_python(SOURCE, 300)
+    assert code_condense.supports("gui.pyw") and not code_condense.supports("a.js")
+
+
+def test_results_are_cached_by_content_and_limit(monkeypatch):
+    calls = []
+
+    def counting(source, max_chars):
+        calls.append(max_chars)
+        return condense_python(source, max_chars)
+
+    monkeypatch.setitem(code_condense.CONDENSERS, ".py", counting)
+    hits = CONDENSE_CACHE_LOOKUPS.value(result="hit")
+    first = condense("a.py", SOURCE, 300)
+    assert condense("b.py", SOURCE, 300) == first
+    condense("a.py", SOURCE, 400)
+    assert condense("broken.py", "def (:\n", 300) is None
+    assert condense("broken.py", "def (:\n", 300) is None
+    assert calls == [300, 400, 300]  # the broken file was parsed once
+    assert CONDENSE_CACHE_LOOKUPS.value(result="hit") == hits + 2
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(code_condense, "CACHE_MAX_ENTRIES", 2)
+    for limit in (200, 300, 400):
+        condense("a.py", SOURCE, limit)
+    assert [limit for _sha, limit in code_condense._cache] == [300, 400]
+
+
+def test_long_python_files_are_condensed_in_prompts():
+    source = SOURCE + "\n" * 2000
+    section = phase_engine._file_section("store.py", source, 1000)
+    assert "# [condensed:" in section and phase_engine.TRUNCATED_MARKER not in section
+
+    text = "x" * 2000
+    assert phase_engine._file_section("notes.txt", text, 1000).endswith("x" * 1000 + phase_engine.TRUNCATED_MARKER)
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import dedup
+from dedup import Duplicate, annotate, find_duplicates
+
+WORDS = "model data patient triage score train test deploy monitor record field value risk alert".split()
+
+
+def text(seed: int, words: int = 400) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randrange(50)) for _ in range(words))
+
+
+def edited(content: str, every: int) -> str:
+    """content with every n-th word changed"""
+    words = content.split()
+    return " ".join(w + "x" if i % every == 0 else w for i, w in enumerate(words))
+
+
+@pytest.fixture(autouse=True)
+def default_settings():
+    yield
+    dedup.configure()
+
+
+def test_exact_duplicates_keep_the_original_name():
+    original = text(1)
+    found = find_duplicates({"train (1).py": original, "train.py": original, "other.py": text(2)})
+    assert found == {"train (1).py": Duplicate("train.py", 1.0)}
+    assert found["train (1).py"].note() == "[Exact duplicate of train.py: content omitted]"
+
+
+def test_near_duplicates():
+    original = text(1)
+    found = find_duplicates({"a.py": original, "b_backup.py": edited(original, 200), "c.py": text(3)})
+    assert list(found) == ["b_backup.py"]
+    duplicate = found["b_backup.py"]
+    assert duplicate.of == "a.py" and not duplicate.exact
+    assert 0.9 <= duplicate.similarity <= 0.99
+    assert duplicate.note().startswith("[Near-duplicate of a.py (~")
+
+
+def test_dissimilar_files_are_kept():
+    original = text(1)
+    assert find_duplicates({"a.py": original, "b.py": edited(original, 3), "c.py": text(2)}) == {}
+
+
+def test_longest_file_is_kept_when_no_name_looks_like_a_copy():
+    original = text(1)
+    longer = original + " " + " ".join(original.split()[:5])
+    found = find_duplicates({"a.py": original, "b.py": longer})
+    assert found["a.py"].of == "b.py"
+
+
+def test_group_of_exact_and_near_copies():
+    original = text(1)
+    near = " ".join(original.split()[:-5])
+    found = find_duplicates({"z.py": original, "a copy.py": original, "y.py": near, "y.old": near})
+    assert set(found) == {"a copy.py", "y.py", "y.old"}
+    assert found["a copy.py"] == Duplicate("z.py", 1.0)
+    assert {found["y.py"].of, found["y.old"].of} == {"z.py"} and not found["y.py"].exact
+
+
+def test_chained_edits_only_drop_files_close_to_the_kept_one():
+    files = {"f0.py": text(1, words=1000)}
+    for i in range(1, 7):
+        words = files[f"f{i - 1}.py"].split()
+        files[f"f{i}.py"] = " ".join(w + "x" if n % 200 == i * 29 else w for n, w in enumerate(words))
+    found = find_duplicates(files)
+    assert found and len({d.of for d in found.values()}) > 1
+    for name, duplicate in found.items():
+        assert duplicate.similarity >= dedup.SIMILARITY
+        assert dedup._similarity(dedup.signature(files[name]), dedup.signature(files[duplicate.of])) >= dedup.SIMILARITY
+
+
+def test_short_and_binary_files_are_ignored():
+    assert find_duplicates({"a.txt": "same", "b.txt": "same", "c.bin": b"\x00" * 500, "d.bin": b"\x00" * 500}) == {}
+
+
+def test_modes():
+    original = text(1)
+    files = {"a.py": original, "b.py": original, "c.py": edited(original, 200)}
+    dedup.configure(mode="exact")
+    assert set(find_duplicates(files)) == {"b.py"}
+    dedup.configure(mode="off")
+    assert find_duplicates(files) == {}
+    dedup.configure(similarity=1.0)
+    assert set(find_duplicates(files)) == {"b.py"}
+    with pytest.raises(ValueError):
+        dedup.configure(mode="fuzzy")
+
+
+def test_signatures_are_deterministic():
+    assert (dedup.signature(text(1)) == dedup.signature(text(1))).all()
+    assert dedup._similarity(dedup.signature(text(1)), dedup.signature(text(2))) < 0.1
+
+
+def test_annotate_replaces_duplicates_with_notes():
+    original = text(1)
+    files = {"a.py": original, "b.py": original, "c.py": "small"}
+    duplicates = find_duplicates(files)
+    assert annotate(files, duplicates) == {"a.py": original, "b.py": "[Exact duplicate of a.py: content omitted]",
+                                           "c.py": "small"}
+    assert annotate(files, {}) is files
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+import extraction
+
+PNG = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+
+
+def notebook(cells, language="python"):
+    return json.dumps({
+        "cells": cells,
+        "metadata": {"kernelspec": {"language": language, "name": "python3"}},
+        "nbformat": 4,
+        "nbformat_minor": 5,
+    })
+
+
+def code_cell(source, outputs=()):
+    return {"cell_type": "code", "metadata": {"tags": ["x"]}, "execution_count": 1,
+            "source": source, "outputs": list(outputs)}
+
+
+@pytest.fixture(autouse=True)
+def default_settings():
+    yield
+    extraction.configure()
+
+
+def test_cells_in_order_with_text_outputs():
+    text = notebook([
+        {"cell_type": "markdown", "metadata": {}, "source": ["# Training\n", "Fit the model."]},
+        code_cell(["import pandas as pd\n", "df = pd.read_csv('x.csv')"], [
+            {"output_type": "stream", "name": "stdout", "text": ["loaded 10 rows\n"]},
+        ]),
+        code_cell("model.score(X, y)", [
+            {"output_type": "execute_result", "data": {"text/plain": "0.93", "text/html": "<b>0.93</b>"},
+             "metadata": {}, "execution_count": 2},
+        ]),
+    ])
+
+    assert extraction.extract_notebook(text) == (
+        "# Jupyter notebook (python, 3 cells; outputs and images stripped)\n\n"
+        "# [markdown cell 1]\n# Training\nFit the model.\n\n"
+        "# [code cell 2]\nimport pandas as pd\ndf = pd.read_csv('x.csv')\n\n"
+        "# [output 2]\nloaded 10 rows\n\n"
+        "# [code cell 3]\nmodel.score(X, y)\n\n"
+        "# [output 3]\n0.93\n"
+    )
+
+
+def test_images_widgets_and_metadata_are_dropped():
+    text = notebook([
+        {"cell_type": "markdown", "metadata": {}, "source": f"Plot: ![roc](data:image/png;base64,{PNG})",
+         "attachments": {"roc.png": {"image/png": PNG}}},
+        code_cell("plt.show()", [
+            {"output_type": "display_data", "data": {"image/png": PNG}, "metadata": {}},
+            {"output_type": "display_data",
+             "data": {"application/vnd.jupyter.widget-view+json": {"model_id": "abc"}}, "metadata": {}},
+        ]),
+    ])
+
+    out = extraction.extract_notebook(text)
+    assert PNG not in out and "model_id" not in out and "tags" not in out
+    assert "Plot: ![roc](embedded image)" in out
+    assert "# [output 2]\n[2 non-text output(s) omitted]" in out
+
+
+def test_errors_and_ansi_codes():
+    text = notebook([code_cell("1/0", [
+        {"output_type": "stream", "name": "stderr", "text": "\x1b[31mwarning\x1b[0m\n"},
+        {"output_type": "error", "ename": "ZeroDivisionError", "evalue": "division by zero", "traceback": []},
+    ])])
+
+    assert "# [output 1]\nwarning\nZeroDivisionError: division by zero" in extraction.extract_notebook(text)
+
+
+def test_outputs_truncated_or_disabled():
+    text = notebook([code_cell("print(x)", [{"output_type": "stream", "name": "stdout", "text": "y" * 50}])])
+
+    extraction.configure(notebook_output_chars=10)
+    assert "# [output 1]\n" + "y" * 10 + "\n...[40 more chars of output]" in extraction.extract_notebook(text)
+
+    extraction.configure(notebook_output_chars=0)
+    assert "output" not in extraction.extract_notebook(text).split("\n", 1)[1]
+
+
+def test_language_falls_back_to_language_info():
+    text = json.dumps({"cells": [], "metadata": {"language_info": {"name": "R"}}})
+    assert extraction.extract_notebook(text).startswith("# Jupyter notebook (R, 0 cells;")
+
+
+def test_extract_dispatches_on_extension():
+    text = notebook([code_cell("x = 1")])
+    assert extraction.extract("Model.IPYNB", text).startswith("# Jupyter notebook")
+    assert extraction.extract("notes.json", text) == text
+    assert extraction.extractor_name("a.ipynb") == "notebook"
+    assert extraction.extractor_name("a.py") is None
+
+
+@pytest.mark.parametrize("text", ['{"cells": [', '{"metadata": {}}', '["not", "a", "notebook"]'])
+def test_malformed_notebook_is_kept_as_text(text):
+    assert extraction.extract("broken.ipynb", text) == text
+
+
+def test_load_text_extracts_notebooks(tmp_path):
+    path = tmp_path / "train.ipynb"
+    path.write_text(notebook([code_cell("fit()")]), encoding="utf-8")
+    assert "# [code cell 1]\nfit()" in extraction.load_text(str(path))
+
+
+def test_settings_follow_configure():
+    extraction.configure(notebook_output_chars=-5, table_max_rows=0, table_sample_rows=3)
+    assert extraction.settings() == {"notebook_output_chars": 0, "table_max_rows": 1, "table_sample_rows": 3}
@@ -0,0 +1,84 @@
+import sys
+import types
+
+import pytest
+
+import llm_client
+from llm_client import LazyModel, ModelUnavailable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def genai(monkeypatch):
+    """A stand-in google.generativeai whose GenerativeModel fails until told otherwise"""
+    module = types.ModuleType("google.generativeai")
+    module.fail = True
+    module.created = 0
+
+    def generative_model(model_name, generation_config):
+        module.created += 1
+        if module.fail:
+            raise RuntimeError("network down")
+        return types.SimpleNamespace(generate_content=lambda prompt: f"echo {prompt}")
+
+    module.configure = lambda api_key: None
+    module.GenerativeModel = generative_model
+    parent = sys.modules.get("google") or types.ModuleType("google")
+    monkeypatch.setitem(sys.modules, "google", parent)
+    monkeypatch.setattr(parent, "generativeai", module, raising=False)
+    monkeypatch.setitem(sys.modules, "google.generativeai", module)
+    monkeypatch.setenv("TEST_API_KEY", "key")
+    return module
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_client, "time", clock)
+    return clock
+
+
+def test_missing_key_is_reported_without_initializing(monkeypatch):
+    monkeypatch.delenv("TEST_API_KEY", raising=False)
+    model = LazyModel("m", api_key_env="TEST_API_KEY")
+    assert model.unavailable_reason() == "TEST_API_KEY missing in .env"
+    with pytest.raises(ModelUnavailable):
+        model.generate_content("hi")
+
+
+def test_failed_init_is_retried_after_backoff(genai, clock):
+    model = LazyModel("m", api_key_env="TEST_API_KEY", retry_seconds=5, max_retry_seconds=8)
+    assert model.unavailable_reason() is None
+    with pytest.raises(ModelUnavailable):
+        model.generate_content("hi")
+    assert "network down" in model.unavailable_reason()
+
+    # within the backoff: fail fast, no new attempt
+    clock.now += 4
+    with pytest.raises(ModelUnavailable):
+        model.generate_content("hi")
+    assert genai.created == 1
+
+    # due again: the next failure doubles the backoff (capped)
+    clock.now += 2
+    assert model.unavailable_reason() is None
+    with pytest.raises(ModelUnavailable):
+        model.generate_content("hi")
+    assert genai.created == 2
+    clock.now += 7
+    assert model.unavailable_reason() is not None
+    clock.now += 2
+
+    genai.fail = False
+    assert model.generate_content("hi") == "echo hi"
+    assert model.unavailable_reason() is None and model.status()["state"] == "ready"
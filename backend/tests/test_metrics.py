@@ -0,0 +1,54 @@
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, render_latest
+
+
+@pytest.fixture
+def registered():
+    """Metrics created in a test, removed from the global registry afterwards"""
+    before = list(metrics.REGISTRY), list(metrics.COLLECTORS)
+    yield
+    metrics.REGISTRY[:], metrics.COLLECTORS[:] = before
+
+
+def test_counter_and_gauge(registered):
+    counter = Counter("test_events_total", "Events", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+    assert counter.value(kind="a") == 3 and counter.value(kind="b") == 0
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="a")
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+    gauge = Gauge("test_level", "Level")
+    gauge.set(5)
+    gauge.dec(2)
+    assert gauge.value() == 3
+
+
+def test_histogram_buckets_are_cumulative(registered):
+    histogram = Histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    samples = {(name, labels.get("le")): value for name, labels, value in histogram.samples()}
+    assert samples == {
+        ("test_seconds_bucket", "0.1"): 1,
+        ("test_seconds_bucket", "1"): 2,
+        ("test_seconds_bucket", "+Inf"): 3,
+        ("test_seconds_sum", None): 5.55,
+        ("test_seconds_count", None): 3,
+    }
+
+
+def test_render_runs_collectors_and_escapes_labels(registered):
+    gauge = Gauge("test_entries", "Entries", ("cache",))
+    metrics.register_collector(lambda: gauge.set(7, cache='a"b'))
+    text = render_latest()
+    assert "# TYPE test_entries gauge" in text
+    assert 'test_entries{cache="a\\"b"} 7' in text
+
+
+def test_builtin_collectors_render():
+    assert "sdlc_cache_hit_ratio" in render_latest()
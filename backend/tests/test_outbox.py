@@ -0,0 +1,95 @@
+import asyncio
+import io
+import json
+import sqlite3
+
+import pytest
+
+from outbox import DeliverySink, FilesystemSink, OutboxDispatcher, SQLiteSink
+from report_store import ReportStore
+
+SUBMISSION = {
+    "analysisResults": {"phases": {"testing": {"score": 40, "analysis": "No integration tests."}}},
+    "overallScore": "40",
+    "filesAnalyzed": ["a.py"],
+    "timestamp": "2026-01-02T03:04:05Z",
+}
+
+
+class FlakySink(DeliverySink):
+    name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+
+    def deliver(self, batch):
+        self.calls += 1
+        if self.calls == 1:
+            raise OSError("sink down")
+        return {d.idempotency_key: None for d in batch}
+
+
+async def fake_pdf(row):
+    pdf = b"%PDF-" + row["reportId"].encode()
+    return io.BytesIO(pdf), len(pdf)
+
+
+def test_identical_submissions_are_separate_deliveries(client):
+    first = client.post("/send-to-reviewer", json=SUBMISSION).json()
+    second = client.post("/send-to-reviewer", json=SUBMISSION).json()
+    assert first["reportId"] != second["reportId"]
+    assert first["idempotencyKey"] != second["idempotencyKey"]
+
+
+def test_idempotency_key_deduplicates_retries(client):
+    headers = {"Idempotency-Key": "retry-me-1"}
+    first = client.post("/send-to-reviewer", json=SUBMISSION, headers=headers)
+    second = client.post("/send-to-reviewer", json=SUBMISSION, headers=headers)
+    assert first.status_code == second.status_code == 202
+    assert first.json()["reportId"] == second.json()["reportId"]
+    bad = client.post("/send-to-reviewer", json=SUBMISSION, headers={"Idempotency-Key": "no spaces"})
+    assert bad.status_code == 400
+
+
+def test_idempotency_key_reused_for_another_report_is_rejected(client):
+    headers = {"Idempotency-Key": "retry-me-2"}
+    assert client.post("/send-to-reviewer", json=SUBMISSION, headers=headers).status_code == 202
+    changed = client.post("/send-to-reviewer", json={**SUBMISSION, "overallScore": "90"}, headers=headers)
+    assert changed.status_code == 422
+
+
+def test_delivery_sink_is_abstract():
+    with pytest.raises(TypeError):
+        DeliverySink()
+
+
+def test_dispatcher_delivers_to_filesystem_sink(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    report_id = store.add_report("key", "2026-01-02T03:04:05Z", 40, ["a.py"], SUBMISSION, None, outbox_key="sub-1")
+    dispatcher = OutboxDispatcher(store, FilesystemSink(str(tmp_path / "out")), fake_pdf)
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+    assert (tmp_path / "out" / "sub-1.pdf").read_bytes() == b"%PDF-" + report_id.encode()
+    metadata = json.loads((tmp_path / "out" / "sub-1.json").read_text())
+    assert metadata["reportId"] == report_id and metadata["phases"]["testing"]["score"] == 40
+    assert store.outbox_counts()["delivered"] == 1
+
+
+def test_failed_delivery_is_retried_with_backoff(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    report_id = store.add_report("key", "2026-01-02T03:04:05Z", 40, ["a.py"], SUBMISSION, None, outbox_key="sub-1")
+    sink = FlakySink()
+    dispatcher = OutboxDispatcher(store, sink, fake_pdf, base_backoff_seconds=0.0)
+    asyncio.run(dispatcher.dispatch_once())
+    assert store.delivery_status(report_id) == {"status": "pending", "attempts": 1, "lastError": "sink down",
+                                                "deliveredAt": None}
+    asyncio.run(dispatcher.dispatch_once())
+    assert store.outbox_counts()["delivered"] == 1 and sink.calls == 2
+
+
+def test_dispatcher_delivers_to_sqlite_sink(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    report_id = store.add_report("key", "2026-01-02T03:04:05Z", 40, ["a.py"], SUBMISSION, None, outbox_key="sub-1")
+    dispatcher = OutboxDispatcher(store, SQLiteSink(str(tmp_path / "out.db")), fake_pdf)
+    assert asyncio.run(dispatcher.dispatch_once()) == 1
+    rows = sqlite3.connect(str(tmp_path / "out.db")).execute("SELECT idempotency_key, pdf FROM deliveries").fetchall()
+    assert rows == [("sub-1", b"%PDF-" + report_id.encode())]
@@ -0,0 +1,19 @@
+from pdf_generator import render_pdf_bytes, render_pdf_to_file
+
+RESULTS = {
+    "requirements": {"score": 80, "analysis": "✅ Requirements are documented.\n❌ No acceptance criteria."},
+    "testing": {"score": 40, "analysis": "Unit tests exist; no integration tests."},
+}
+
+
+def test_file_render_matches_in_memory_render(tmp_path):
+    path = tmp_path / "report.pdf"
+    size = render_pdf_to_file(str(path), RESULTS, "60", ["a.py", "b.md"], "2026-01-02T03:04:05Z")
+    data = path.read_bytes()
+    assert size == len(data) and data.startswith(b"%PDF")
+    assert data == render_pdf_bytes(RESULTS, "60", ["a.py", "b.md"], "2026-01-02T03:04:05Z")
+
+
+def test_render_is_deterministic_for_the_same_timestamp():
+    first = render_pdf_bytes(RESULTS, "60", ["a.py"], "2026-01-02T03:04:05Z")
+    assert first == render_pdf_bytes(RESULTS, "60", ["a.py"], "2026-01-02T03:04:05Z")
@@ -0,0 +1,56 @@
+import pytest
+
+from cancellation import AnalysisCancelled
+from phase_engine import parse_score, run_phase, split_emojis
+from phase_specs import PHASES
+
+TESTING = PHASES["testing"]
+
+
+class FixedModel:
+    def __init__(self, text=None, error=None):
+        self.text = text
+        self.error = error
+
+    def generate_content(self, prompt):
+        if self.error is not None:
+            raise self.error
+        return type("Response", (), {"text": self.text})()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. TEST COVERAGE SCORE: 64/100", 64),
+    ("1. **TEST COVERAGE SCORE: 64/100**", 64),
+    ("1. TEST COVERAGE SCORE: [64]/100", 64),
+    ("SCORE: 55/100\n1. TEST COVERAGE SCORE: 64/100", 64),  # the phase's own label first
+    ("OVERALL SCORE: 55/100", 55),                           # then any SCORE line
+    ("1. TEST COVERAGE SCORE: [X]/100\nSCORE: 40/100", 40),  # unparsable value is skipped
+    ("TEST COVERAGE SCORE: 64", 80),                         # no /100
+    ("no score here", 80),
+])
+def test_parse_score(text, expected):
+    assert parse_score(TESTING, text) == expected
+
+
+def test_split_emojis():
+    assert split_emojis("a ✅ b ❌ c") == "a \n✅ b \n❌ c"
+    assert split_emojis("x✅❌") == "x\n✅\n❌"
+    assert split_emojis("✅ first\n❌ second") == "✅ first\n❌ second"
+    assert split_emojis("plain text") == "plain text"
+
+
+def test_run_phase_splits_emojis_only_where_configured():
+    answer = "1. SCORE: 70/100 ✅ PRESENT: docs"
+    assert run_phase(TESTING, {"a.py": "x = 1"}, FixedModel(answer))["analysis"] == \
+        "1. SCORE: 70/100 \n✅ PRESENT: docs"
+    assert run_phase(PHASES["design"], {"a.py": "x = 1"}, FixedModel(answer))["analysis"] == answer
+
+
+def test_run_phase_error_becomes_result():
+    result = run_phase(TESTING, {"a.py": "x = 1"}, FixedModel(error=RuntimeError("quota")))
+    assert result == {"phase": "Testing", "score": 0, "analysis": "Error during analysis: quota", "status": "error"}
+
+
+def test_run_phase_propagates_cancellation():
+    with pytest.raises(AnalysisCancelled):
+        run_phase(TESTING, {"a.py": "x = 1"}, FixedModel(error=AnalysisCancelled("client_disconnected")))
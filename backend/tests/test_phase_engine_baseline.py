@@ -0,0 +1,54 @@
+"""
+The phase engine against the per-phase analyzers it replaced: same prompts
+and same results for the same files and model answer.
+data/baseline_phases.json was recorded by running the original analyzers
+(backend/analyzers/*_analyzer.py before the engine) on FILES with EchoModel.
+"""
+
+import json
+import os
+
+import pytest
+
+from phase_engine import build_prompt, run_phase
+from phase_specs import PHASES
+
+FILES = {
+    "README.md": "# Triage DSS\nPredicts ICU triage priority.\n",
+    "train.py": "import pandas as pd\n\ndef train(df):\n    return df.mean()\n",
+    "tests/test_train.py": "def test_train():\n    assert True\n",
+    "model.bin": b"\x00\x01",
+}
+
+# inline status emojis and a score line, as models often answer
+RESPONSE = (
+    "1. SCORE: 72/100 ✅ PRESENT: docs ❌ MISSING: tests\n"
+    "   🔴 CRITICAL: no monitoring 🟡 MODERATE: naming 🟢 ok\n"
+    "   ✓ unit tests✗ load tests\n"
+    "💡 TOP RECOMMENDATIONS 1. Add tests"
+)
+
+
+class EchoModel:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return type("Response", (), {"text": RESPONSE})()
+
+
+with open(os.path.join(os.path.dirname(__file__), "data", "baseline_phases.json"), encoding="utf-8") as f:
+    BASELINE = json.load(f)
+
+
+@pytest.mark.parametrize("phase", list(PHASES))
+def test_prompt_matches_baseline(phase):
+    assert build_prompt(PHASES[phase], dict(FILES)) == BASELINE[phase]["prompt"]
+
+
+@pytest.mark.parametrize("phase", list(PHASES))
+def test_result_matches_baseline(phase):
+    model = EchoModel()
+    assert run_phase(PHASES[phase], dict(FILES), model) == BASELINE[phase]["result"]
+    assert model.prompts == [BASELINE[phase]["prompt"]]
@@ -0,0 +1,68 @@
+import asyncio
+
+from profiling import Profiler, ProfilingMiddleware
+
+
+def make_profiler(tmp_path):
+    return Profiler(True, "secret", str(tmp_path), interval=0.001, top=10)
+
+
+def test_load_rejects_malformed_ids(tmp_path):
+    profiler = make_profiler(tmp_path)
+    profiler.save("abc123", {"id": "abc123"})
+    assert profiler.load("abc123") == {"id": "abc123"}
+    assert profiler.load("") is None
+    assert profiler.load("../abc123") is None
+    assert profiler.load("ABC123") is None
+
+
+def test_one_profile_at_a_time(tmp_path):
+    profiler = make_profiler(tmp_path)
+    assert profiler.try_begin()
+    assert not profiler.try_begin()
+    profiler.end()
+    assert profiler.try_begin()
+
+
+def test_disabled_without_admin_token(tmp_path):
+    profiler = Profiler(True, "", str(tmp_path))
+    assert not profiler.enabled and not profiler.authorised("")
+
+
+def run_request(middleware, headers):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/work", "headers": headers}
+    asyncio.run(middleware(scope, receive, send))
+    return dict(sent[0]["headers"])
+
+
+async def app(scope, receive, send):
+    blob = [bytes(1000) for _ in range(100)]
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": str(len(blob)).encode()})
+
+
+def test_middleware_captures_cpu_and_alloc_profile(tmp_path):
+    profiler = make_profiler(tmp_path)
+    headers = run_request(ProfilingMiddleware(app, profiler),
+                          [(b"x-profile", b"cpu,alloc"), (b"x-admin-token", b"secret")])
+    assert headers[b"x-profile-status"] == b"captured"
+    profile = profiler.load(headers[b"x-profile-id"].decode())
+    assert profile["path"] == "/work" and "cpu" in profile and profile["alloc"]["peak_bytes"] > 0
+    assert profiler.try_begin()  # slot given back
+
+
+def test_middleware_ignores_unauthorised_and_busy_requests(tmp_path):
+    profiler = make_profiler(tmp_path)
+    middleware = ProfilingMiddleware(app, profiler)
+    assert run_request(middleware, [(b"x-profile", b"cpu"), (b"x-admin-token", b"wrong")]) == {}
+    profiler.try_begin()
+    headers = run_request(middleware, [(b"x-profile", b"cpu"), (b"x-admin-token", b"secret")])
+    assert headers == {b"x-profile-status": b"busy"}
@@ -0,0 +1,139 @@
+import json
+
+import pytest
+
+import project_digest
+from project_digest import build_digest, excerpt_files, file_kind, render
+
+PROJECT = {
+    "app.py": (
+        "from fastapi import FastAPI\n"
+        "import models\n"
+        "from .utils import helper\n"
+        "\n"
+        "class Api:\n"
+        "    def get(self):\n"
+        "        pass\n"
+        "\n"
+        "def main():\n"
+        "    pass\n"
+    ),
+    "models.py": "import pandas as pd\nfrom sklearn.linear_model import LogisticRegression\n\ndef train():\n    pass\n",
+    "utils.py": "def helper():\n    pass\n",
+    "test_app.py": "import app\n\ndef test_main():\n    pass\n\ndef test_get():\n    pass\n",
+    "index.js": "import React from 'react'\nconst api = require('./api')\n",
+    "api.js": "import axios from 'axios'\n",
+    "api.test.js": "test('calls', () => {})\nit('retries', () => {})\n",
+    "requirements.txt": "# pinned\nfastapi==0.110\nuvicorn[standard]>=0.29\n-r base.txt\n",
+    "Dockerfile": "FROM python:3.11\n",
+    "README.md": "# Triage\n## Setup\nText\n### Run ###\n",
+    "SRS.txt": "1. Introduction\n1.1 Purpose of the system\nplain line.\n",
+    "train.ipynb": "# Jupyter notebook (python, 2 cells)\n\n# [markdown cell 1]\nimport os\n\n# [code cell 2]\nimport torch\n",
+    "data.csv": "a,b\n1,2\n",
+    "logo.png": "[Binary file: logo.png]",
+    "model.bin": b"\x00",
+}
+
+
+@pytest.fixture
+def digest():
+    return build_digest(PROJECT)
+
+
+@pytest.mark.parametrize("filename, kind", [
+    ("app.py", "code"), ("test_app.py", "test"), ("api.test.js", "test"), ("conftest.py", "test"),
+    ("Dockerfile", "deploy"), ("ci-workflow.yml", "deploy"), ("docker-compose.yml", "deploy"),
+    ("requirements-dev.txt", "config"), ("settings.yaml", "config"), ("README.md", "doc"),
+    ("train.ipynb", "notebook"), ("data.parquet", "data"), ("notes", "other"), ("test_data.csv", "data"),
+])
+def test_file_kind(filename, kind):
+    assert file_kind(filename, "") == kind
+
+
+def test_binary_placeholder_kind():
+    assert file_kind("logo.png", "[Binary file: logo.png]") == "binary"
+
+
+def test_inventory(digest):
+    files = {f["name"]: f for f in digest["files"]}
+    assert list(files) == list(PROJECT)
+    assert files["app.py"] == {"name": "app.py", "kind": "code", "language": "python", "lines": 11,
+                               "chars": len(PROJECT["app.py"]), "symbols": ["class Api (1 methods)", "main()"]}
+    assert files["index.js"]["language"] == "javascript"
+    assert files["Dockerfile"]["language"] == "none"
+    assert files["model.bin"] == {"name": "model.bin", "kind": "other", "language": "bin", "lines": 1,
+                                  "chars": 0, "symbols": []}
+
+
+def test_module_graph(digest):
+    assert digest["edges"] == [
+        ["app.py", "models.py"],
+        ["app.py", "utils.py"],  # relative import
+        ["index.js", "api.js"],  # only ./relative JS imports are local
+        ["test_app.py", "app.py"],
+    ]
+
+
+def test_frameworks_tests_deployment_docs(digest):
+    assert set(digest["frameworks"]) == {"FastAPI", "pandas", "scikit-learn", "React", "axios", "Uvicorn", "PyTorch"}
+    assert digest["frameworks"][0] == "FastAPI"  # imported and declared
+    assert digest["tests"] == {"files": ["test_app.py", "api.test.js"], "test_functions": 4}
+    assert digest["deployment"] == ["requirements.txt", "Dockerfile"]
+    assert digest["docs"] == {
+        "README.md": ["Triage", "  Setup", "    Run"],
+        "SRS.txt": ["1 Introduction", "  1.1 Purpose of the system"],
+    }
+    assert digest["overview"] is None
+
+
+def test_digest_is_json_serializable(digest):
+    assert json.loads(json.dumps(digest)) == digest
+
+
+def test_unparsable_python_still_listed():
+    digest = build_digest({"broken.py": "def (:\n"})
+    assert digest["files"][0]["symbols"] == [] and digest["edges"] == []
+
+
+def test_render(digest):
+    text = render(digest)
+    assert text.startswith("PROJECT DIGEST\nFiles: 15 (")
+    assert "Frameworks / libraries: FastAPI, " in text
+    # the most imported file comes first in the inventory
+    assert "File inventory (name | kind | language | lines | top-level symbols):\n- app.py | code | python | 11 | class Api (1 methods), main()\n" in text
+    assert "- app.py -> models.py, utils.py\n" in text
+    assert "Tests: 2 test files, 4 test functions: test_app.py, api.test.js\n" in text
+    assert "Deployment / build artifacts: requirements.txt, Dockerfile\n" in text
+    assert "- README.md\n    Triage\n      Setup\n" in text
+    assert "Overview:" not in text
+
+    digest["overview"] = "A triage tool.\n"
+    assert "\nOverview:\nA triage tool.\n" in render(digest)
+
+
+def test_render_caps_inventory_and_symbols(monkeypatch):
+    monkeypatch.setattr(project_digest, "MAX_INVENTORY_FILES", 2)
+    monkeypatch.setattr(project_digest, "MAX_SYMBOLS_PER_FILE", 1)
+    text = render(build_digest({f"m{i}.py": "def a():\n    pass\ndef b():\n    pass\n" for i in range(3)}))
+    assert "- m0.py | code | python | 5 | a(), +1 more\n" in text
+    assert "- ... 1 more files\n" in text
+    assert "- no local imports" in text and "- no documents" in text
+
+
+def test_excerpt_files(digest):
+    # most central first: app.py is imported and imports two files
+    assert excerpt_files(digest, ("code",)) == ["app.py", "api.js", "models.py", "utils.py", "index.js"]
+    assert excerpt_files(digest, ("test", "code"), ("*api*",))[:3] == ["api.test.js", "api.js", "test_app.py"]
+    assert excerpt_files(digest, ("doc",), ("*srs*",)) == ["SRS.txt", "README.md"]
+
+
+def test_summarize_prompts_with_digest_and_docs(digest):
+    class Model:
+        def generate_content(self, prompt):
+            self.prompt = prompt
+            return type("Response", (), {"text": "  Overview text.  "})()
+
+    model = Model()
+    assert project_digest.summarize(digest, PROJECT, model) == "Overview text."
+    assert render(digest) in model.prompt
+    assert model.prompt.index("--- README.md ---") < model.prompt.index("--- SRS.txt ---")
@@ -0,0 +1,39 @@
+import asyncio
+import operator
+import time
+
+import pytest
+
+from render_pool import RenderPool, RenderQueueFull
+
+
+def test_runs_in_worker_process_and_tracks_pending():
+    async def run():
+        pool = RenderPool(workers=1, max_queue=1)
+        try:
+            assert await pool.run(operator.add, 2, 3) == 5
+            assert pool.started and pool.pending == 0
+        finally:
+            pool.shutdown()
+
+    asyncio.run(run())
+
+
+def test_rejects_work_beyond_workers_plus_queue():
+    async def run():
+        pool = RenderPool(workers=1, max_queue=1)
+        try:
+            await pool.warm("time")
+            first = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+            second = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+            await asyncio.sleep(0)
+            assert pool.pending == 2
+            with pytest.raises(RenderQueueFull) as excinfo:
+                await pool.run(time.sleep, 0)
+            assert excinfo.value.retry_after >= 1
+            await asyncio.gather(first, second)
+            assert pool.pending == 0
+        finally:
+            pool.shutdown()
+
+    asyncio.run(run())
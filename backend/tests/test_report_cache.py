@@ -0,0 +1,90 @@
+import os
+import time
+
+from report_cache import PDFDiskCache, payload_hash
+
+
+def age(cache, key, seconds):
+    path = cache.path_for(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_payload_hash_is_canonical_and_versioned():
+    assert payload_hash({"a": 1, "b": [1, 2]}) == payload_hash({"b": [1, 2], "a": 1})
+    assert payload_hash({"a": 1}, "v1") != payload_hash({"a": 1}, "v2")
+
+
+def test_put_get_and_stale_temp_cleanup(tmp_path):
+    (tmp_path / "left.tmp").write_bytes(b"x")
+    (tmp_path / "writing.tmp").write_bytes(b"x")
+    then = time.time() - 7200
+    os.utime(tmp_path / "left.tmp", (then, then))
+    cache = PDFDiskCache(str(tmp_path), max_bytes=1000)
+    assert not (tmp_path / "left.tmp").exists()
+    assert (tmp_path / "writing.tmp").exists()  # may be another worker's render in progress
+    assert cache.get("k") is None
+    path = cache.put("k", b"%PDF")
+    assert cache.get("k") == path and cache.peek("k") == path
+    assert cache.total_bytes == 4
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PDFDiskCache(str(tmp_path), max_bytes=250)
+    cache.put("old", b"x" * 100)
+    cache.put("used", b"x" * 100)
+    age(cache, "old", 60)
+    age(cache, "used", 120)
+    cache.get("used")  # touched: now the most recent
+    cache.put("new", b"x" * 100)
+    assert cache.peek("old") is None
+    assert cache.peek("used") and cache.peek("new")
+    assert cache.total_bytes == 200
+
+
+def test_limit_holds_across_instances_sharing_the_directory(tmp_path):
+    first = PDFDiskCache(str(tmp_path), max_bytes=250)
+    second = PDFDiskCache(str(tmp_path), max_bytes=250)
+    first.put("a", b"x" * 100)
+    age(first, "a", 60)
+    second.put("b", b"x" * 100)
+    age(second, "b", 30)
+    first.put("c", b"x" * 100)  # first never saw b, but still counts it
+    assert first.peek("a") is None
+    assert first.total_bytes == 200
+
+
+def test_newly_added_file_is_kept_even_if_over_budget(tmp_path):
+    cache = PDFDiskCache(str(tmp_path), max_bytes=50)
+    cache.put("small", b"x" * 10)
+    cache.put("big", b"x" * 100)
+    assert cache.peek("big") and cache.peek("small") is None
+
+
+def test_open_survives_eviction(tmp_path):
+    cache = PDFDiskCache(str(tmp_path), max_bytes=1000)
+    assert cache.open("k") is None
+    cache.put("k", b"%PDF")
+    with cache.open("k") as f:
+        os.remove(cache.path_for("k"))
+        assert f.read() == b"%PDF"
+    assert cache.open("k") is None
+
+
+def test_report_evicted_before_open_is_rendered_again(app_module, monkeypatch, tmp_path):
+    import asyncio
+
+    rendered = tmp_path / "rendered.pdf"
+    calls = []
+
+    async def render_report_cached(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            return str(tmp_path / "evicted.pdf")
+        rendered.write_bytes(b"%PDF-again")
+        return str(rendered)
+
+    monkeypatch.setattr(app_module, "render_report_cached", render_report_cached)
+    with asyncio.run(app_module.open_report_cached({}, "1", [], None)) as f:
+        assert f.read() == b"%PDF-again"
+    assert len(calls) == 2
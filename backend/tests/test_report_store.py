@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+from report_store import IdempotencyConflict, ReportNotFound, ReportNotReady, ReportStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    yield store
+    store.close()
+
+
+def add(store, day, score, phases=None, **kwargs):
+    payload = {"analysisResults": {"phases": {name: {"score": s} for name, s in (phases or {}).items()}}}
+    return store.add_report(f"key-{day}", f"2026-01-{day:02d}T00:00:00Z", score, ["a.py"], payload, b"%PDF", **kwargs)
+
+
+def test_keyset_pages_cover_every_report_once(store):
+    ids = [add(store, day, score=day) for day in range(1, 8)]
+    seen, cursor = [], None
+    while True:
+        page = store.list_reports(limit=3, cursor=cursor)
+        seen.extend(r["id"] for r in page["reports"])
+        cursor = page["nextCursor"]
+        if cursor is None:
+            break
+    assert seen == ids[::-1]
+    assert [r["overallScore"] for r in store.list_reports(sort="score", limit=2)["reports"]] == [7, 6]
+
+
+def test_status_filter_and_transitions(store):
+    first, second = add(store, 1, 50), add(store, 2, 60)
+    store.set_status(first, "approved")
+    assert [r["id"] for r in store.list_reports(status="approved")["reports"]] == [first]
+    assert [r["id"] for r in store.list_reports(status="pending")["reports"]] == [second]
+    with pytest.raises(ValueError):
+        store.set_status(first, "done")
+    with pytest.raises(ReportNotFound):
+        store.set_status("missing", "approved")
+
+
+def test_phase_score_filter(store):
+    weak = add(store, 1, 70, {"testing": 30, "design": 90})
+    add(store, 2, 80, {"testing": 85, "design": 40})
+    add(store, 3, 90)
+    listed = store.list_reports(phase="testing", max_phase_score=50)["reports"]
+    assert [r["id"] for r in listed] == [weak]
+    assert len(store.list_reports(phase="testing")["reports"]) == 2
+    with pytest.raises(ValueError):
+        store.list_reports(max_phase_score=50)
+
+
+def test_report_details_and_pdf(store):
+    report_id = add(store, 1, 70, {"testing": 30})
+    report = store.get_report(report_id)
+    assert report["phaseScores"] == {"testing": 30} and report["delivery"] is None
+    reader, key = store.open_pdf(report_id)
+    assert key == "key-1" and reader.size == 4
+    assert reader.read(3) == b"%PD" and reader.read() == b"F" and reader.read() == b""
+    pending = store.add_report("k", "2026-01-02T00:00:00Z", 10, [], {}, None)
+    assert not store.has_pdf(pending)
+    with pytest.raises(ReportNotReady):
+        store.open_pdf(pending)
+    with pytest.raises(ReportNotFound):
+        store.open_pdf("missing")
+    store.attach_pdf(pending, io.BytesIO(b"%PDF-late" * 10000), 90000)
+    reader, _key = store.open_pdf(pending)
+    assert reader.read() == b"%PDF-late" * 10000
+
+
+def test_outbox_key_makes_submission_idempotent(store):
+    first = add(store, 1, 70, outbox_key="submission-1")
+    assert add(store, 1, 70, outbox_key="submission-1") == first
+    assert add(store, 1, 70, outbox_key="submission-2") != first
+    with pytest.raises(IdempotencyConflict):
+        add(store, 2, 70, outbox_key="submission-1")
+    claimed = store.claim_outbox(limit=10, lease_seconds=60)
+    assert [c["idempotencyKey"] for c in claimed] == ["submission-1", "submission-2"]
+    assert store.claim_outbox(limit=10, lease_seconds=60) == []  # leased
+    store.mark_delivered([claimed[0]["id"]])
+    store.mark_retry(claimed[1]["id"], "sink down", None)
+    assert store.outbox_counts() == {"pending": 0, "in_flight": 0, "delivered": 1, "failed": 1}
@@ -0,0 +1,72 @@
+import os
+
+import retrieval
+from retrieval import BM25Index, chunk_text, format_excerpts, tokenize
+
+
+def write(directory, name, text):
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_tokenize_splits_camel_case_and_drops_stopwords():
+    assert tokenize("What is parseConfig") == ["parseconfig", "parse", "config"]
+    assert tokenize("load_user_profile") == ["load", "user", "profile"]
+
+
+def test_chunks_are_line_aligned_and_overlap():
+    text = "\n".join(f"line {i} " + "x" * 90 for i in range(100))
+    chunks = chunk_text("a.py", text)
+    assert len(chunks) > 1
+    assert all(len(c.text) <= retrieval.CHUNK_MAX_CHARS for c in chunks)
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == 100
+    for before, after in zip(chunks, chunks[1:]):
+        assert after.start_line == before.end_line - retrieval.CHUNK_OVERLAP_LINES + 1
+
+
+def test_long_line_is_split_across_chunks_not_truncated():
+    words = [f"word{i}" for i in range(1000)]
+    chunks = chunk_text("min.js", "first\n" + " ".join(words) + "\nlast")
+    assert all(len(c.text) <= retrieval.CHUNK_MAX_CHARS for c in chunks)
+    indexed = set().union(*(c.term_freqs for c in chunks))
+    assert {"first", "last", "word0", "word999"} <= indexed
+    assert any(c.start_line == c.end_line == 2 for c in chunks)
+
+
+def test_search_ranks_matching_chunks(tmp_path):
+    write(tmp_path, "auth.py", "def login(user, password):\n    return check_password(user, password)\n")
+    write(tmp_path, "db.py", "def connect(url):\n    return engine(url)\n")
+    index = BM25Index()
+    assert index.sync(str(tmp_path)) == {"indexed": 2, "removed": 0}
+    results = index.search("how does password login work")
+    assert [c.filename for c in results] == ["auth.py"]
+    assert index.search("kubernetes") == []
+    assert "--- auth.py (lines 1-2) ---" in format_excerpts(results)
+
+
+def test_sync_is_incremental_and_keeps_postings_consistent(tmp_path):
+    write(tmp_path, "a.py", "alpha beta\n")
+    write(tmp_path, "b.py", "beta gamma\n")
+    index = BM25Index()
+    index.sync(str(tmp_path))
+    assert index.sync(str(tmp_path)) == {"indexed": 0, "removed": 0}
+
+    write(tmp_path, "a.py", "delta\n")
+    os.remove(os.path.join(tmp_path, "b.py"))
+    assert index.sync(str(tmp_path)) == {"indexed": 1, "removed": 1}
+    assert index.search("alpha beta gamma") == []
+    assert [c.filename for c in index.search("delta")] == ["a.py"]
+    assert index.stats() == {"files": 1, "chunks": 1, "terms": 1}
+
+    index.clear()
+    assert index.stats() == {"files": 0, "chunks": 0, "terms": 0}
+
+
+def test_search_respects_top_k_and_token_budget(tmp_path):
+    for i in range(5):
+        write(tmp_path, f"f{i}.py", "shared term\n" + "filler " * 50 * (i + 1))
+    index = BM25Index()
+    index.sync(str(tmp_path))
+    assert len(index.search("shared", top_k=2)) == 2
+    budgeted = index.search("shared", token_budget=150)
+    assert budgeted and sum(c.tokens for c in budgeted) <= 150
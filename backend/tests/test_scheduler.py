@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from scheduler import PriorityExecutor
+
+CLASSES = {"chat": (8, 0), "analysis": (3, 0), "batch": (1, 0)}
+
+
+@pytest.fixture
+def make_executor():
+    executors = []
+
+    def make(max_workers=1, classes=CLASSES, aging_seconds=60.0):
+        executor = PriorityExecutor(max_workers, classes, "analysis", aging_seconds=aging_seconds)
+        executors.append(executor)
+        return executor
+
+    yield make
+    for executor in executors:
+        executor.shutdown(cancel_futures=True)
+
+
+def blocked(executor, name="chat"):
+    """Occupy a worker until the returned event is set"""
+    gate, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        gate.wait(5)
+
+    future = executor.submit_to(name, hold)
+    assert started.wait(5)
+    return gate, future
+
+
+def test_runs_calls_and_reports_errors(make_executor):
+    executor = make_executor(max_workers=2)
+    assert executor.submit(lambda x: x * 2, 21).result(5) == 42
+    assert executor.for_class("chat").submit(lambda: "hi").result(5) == "hi"
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(lambda: 1 / 0).result(5)
+
+
+def test_weights_share_starts_by_stride(make_executor):
+    executor = make_executor()
+    order = []
+    gate, first = blocked(executor)
+    futures = [executor.submit_to(name, order.append, name)
+               for name in ("chat", "analysis", "batch") for _ in range(24)]
+    gate.set()
+    for future in futures:
+        future.result(5)
+    # while all three classes are busy, every 12 starts (the first one being the blocking chat call) go 8:3:1
+    assert Counter(["chat"] + order[:11]) == {"chat": 8, "analysis": 3, "batch": 1}
+    assert Counter(order[11:23]) == {"chat": 8, "analysis": 3, "batch": 1}
+
+
+def test_idle_class_gets_no_saved_up_credit(make_executor):
+    executor = make_executor()
+    order = []
+    gate, _ = blocked(executor)
+    futures = [executor.submit_to("chat", order.append, "chat") for _ in range(24)]
+    gate.set()
+    for future in futures:
+        future.result(5)
+    # chat ran alone for a while; batch arriving now starts level with it,
+    # instead of running 3 calls in a row on credit from while it was idle
+    gate, _ = blocked(executor)
+    futures = [executor.submit_to(name, order.append, name) for name in ("batch", "chat") for _ in range(9)]
+    gate.set()
+    for future in futures:
+        future.result(5)
+    assert order[24:34] == ["batch"] + ["chat"] * 8 + ["batch"]
+
+
+def test_aged_calls_run_first(make_executor):
+    executor = make_executor(aging_seconds=0.05)
+    order = []
+    gate, _ = blocked(executor)
+    old = executor.submit_to("batch", order.append, "batch")
+    time.sleep(0.1)
+    futures = [executor.submit_to("chat", order.append, "chat") for _ in range(3)]
+    gate.set()
+    old.result(5)
+    for future in futures:
+        future.result(5)
+    assert order[0] == "batch"
+
+
+def test_class_limit_keeps_workers_free(make_executor):
+    executor = make_executor(max_workers=3, classes={"chat": (8, 0), "analysis": (3, 0), "batch": (1, 1)})
+    gates = [threading.Event() for _ in range(3)]
+    started = []
+    futures = [executor.submit_to("batch", lambda g=g: (started.append(g), g.wait(5))) for g in gates]
+    time.sleep(0.05)
+    assert len(started) == 1
+    assert executor.stats()["batch"] == {"queued": 2, "running": 1, "weight": 1, "limit": 1}
+    assert executor.submit_to("chat", lambda: "free").result(1) == "free"
+    for gate in gates:
+        gate.set()
+    for future in futures:
+        future.result(5)
+    assert len(started) == 3
+
+
+def test_cancelled_calls_never_run(make_executor):
+    executor = make_executor()
+    ran = []
+    gate, _ = blocked(executor)
+    cancelled = executor.submit_to("chat", ran.append, "cancelled")
+    kept = executor.submit_to("chat", ran.append, "kept")
+    assert cancelled.cancel()
+    gate.set()
+    kept.result(5)
+    assert ran == ["kept"]
+
+
+def test_shutdown(make_executor):
+    executor = make_executor()
+    gate, running = blocked(executor)
+    queued = executor.submit_to("batch", lambda: None)
+    gate.set()
+    executor.shutdown(cancel_futures=True)
+    assert running.done() and (queued.cancelled() or queued.done())
+    with pytest.raises(RuntimeError):
+        executor.submit(lambda: None)
+
+
+def test_configuration_errors():
+    with pytest.raises(ValueError):
+        PriorityExecutor(1, {"chat": (0, 0)}, "chat")
+    with pytest.raises(ValueError):
+        PriorityExecutor(1, CLASSES, "interactive")
+    executor = PriorityExecutor(1, CLASSES, "chat")
+    with pytest.raises(ValueError):
+        executor.for_class("interactive")
+    executor.shutdown()
@@ -0,0 +1,97 @@
+import asyncio
+import tempfile
+import time
+
+import pytest
+
+from shared_state import InflightGuard, MemoryBackend, SocketBackend, SQLiteBackend, StateServer
+
+
+@pytest.fixture(params=["memory", "sqlite", "socket"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryBackend()
+    elif request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "state.db"))
+        yield backend
+        backend.close()
+    else:
+        with tempfile.TemporaryDirectory() as directory:  # short path: unix socket names are limited
+            server = StateServer(f"unix:{directory}/state.sock")
+            server.start()
+            backend = SocketBackend(f"unix:{directory}/state.sock")
+            yield backend
+            backend.close()
+            server.shutdown()
+
+
+def test_namespaced_values_roundtrip(backend):
+    backend.set("a", "k", {"n": 1})
+    backend.set_many("b", {"k": [1, 2], "j": "x"})
+    assert backend.get("a", "k") == {"n": 1}
+    assert backend.get_many("b", ["k", "j", "missing"]) == {"k": [1, 2], "j": "x"}
+    backend.delete("a", "k")
+    assert backend.get("a", "k") is None
+    backend.ping()
+
+
+def test_values_expire(backend):
+    backend.set("a", "k", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get("a", "k") is None
+
+
+def test_locks_are_leased_per_owner(backend):
+    assert backend.acquire("job", "w1", ttl=10)
+    assert backend.acquire("job", "w1", ttl=10)  # renewal
+    assert not backend.acquire("job", "w2", ttl=10)
+    backend.release("job", "w2")  # not the holder: no effect
+    assert not backend.acquire("job", "w2", ttl=10)
+    backend.release("job", "w1")
+    assert backend.acquire("job", "w2", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.acquire("job", "w1", ttl=10)  # lease expired
+
+
+def test_unreachable_socket_backend_degrades_to_a_miss(tmp_path):
+    backend = SocketBackend(f"unix:{tmp_path}/none.sock", timeout=0.2)
+    assert backend.get("a", "k") is None
+    assert backend.acquire("job", "w1", ttl=1)  # uncontended
+    with pytest.raises(OSError):
+        backend.ping()
+
+
+def test_inflight_guard_computes_once_for_concurrent_callers():
+    backend = MemoryBackend()
+    guard = InflightGuard(backend, "test", poll_seconds=0.01)
+    calls = []
+
+    async def lookup():
+        return backend.get("results", "k")
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        backend.set("results", "k", "value")
+        return "value"
+
+    async def run():
+        return await asyncio.gather(*(guard.run("k", lookup, compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["value"] * 5
+    assert len(calls) == 1
+
+
+def test_inflight_guard_takes_over_an_expired_lease():
+    backend = MemoryBackend()
+    backend.acquire("test:k", "dead-worker", ttl=0.05)
+    guard = InflightGuard(backend, "test", poll_seconds=0.01)
+
+    async def lookup():
+        return None
+
+    async def compute():
+        return "mine"
+
+    assert asyncio.run(guard.run("k", lookup, compute)) == "mine"
+    assert backend.acquire("test:k", "someone", ttl=1)  # released afterwards
@@ -0,0 +1,260 @@
+import asyncio
+import os
+
+import pytest
+
+from admission import Overloaded
+from cancellation import AnalysisCancelled
+from metrics import SPECULATIVE_ANALYSIS
+from speculation import DetachedRequest, Speculator
+from usage import BudgetExceeded
+
+
+def events():
+    return {event: SPECULATIVE_ANALYSIS.value(event=event) for event in
+            ("scheduled", "completed", "superseded", "requested", "shutdown", "joined", "over_budget", "shed", "failed")}
+
+
+def delta(before):
+    return {event: n - before[event] for event, n in events().items() if n != before[event]}
+
+
+class Work:
+    """Speculative work that records its token and waits for release (or cancellation)"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.tokens = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, token):
+        self.tokens.append(token)
+        if self.error is not None:
+            raise self.error
+        while not self.release.is_set():
+            token.raise_if_cancelled()
+            await asyncio.sleep(0.005)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Speculator("always")
+
+
+def test_off_does_nothing():
+    async def main():
+        speculator = Speculator("off")
+        speculator.schedule("ws", "k", Work())
+        assert speculator.status("ws") is None and not await speculator.join("ws", "k")
+
+    asyncio.run(main())
+
+
+def test_run_completes_after_delay():
+    async def main():
+        speculator = Speculator("ingest", delay_seconds=0.02)
+        work = Work()
+        before = events()
+        speculator.schedule("ws", "k", work)
+        assert speculator.status("ws") == {"key": "k", "state": "pending"}
+        await asyncio.sleep(0.05)
+        assert speculator.status("ws") == {"key": "k", "state": "running"}
+        work.release.set()
+        await asyncio.sleep(0.02)
+        assert speculator.status("ws") is None
+        assert delta(before) == {"scheduled": 1, "completed": 1}
+
+    asyncio.run(main())
+
+
+def test_newer_upload_supersedes_and_same_content_is_not_rescheduled():
+    async def main():
+        speculator = Speculator("ingest", delay_seconds=0.0)
+        first, second = Work(), Work()
+        before = events()
+        speculator.schedule("ws", "k1", first)
+        await asyncio.sleep(0.01)
+        speculator.schedule("ws", "k1", Work())  # same content: keeps the running one
+        assert speculator.status("ws")["key"] == "k1"
+        speculator.schedule("ws", "k2", second)
+        await asyncio.sleep(0.03)
+        assert first.tokens[0].reason == "superseded"
+        assert speculator.status("ws") == {"key": "k2", "state": "running"}
+        second.release.set()
+        await asyncio.sleep(0.02)
+        assert delta(before) == {"scheduled": 2, "superseded": 1, "completed": 1}
+
+    asyncio.run(main())
+
+
+def test_join_waits_for_a_started_run():
+    async def main():
+        speculator = Speculator("full", delay_seconds=0.0)
+        work = Work()
+        speculator.schedule("ws", "k", work)
+        await asyncio.sleep(0.01)
+        assert not await speculator.join("ws", "other")
+        asyncio.get_running_loop().call_later(0.03, work.release.set)
+        assert await speculator.join("ws", "k")
+        assert work.release.is_set()
+
+    asyncio.run(main())
+
+
+def test_join_cancels_a_pending_run():
+    async def main():
+        speculator = Speculator("full", delay_seconds=10)
+        work = Work()
+        before = events()
+        speculator.schedule("ws", "k", work)
+        await asyncio.sleep(0)
+        assert not await speculator.join("ws", "k")
+        await asyncio.sleep(0.01)
+        assert work.tokens == [] and speculator.status("ws") is None
+        assert delta(before) == {"scheduled": 1, "requested": 1}
+
+    asyncio.run(main())
+
+
+def test_joined_run_survives_a_cancelled_caller():
+    async def main():
+        speculator = Speculator("full", delay_seconds=0.0)
+        work = Work()
+        speculator.schedule("ws", "k", work)
+        await asyncio.sleep(0.01)
+        caller = asyncio.create_task(speculator.join("ws", "k"))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0.01)
+        assert not work.tokens[0].cancelled and speculator.status("ws") == {"key": "k", "state": "running"}
+        work.release.set()
+        await asyncio.sleep(0.02)
+
+    asyncio.run(main())
+
+
+def test_cancel_trips_the_token_of_a_running_run():
+    async def main():
+        speculator = Speculator("full", delay_seconds=0.0)
+        work = Work()
+        speculator.schedule("ws", "k", work)
+        await asyncio.sleep(0.01)
+        assert speculator.cancel("ws")
+        assert not speculator.cancel("ws")
+        await asyncio.sleep(0.02)
+        assert work.tokens[0].reason == "requested"
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("error, event", [
+    (BudgetExceeded("speculative", 10, 0, 5), "over_budget"),
+    (Overloaded("batch", "busy", 1.0), "shed"),
+    (RuntimeError("boom"), "failed"),
+    (AnalysisCancelled("client_disconnected"), "cancelled"),
+])
+def test_outcomes(error, event):
+    async def main():
+        speculator = Speculator("full", delay_seconds=0.0)
+        before = SPECULATIVE_ANALYSIS.value(event=event)
+        speculator.schedule("ws", "k", Work(error))
+        await asyncio.sleep(0.02)
+        assert SPECULATIVE_ANALYSIS.value(event=event) == before + 1
+        assert speculator.status("ws") is None
+
+    asyncio.run(main())
+
+
+def test_shutdown_cancels_all_runs():
+    async def main():
+        speculator = Speculator("full", delay_seconds=0.0)
+        works = [Work(), Work()]
+        speculator.schedule("a", "k", works[0])
+        speculator.schedule("b", "k", works[1])
+        await asyncio.sleep(0.01)
+        await speculator.shutdown()
+        assert [w.tokens[0].reason for w in works] == ["shutdown", "shutdown"]
+        assert speculator.status("a") is None and speculator.status("b") is None
+
+    asyncio.run(main())
+
+
+def test_budget_caps_and_settle():
+    speculator = Speculator("full", max_tokens_per_run=100, max_tokens_per_day=150)
+    with pytest.raises(BudgetExceeded):
+        speculator.admit("ws", 101)
+    speculator.admit("ws", 100)
+    with pytest.raises(BudgetExceeded) as excinfo:
+        speculator.admit("ws", 60)
+    assert excinfo.value.remaining == 50
+    speculator.admit("other", 100)  # per workspace
+    speculator.settle("ws", 100, 40)  # the run used less than estimated
+    speculator.admit("ws", 100)
+    with pytest.raises(BudgetExceeded):
+        speculator.admit("ws", 20)
+
+
+def test_prepared_inputs_are_bounded():
+    speculator = Speculator("ingest", max_prepared=2)
+    for key in ("a", "b", "c"):
+        speculator.remember(key, ({key: "x"}, {}))
+    speculator.prepared("b")
+    assert speculator.prepared("a") is None
+    assert speculator.prepared("c") == ({"c": "x"}, {})
+
+
+# ---- /analyze ----
+
+@pytest.fixture
+def analyze(app_module, client, tmp_path, monkeypatch):
+    """POST /analyze over a fresh upload dir, with phases stubbed; returns (call, joins)"""
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "main.py").write_text(f"# {tmp_path.name}\nprint('hi')\n", encoding="utf-8")
+    monkeypatch.setattr(app_module, "UPLOAD_DIR", str(uploads))
+
+    async def run_phases(request, workspace, specs, file_contents, token=None, admit=None, priority="analysis"):
+        results = {spec.name: {"phase": spec.label, "score": 70, "analysis": "ok", "status": "completed"} for spec in specs}
+        return results, {"workspace": workspace, "total_tokens": 0}
+
+    monkeypatch.setattr(app_module, "run_phases", run_phases)
+    joins = []
+
+    async def join(workspace, key):
+        joins.append(key)
+        return joined[0]
+
+    joined = [False]
+    monkeypatch.setattr(app_module.speculator, "join", join)
+
+    def call(params="", speculative_run=False):
+        joined[0] = speculative_run
+        response = client.post("/analyze" + params)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return call, joins
+
+
+def test_analyze_reports_only_its_own_reuse(app_module, analyze):
+    call, joins = analyze
+    assert call("?phases=testing", speculative_run=True)["speculative"] is True
+    # the next request is a plain cache hit: nothing speculative was joined or reused for it
+    second = call("?phases=testing")
+    assert second["cached"] is True and second["speculative"] is False
+    assert len(joins) == 2
+
+    # results a speculative run stored earlier are cache hits like any other
+    files = os.listdir(app_module.UPLOAD_DIR)
+    asyncio.run(app_module.analysis_entries(
+        DetachedRequest(), "default", app_module.select_phases(["design"]), files, app_module.workspace_digest(),
+        {"speculative": False}, speculative=True, priority="batch",
+    ))
+    third = call("?phases=design")
+    assert third["cached"] is True and third["speculative"] is False
+
+
+def test_analyze_refresh_does_not_join(analyze):
+    call, joins = analyze
+    body = call("?phases=testing&refresh=true", speculative_run=True)
+    assert joins == [] and body["speculative"] is False and body["cached_phases"] == []
@@ -0,0 +1,95 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from streaming import stream_generation, stream_text
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StreamingModel:
+    def __init__(self, parts, fail_after=None):
+        self.parts = parts
+        self.fail_after = fail_after
+
+    def generate_content(self, prompt, stream=False):
+        model = self
+
+        class Response:
+            usage_metadata = None
+
+            def __iter__(self):
+                for i, part in enumerate(model.parts):
+                    if model.fail_after is not None and i >= model.fail_after:
+                        raise RuntimeError("quota exhausted")
+                    yield Chunk(part)
+
+        return Response()
+
+
+def parse(frames):
+    events = []
+    for frame in frames:
+        event_line, data_line = frame.strip().split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return events
+
+
+def collect(model, **kwargs):
+    async def run():
+        with ThreadPoolExecutor(1) as executor:
+            return [frame async for frame in stream_generation(model, "prompt", executor, **kwargs)]
+
+    return parse(asyncio.run(run()))
+
+
+def test_tokens_then_done_with_extra():
+    completed = []
+    events = collect(StreamingModel(["Hel", "lo"]), extra={"session_id": "s1"}, on_complete=completed.append)
+    assert events[:2] == [("token", {"text": "Hel"}), ("token", {"text": "lo"})]
+    kind, done = events[2]
+    assert kind == "done" and done["session_id"] == "s1" and done["chunks"] == 2 and done["estimated"]
+    assert completed == ["Hello"]
+
+
+def test_error_frame_carries_extra():
+    completed = []
+    events = collect(StreamingModel(["partial", "rest"], fail_after=1), extra={"session_id": "s1"},
+                     on_complete=completed.append)
+    assert events[0] == ("token", {"text": "partial"})
+    assert events[-1] == ("error", {"message": "Chat error: quota exhausted", "session_id": "s1"})
+    assert completed == []
+
+
+def test_stream_text_replays_a_known_answer():
+    async def run():
+        return [frame async for frame in stream_text("cached", {"cached": True})]
+
+    events = parse(asyncio.run(run()))
+    assert events[0] == ("token", {"text": "cached"})
+    assert events[1][0] == "done" and events[1][1]["cached"] is True
+
+
+def test_async_on_complete_is_awaited():
+    completed = []
+
+    async def on_complete(text):
+        await asyncio.sleep(0)
+        completed.append(text)
+
+    events = collect(StreamingModel(["a", "b"]), on_complete=on_complete)
+    assert events[-1][0] == "done" and completed == ["ab"]
+
+
+def test_chat_stream_finishes_when_the_cache_write_fails(app_module, client, monkeypatch):
+    def broken_put(*args):
+        raise ConnectionError("state server down")
+
+    monkeypatch.setattr(app_module, "model", StreamingModel(["Hel", "lo"]))
+    monkeypatch.setattr(app_module.chat_cache, "put", broken_put)
+    response = client.post("/chat/stream", data={"message": "a question nobody asked before?"})
+    events = parse(frame + "\n\n" for frame in response.text.strip().split("\n\n"))
+    assert [kind for kind, _ in events] == ["token", "token", "done"]
@@ -0,0 +1,93 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+import extraction
+import tabular_profile
+
+# "object" before pandas 3, "str" since
+TEXT = str(pd.Series(["a"]).dtype)
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "patients.csv"
+    path.write_text(
+        "age,ward,score\n"
+        "34,ICU,0.5\n"
+        "51,ER,\n"
+        "29,ICU,1.5\n"
+        "70,ICU,2.5\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_profile_csv(csv_file):
+    assert tabular_profile.profile_csv(csv_file, sample_rows=2) == (
+        "# Tabular data profile (CSV, 4 rows x 3 columns; raw rows not included)\n"
+        "columns:\n"
+        "- age: int64; nulls 0.0%; distinct 4; min 29, max 70, mean 46, std 18.57\n"
+        f"- ward: {TEXT}; nulls 0.0%; distinct 2; max length 3; top 'ICU' (3), 'ER' (1)\n"
+        "- score: float64; nulls 25.0%; distinct 3; min 0.5, max 2.5, mean 1.5, std 1\n"
+        "example rows (first 2):\n"
+        "age,ward,score\n"
+        "34,ICU,0.5\n"
+        "51,ER,nan\n"
+    )
+
+
+def test_chunked_profile_matches_single_chunk(csv_file, monkeypatch):
+    whole = tabular_profile.profile_csv(csv_file, sample_rows=1)
+    monkeypatch.setattr(tabular_profile, "CHUNK_ROWS", 1)
+    assert tabular_profile.profile_csv(csv_file, sample_rows=1) == whole
+
+
+def test_dtype_widens_across_chunks(tmp_path, monkeypatch):
+    path = tmp_path / "mixed.csv"
+    path.write_text("v,w\n1,a\n2,b\n,c\n3.5,d\nx,e\n", encoding="utf-8")
+    monkeypatch.setattr(tabular_profile, "CHUNK_ROWS", 2)
+    # int64, then float64 (a NaN), then text
+    assert "- v: object; nulls 20.0%; distinct 4;" in tabular_profile.profile_csv(str(path))
+
+
+def test_max_rows_profiles_the_first_rows(csv_file):
+    out = tabular_profile.profile_csv(csv_file, max_rows=2, sample_rows=0)
+    assert out.startswith("# Tabular data profile (CSV, first 2 rows x 3 columns;")
+    assert "- age: int64; nulls 0.0%; distinct 2; min 34, max 51" in out
+    assert "example rows" not in out
+
+
+def test_distinct_cap_and_long_cells(tmp_path, monkeypatch):
+    path = tmp_path / "ids.tsv"
+    path.write_text("id\tnote\n" + "".join(f"u{i}\t{'n' * 80}\n" for i in range(10)), encoding="utf-8")
+    monkeypatch.setattr(tabular_profile, "DISTINCT_CAP", 5)
+    out = tabular_profile.profile_csv(str(path), sep="\t", sample_rows=1)
+    assert out.startswith("# Tabular data profile (TSV, 10 rows x 2 columns;")
+    assert f"- id: {TEXT}; nulls 0.0%; distinct >5; max length 2\n" in out
+    assert "u0," + "n" * 60 + "..." in out
+
+
+def test_column_cap(tmp_path, monkeypatch):
+    path = tmp_path / "wide.csv"
+    path.write_text("a,b,c\n1,2,3\n", encoding="utf-8")
+    monkeypatch.setattr(tabular_profile, "MAX_COLUMNS", 2)
+    out = tabular_profile.profile_csv(str(path))
+    assert "- ... 1 more columns: c" in out
+    assert "a,b\n1,2\n" in out
+
+
+def test_extract_path_uses_profile_only_when_smaller(tmp_path, csv_file):
+    assert extraction.extract_path(csv_file) is None  # profile is longer than the tiny file
+
+    big = tmp_path / "big.csv"
+    big.write_text("a,b\n" + "".join(f"{i},{i * 2}\n" for i in range(5000)), encoding="utf-8")
+    out = extraction.extract_path(str(big))
+    assert out.startswith("# Tabular data profile (CSV, 5000 rows x 2 columns;")
+    assert extraction.load_text(str(big)) == out
+
+
+def test_malformed_table_is_read_as_text(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text('a,b\n"unterminated,1\n' + "x" * 5000, encoding="utf-8")
+    assert extraction.extract_path(str(path)) is None
@@ -0,0 +1,48 @@
+import json
+import threading
+
+import tracing
+from tracing import NOOP_SPAN, Tracer, bind, current_span, derive_gap_spans
+
+
+def test_disabled_tracer_hands_out_noop_spans():
+    tracer = Tracer("none")
+    assert tracer.root_span("request") is NOOP_SPAN
+    assert tracer.span("child") is NOOP_SPAN
+
+
+def test_spans_nest_and_follow_bound_callables(tmp_path):
+    tracer = Tracer("file", str(tmp_path / "traces.jsonl"))
+    with tracer.root_span("request") as root:
+        with tracer.span("analyze") as child:
+            seen = []
+            worker = threading.Thread(target=bind(lambda: seen.append(current_span())))
+            worker.start()
+            worker.join()
+        assert seen == [child] and child.parent is root
+    tracer.shutdown()
+
+    exported = [json.loads(line) for line in (tmp_path / "traces.jsonl").read_text().splitlines()]
+    spans = [s for batch in exported for s in batch["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+    by_name = {s["name"]: s for s in spans}
+    assert by_name["analyze"]["parentSpanId"] == by_name["request"]["spanId"]
+    assert by_name["analyze"]["traceId"] == by_name["request"]["traceId"]
+
+
+def test_incoming_traceparent_is_continued_or_respected_as_unsampled():
+    tracer = Tracer("file", "/dev/null")
+    trace_id, parent_id = "a" * 32, "b" * 16
+    span = tracer.root_span("request", f"00-{trace_id}-{parent_id}-01")
+    assert span.trace_id == trace_id and span.parent_span_id == parent_id
+    assert tracer.root_span("request", f"00-{trace_id}-{parent_id}-00") is NOOP_SPAN
+    tracer.shutdown()
+
+
+def test_gap_spans_cover_time_around_model_calls():
+    tracer = Tracer("file", "/dev/null")
+    parent = tracing.Span(tracer, "analyzer", "c" * 32, None, start_ns=100)
+    tracing.Span(tracer, "llm", parent.trace_id, parent, start_ns=150).end(400)
+    derive_gap_spans(parent, "llm", "build_prompt", "parse_response", end_ns=500)
+    gaps = {c.name: (c.start_ns, c.end_ns) for c in parent.children if c.name != "llm"}
+    assert gaps == {"build_prompt": (100, 150), "parse_response": (400, 500)}
+    tracer.shutdown()
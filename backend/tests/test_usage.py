@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+import pytest
+
+from usage import BudgetExceeded, TokenBudget, UsageLedger, UsageMeter
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = UsageLedger(str(tmp_path / "usage.db"))
+    yield ledger
+    ledger.close()
+
+
+def counts(prompt, completion, estimated=False):
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "estimated": estimated}
+
+
+def test_meter_enforces_request_budget():
+    meter = UsageMeter(request_budget=100, completion_reserve=20)
+    meter.check("x" * 200)  # 50 + 20 tokens fit
+    meter.record("testing", counts(60, 20))
+    with pytest.raises(BudgetExceeded) as excinfo:
+        meter.check("x" * 200)
+    assert excinfo.value.to_dict() == {"scope": "request", "needed": 70, "remaining": 20, "limit": 100}
+    assert meter.summary()["total_tokens"] == 80
+
+
+def test_ledger_aggregates_per_workspace_and_day(ledger):
+    meter = UsageMeter()
+    meter.record("testing", counts(10, 5))
+    meter.record("testing", counts(1, 1, estimated=True))
+    meter.record("chat", counts(3, 2))
+    ledger.add("ws", meter.summary(), day="2026-01-01")
+    ledger.add("ws", meter.summary(), day="2026-01-01")
+    assert ledger.spent("ws", "2026-01-01") == 44
+    assert ledger.spent("other", "2026-01-01") == 0
+
+
+def test_reservations_count_against_the_daily_budget(ledger):
+    budget = TokenBudget(ledger, per_request=500, per_workspace_day=1000, completion_reserve=0)
+    with pytest.raises(BudgetExceeded) as excinfo:
+        budget.reserve("ws", 600)
+    assert excinfo.value.scope == "request"
+
+    first = budget.reserve("ws", 500)
+    second = budget.reserve("ws", 400)
+    with pytest.raises(BudgetExceeded) as excinfo:
+        budget.reserve("ws", 200)  # 900 held by requests in flight
+    assert excinfo.value.scope == "workspace" and excinfo.value.remaining == 100
+
+    first.meter.record("testing", counts(100, 50))
+    first.close()
+    second.close()
+    assert ledger.spent("ws") == 150
+    assert budget.status("ws")["remaining_today"] == 850
+    budget.reserve("ws", 500).close()
+
+
+def test_hold_does_ledger_io_off_the_event_loop(ledger):
+    budget = TokenBudget(ledger, per_workspace_day=1000, completion_reserve=0)
+    threads = []
+    spent, add = ledger.spent, ledger.add
+    ledger.spent = lambda *a: threads.append(threading.current_thread()) or spent(*a)
+    ledger.add = lambda *a: threads.append(threading.current_thread()) or add(*a)
+
+    async def run():
+        async with budget.hold("ws", 100) as reservation:
+            reservation.meter.record("chat", counts(7, 3))
+        with pytest.raises(BudgetExceeded):
+            async with budget.hold("ws", 2000):
+                pass
+
+    asyncio.run(run())
+    assert len(threads) == 3 and threading.main_thread() not in threads
+    assert spent("ws") == 10
+    assert budget._reserved == {}
+
+
+def test_request_budget_exhausted_mid_analysis_fails_the_request():
+    import types
+
+    import phase_engine
+    from instrumentation import InstrumentedModel
+    from phase_specs import PHASES
+    from tokens import estimate_tokens
+
+    class Model:
+        def generate_content(self, prompt):
+            return types.SimpleNamespace(text="SCORE: 70/100", usage_metadata=None)
+
+    files = {"train.py": "x = 1\n" * 200}
+    first, second = list(PHASES.values())[:2]
+    meter = UsageMeter(request_budget=estimate_tokens(phase_engine.build_prompt(first, files)) + 10)
+    result = phase_engine.run_phase(first, files, InstrumentedModel(Model(), first.name, meter))
+    assert result["status"] == "completed"
+    with pytest.raises(BudgetExceeded) as excinfo:  # not an "error" phase with score 0
+        phase_engine.run_phase(second, files, InstrumentedModel(Model(), second.name, meter))
+    assert excinfo.value.scope == "request"
@@ -0,0 +1,22 @@
+"""
+Cheap token estimates for prompt budgeting.
+Gemini tokenizes roughly 4 characters per token for English text and code;
+this is close enough to keep prompts inside a budget without a model call.
+"""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a string"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "\n...[TRUNCATED]...\n") -> str:
+    """Cut text so that its estimated size fits max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max(0, max_tokens * CHARS_PER_TOKEN - len(marker))
+    return text[:keep] + marker
@@ -0,0 +1,338 @@
+"""
+Lightweight request tracing without the OpenTelemetry SDK.
+
+Spans are kept in a contextvar, so nesting follows the code naturally; work
+handed to the LLM thread pool keeps its parent through bind(), which runs
+the callable inside a copy of the submitting context. Finished spans of a
+sampled trace are queued to a background thread that exports them in
+batches as OTLP/JSON (ExportTraceServiceRequest), either appended as one
+line per batch to a local file (readable by the collector's otlpjsonfile
+receiver) or POSTed to an OTLP/HTTP collector.
+
+When tracing is off (TRACE_EXPORTER=none) span() hands back a shared no-op
+span, so instrumented code costs one contextvar lookup.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+from metrics import TRACE_SPANS_DROPPED, TRACE_SPANS_EXPORTED
+
+logger = logging.getLogger("sdlc.tracing")
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP SpanKind / StatusCode values
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation; use as a context manager via Tracer.span()"""
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent: Optional["Span"],
+                 parent_span_id: Optional[str] = None, kind: int = SPAN_KIND_INTERNAL,
+                 attributes: Optional[Dict] = None, start_ns: Optional[int] = None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.parent_span_id = parent.span_id if parent is not None else parent_span_id
+        self.kind = kind
+        self.attributes: Dict = dict(attributes or {})
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        self.children: List["Span"] = []
+        self._token = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if self.parent is not None:
+            self.parent.children.append(self)
+        self.tracer._export(self)
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.record_error(exc)
+        _current.reset(self._token)
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    """Stand-in when the trace is not sampled (or tracing is off)"""
+
+    recording = False
+    trace_id = ""
+    span_id = ""
+    children: List[Span] = []
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self, end_ns=None):
+        pass
+
+    def traceparent(self) -> str:
+        return ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+_current: contextvars.ContextVar = contextvars.ContextVar("sdlc_current_span", default=None)
+
+
+def current_span():
+    return _current.get() or NOOP_SPAN
+
+
+def bind(fn: Callable[[], object]) -> Callable[[], object]:
+    """Run fn (later, on any thread) inside a copy of the caller's context"""
+    ctx = contextvars.copy_context()
+    return lambda: ctx.run(fn)
+
+
+def _attr_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(span: Span) -> Dict:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": k, "value": _attr_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": _STATUS_ERROR, "message": span.error} if span.error else {"code": _STATUS_OK},
+    }
+    if span.parent_span_id:
+        data["parentSpanId"] = span.parent_span_id
+    return data
+
+
+class Tracer:
+    """
+    exporter: "none", "file" (target = path) or "otlp" (target = collector
+    base URL, spans go to <target>/v1/traces). sample_rate applies to new
+    traces; an incoming sampled traceparent is always honoured.
+    """
+
+    def __init__(self, exporter: str = "none", target: str = "", sample_rate: float = 1.0,
+                 service_name: str = "sdlc-verifier", batch_size: int = 256,
+                 flush_interval: float = 1.0, max_queue: int = 10000):
+        if exporter not in ("none", "file", "otlp"):
+            raise ValueError(f"Unknown trace exporter {exporter!r} (expected none, file or otlp)")
+        self.exporter = exporter
+        self.target = target
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        if self.enabled:
+            self._thread = threading.Thread(target=self._worker, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter != "none"
+
+    # ---- span creation ----
+    def span(self, name: str, attributes: Optional[Dict] = None, kind: int = SPAN_KIND_INTERNAL,
+             start_ns: Optional[int] = None):
+        """Child of the current span; a no-op when the current trace is not recorded"""
+        parent = _current.get()
+        if parent is None:
+            return NOOP_SPAN
+        return Span(self, name, parent.trace_id, parent, kind=kind, attributes=attributes, start_ns=start_ns)
+
+    def root_span(self, name: str, traceparent: Optional[str] = None, attributes: Optional[Dict] = None):
+        """Start a trace (continuing an incoming W3C traceparent when valid)"""
+        if not self.enabled:
+            return NOOP_SPAN
+        match = _TRACEPARENT_RE.match((traceparent or "").strip().lower())
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            if not int(flags, 16) & 1:
+                return NOOP_SPAN
+            return Span(self, name, trace_id, None, parent_span_id=parent_id,
+                        kind=SPAN_KIND_SERVER, attributes=attributes)
+        if random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(self, name, os.urandom(16).hex(), None, kind=SPAN_KIND_SERVER, attributes=attributes)
+
+    # ---- export ----
+    def _export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            TRACE_SPANS_DROPPED.inc()
+
+    def _worker(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                self._flush(batch)
+                return
+            if item is not False:
+                batch.append(item)
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch: List[Span]):
+        if not batch:
+            return
+        body = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "sdlc"}, "spans": [_to_otlp(s) for s in batch]}],
+            }]
+        }, separators=(",", ":"))
+        try:
+            if self.exporter == "file":
+                with open(self.target, "a", encoding="utf-8") as f:
+                    f.write(body + "\n")
+            else:
+                req = urllib.request.Request(
+                    self.target.rstrip("/") + "/v1/traces",
+                    data=body.encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                with urllib.request.urlopen(req, timeout=5) as resp:
+                    resp.read()
+            TRACE_SPANS_EXPORTED.inc(len(batch))
+        except Exception as e:
+            TRACE_SPANS_DROPPED.inc(len(batch))
+            logger.warning("Trace export failed: %s", e)
+
+    def shutdown(self, timeout: float = 5.0):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Process-wide tracer; app.py configures it from the environment at startup
+TRACER = Tracer()
+
+
+def configure(exporter: str, target: str = "", sample_rate: float = 1.0) -> Tracer:
+    global TRACER
+    TRACER.shutdown()
+    TRACER = Tracer(exporter, target, sample_rate)
+    return TRACER
+
+
+def tracer_span(name: str, attributes: Optional[Dict] = None, start_ns: Optional[int] = None):
+    """Child span of the current one from the configured tracer"""
+    return TRACER.span(name, attributes, start_ns=start_ns)
+
+
+def derive_gap_spans(parent: Span, child_name: str, before: str, after: str, end_ns: Optional[int] = None):
+    """
+    Emit synthetic children covering the time in `parent` before the first
+    and after the last `child_name` child, e.g. prompt building and response
+    parsing around the model call inside an analyzer.
+    """
+    children = [c for c in parent.children if c.name == child_name and c.end_ns is not None]
+    if not parent.recording or not children:
+        return
+    end_ns = end_ns if end_ns is not None else time.time_ns()
+    first = min(c.start_ns for c in children)
+    last = max(c.end_ns for c in children)
+    Span(parent.tracer, before, parent.trace_id, parent, start_ns=parent.start_ns).end(first)
+    Span(parent.tracer, after, parent.trace_id, parent, start_ns=last).end(end_ns)
+
+
+class TracingMiddleware:
+    """Root span per HTTP request; echoes the traceparent in the response"""
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        tracer = TRACER
+        if scope["type"] != "http" or scope["path"] in self.skip_paths or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        root = tracer.root_span(
+            f"{scope['method']} {scope['path']}",
+            traceparent=headers.get(b"traceparent", b"").decode("latin-1"),
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        if not root.recording:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"traceparent", root.traceparent().encode())]
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_wrapper)
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+                root.set_attribute("http.route", route.path)
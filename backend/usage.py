@@ -0,0 +1,283 @@
+"""
+Token usage accounting and token budgets.
+
+- UsageMeter collects prompt/completion tokens per phase for one request
+  (usage metadata from the response, or an estimate when it is missing)
+  and enforces the per-request budget before every model call.
+- UsageLedger aggregates usage per workspace, per UTC day and per kind
+  (analysis phase or chat) in SQLite.
+- TokenBudget admits a request only if its pre-call estimate fits both the
+  per-request budget and what is left of the workspace's daily budget,
+  counting estimates of requests still in flight, so a large upload fails
+  fast instead of after several expensive calls. Async code uses hold(),
+  which does the ledger I/O on a worker thread, off the event loop.
+
+A budget of 0 means unlimited.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from metrics import TOKEN_BUDGET_REJECTIONS, TOKENS_USED
+from tokens import estimate_tokens
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_usage (
+    workspace         TEXT NOT NULL,
+    day               TEXT NOT NULL,
+    kind              TEXT NOT NULL,
+    prompt_tokens     INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    calls             INTEGER NOT NULL DEFAULT 0,
+    estimated_calls   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (workspace, day, kind)
+);
+"""
+
+
+class BudgetExceeded(Exception):
+    """A token budget would be exceeded by the next model call(s)"""
+
+    def __init__(self, scope: str, needed: int, remaining: int, limit: int):
+        self.scope = scope
+        self.needed = needed
+        self.remaining = remaining
+        self.limit = limit
+        super().__init__(
+            f"Token budget exceeded ({scope}): needs ~{needed} tokens, {remaining} of {limit} remaining"
+        )
+
+    def to_dict(self) -> Dict:
+        return {"scope": self.scope, "needed": self.needed, "remaining": self.remaining, "limit": self.limit}
+
+
+def utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class UsageMeter:
+    """Token usage of one request, per phase (thread-safe)"""
+
+    def __init__(self, request_budget: int = 0, completion_reserve: int = 0):
+        self.request_budget = request_budget
+        self.completion_reserve = completion_reserve
+        self._phases: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return sum(p["prompt_tokens"] + p["completion_tokens"] for p in self._phases.values())
+
+    def check(self, prompt: str):
+        """Raise BudgetExceeded if this call's estimate no longer fits the request budget"""
+        if not self.request_budget:
+            return
+        needed = estimate_tokens(prompt) + self.completion_reserve
+        remaining = self.request_budget - self.total_tokens
+        if needed > remaining:
+            TOKEN_BUDGET_REJECTIONS.inc(scope="request")
+            raise BudgetExceeded("request", needed, max(0, remaining), self.request_budget)
+
+    def record(self, phase: str, counts: Dict):
+        """counts as returned by streaming.usage_counts()"""
+        with self._lock:
+            entry = self._phases.setdefault(
+                phase, {"prompt_tokens": 0, "completion_tokens": 0, "calls": 0, "estimated": False}
+            )
+            entry["prompt_tokens"] += int(counts["prompt_tokens"])
+            entry["completion_tokens"] += int(counts["completion_tokens"])
+            entry["calls"] += 1
+            entry["estimated"] = entry["estimated"] or bool(counts.get("estimated"))
+        TOKENS_USED.inc(int(counts["prompt_tokens"]), phase=phase, type="prompt")
+        TOKENS_USED.inc(int(counts["completion_tokens"]), phase=phase, type="completion")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            phases = {name: dict(entry) for name, entry in self._phases.items()}
+        prompt = sum(p["prompt_tokens"] for p in phases.values())
+        completion = sum(p["completion_tokens"] for p in phases.values())
+        return {
+            "phases": phases,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "estimated": any(p["estimated"] for p in phases.values()),
+        }
+
+
+class UsageLedger:
+    """Per workspace / day / kind token totals in SQLite"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def ping(self):
+        """Raises if the database can't be queried"""
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+
+    def add(self, workspace: str, summary: Dict, day: Optional[str] = None):
+        """Fold a UsageMeter.summary() into the day's totals"""
+        day = day or utc_day()
+        rows = [
+            (workspace, day, kind, p["prompt_tokens"], p["completion_tokens"], p["calls"],
+             p["calls"] if p["estimated"] else 0)
+            for kind, p in summary["phases"].items()
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO token_usage (workspace, day, kind, prompt_tokens, completion_tokens, calls, estimated_calls)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (workspace, day, kind) DO UPDATE SET"
+                " prompt_tokens = prompt_tokens + excluded.prompt_tokens,"
+                " completion_tokens = completion_tokens + excluded.completion_tokens,"
+                " calls = calls + excluded.calls,"
+                " estimated_calls = estimated_calls + excluded.estimated_calls",
+                rows,
+            )
+
+    def spent(self, workspace: str, day: Optional[str] = None) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) AS n FROM token_usage"
+                " WHERE workspace = ? AND day = ?",
+                (workspace, day or utc_day()),
+            ).fetchone()
+        return int(row["n"])
+
+    def report(self, workspace: Optional[str] = None, days: int = 7) -> List[Dict]:
+        """Daily totals (newest first) with a per-kind breakdown"""
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        query = "SELECT * FROM token_usage WHERE day >= ?"
+        params: List = [since]
+        if workspace is not None:
+            query += " AND workspace = ?"
+            params.append(workspace)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY day DESC, workspace, kind", params).fetchall()
+
+        out: Dict = {}
+        for r in rows:
+            entry = out.setdefault((r["workspace"], r["day"]), {
+                "workspace": r["workspace"], "day": r["day"],
+                "prompt_tokens": 0, "completion_tokens": 0, "calls": 0, "kinds": {},
+            })
+            entry["prompt_tokens"] += r["prompt_tokens"]
+            entry["completion_tokens"] += r["completion_tokens"]
+            entry["calls"] += r["calls"]
+            entry["kinds"][r["kind"]] = {
+                "prompt_tokens": r["prompt_tokens"],
+                "completion_tokens": r["completion_tokens"],
+                "calls": r["calls"],
+                "estimated_calls": r["estimated_calls"],
+            }
+        return list(out.values())
+
+
+class TokenBudget:
+    """Admission against the per-request and per-workspace daily budgets"""
+
+    def __init__(self, ledger: UsageLedger, per_request: int = 0, per_workspace_day: int = 0,
+                 completion_reserve: int = 2048):
+        self.ledger = ledger
+        self.per_request = per_request
+        self.per_workspace_day = per_workspace_day
+        self.completion_reserve = completion_reserve
+        self._reserved: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def estimate(self, prompt_tokens: int, calls: int = 1) -> int:
+        """Pre-call estimate: prompt tokens plus a completion reserve per call"""
+        return prompt_tokens + calls * self.completion_reserve
+
+    def new_meter(self) -> UsageMeter:
+        return UsageMeter(self.per_request, self.completion_reserve)
+
+    def reserve(self, workspace: str, estimate: int) -> "Reservation":
+        """
+        Hold `estimate` tokens of the workspace's daily budget for one
+        request, or raise BudgetExceeded. Close the reservation (or use it as
+        a context manager) when the request ends: the actual usage recorded
+        by its meter is then written to the ledger, even when the request
+        failed part-way, since the calls already made were still billed.
+        """
+        if self.per_request and estimate > self.per_request:
+            TOKEN_BUDGET_REJECTIONS.inc(scope="request")
+            raise BudgetExceeded("request", estimate, self.per_request, self.per_request)
+
+        with self._lock:
+            if self.per_workspace_day:
+                remaining = self.per_workspace_day - self.ledger.spent(workspace) - self._reserved.get(workspace, 0)
+                if estimate > remaining:
+                    TOKEN_BUDGET_REJECTIONS.inc(scope="workspace")
+                    raise BudgetExceeded("workspace", estimate, max(0, remaining), self.per_workspace_day)
+            self._reserved[workspace] = self._reserved.get(workspace, 0) + estimate
+        return Reservation(self, workspace, estimate)
+
+    @asynccontextmanager
+    async def hold(self, workspace: str, estimate: int):
+        """`async with token_budget.hold(...) as reservation:`, reserve() for async code"""
+        reservation = await asyncio.to_thread(self.reserve, workspace, estimate)
+        try:
+            yield reservation
+        finally:
+            await asyncio.to_thread(reservation.close)
+
+    def _release(self, reservation: "Reservation"):
+        self.ledger.add(reservation.workspace, reservation.meter.summary())
+        with self._lock:
+            left = self._reserved.get(reservation.workspace, 0) - reservation.estimate
+            if left > 0:
+                self._reserved[reservation.workspace] = left
+            else:
+                self._reserved.pop(reservation.workspace, None)
+
+    def status(self, workspace: str) -> Dict:
+        spent = self.ledger.spent(workspace)
+        return {
+            "workspace": workspace,
+            "day": utc_day(),
+            "spent_today": spent,
+            "per_request": self.per_request,
+            "per_workspace_day": self.per_workspace_day,
+            "remaining_today": max(0, self.per_workspace_day - spent) if self.per_workspace_day else None,
+        }
+
+
+class Reservation:
+    """Budget held by one request; see TokenBudget.reserve()"""
+
+    def __init__(self, budget: TokenBudget, workspace: str, estimate: int):
+        self.budget = budget
+        self.workspace = workspace
+        self.estimate = estimate
+        self.meter = budget.new_meter()
+        self._closed = False
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.budget._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
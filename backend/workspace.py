@@ -0,0 +1,109 @@
+"""
+Workspace manifest for the uploads/ directory.
+Tracks size, mtime and content hash of every uploaded file so callers can
+detect what changed since the last scan without re-reading everything.
+With a shared StateBackend configured, the manifest is also published for
+the other workers, so a file is hashed once per node instead of once per
+worker.
+"""
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    name: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+_hash_cache: Dict[str, FileEntry] = {}
+_hash_lock = threading.Lock()
+
+MANIFEST_NAMESPACE = "workspace_manifest"
+_shared_state = None
+
+
+def configure(state):
+    """Share manifests with other workers through a shared_state.StateBackend (None: local only)"""
+    global _shared_state
+    _shared_state = state
+
+
+def _shared_manifest(upload_dir: str) -> Dict[str, FileEntry]:
+    stored = _shared_state.get(MANIFEST_NAMESPACE, upload_dir) if _shared_state is not None else None
+    return {name: FileEntry(name, *fields) for name, fields in (stored or {}).items()}
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def scan_manifest(upload_dir: str) -> Dict[str, FileEntry]:
+    """
+    Stat every file in upload_dir. Hashes are only recomputed for files whose
+    size or mtime changed since the previous scan (by any worker, when a
+    shared state backend is configured).
+    """
+    manifest: Dict[str, FileEntry] = {}
+    shared: Optional[Dict[str, FileEntry]] = None  # fetched on the first local miss
+    publish = False
+    for name in sorted(os.listdir(upload_dir)):
+        path = os.path.join(upload_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if not os.path.isfile(path):
+            continue
+
+        with _hash_lock:
+            cached = _hash_cache.get(path)
+        if cached and cached.size == stat.st_size and cached.mtime_ns == stat.st_mtime_ns:
+            manifest[name] = cached
+            continue
+
+        if shared is None:
+            shared = _shared_manifest(upload_dir)
+        entry = shared.get(name)
+        if not (entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns):
+            entry = FileEntry(name, stat.st_size, stat.st_mtime_ns, file_sha256(path))
+            publish = True
+        with _hash_lock:
+            _hash_cache[path] = entry
+        manifest[name] = entry
+
+    if _shared_state is not None and (publish or (shared is not None and shared.keys() != manifest.keys())):
+        _shared_state.set(MANIFEST_NAMESPACE, upload_dir, {
+            name: [e.size, e.mtime_ns, e.sha256] for name, e in manifest.items()
+        })
+    return manifest
+
+
+def content_digest(manifest: Dict[str, FileEntry]) -> str:
+    """Stable digest of the workspace: file names plus their content hashes"""
+    h = hashlib.sha256()
+    for name in sorted(manifest):
+        h.update(name.encode("utf-8"))
+        h.update(b"\0")
+        h.update(manifest[name].sha256.encode("ascii"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def read_text(path: str) -> Optional[str]:
+    """Return the file as UTF-8 text, or None if it is binary / not decodable"""
+    try:
+        with open(path, "r", encoding="utf-8", errors="strict") as f:
+            return f.read()
+    except (UnicodeDecodeError, OSError):
+        return None
@@ -1,5 +1,28 @@
 // src/pages/ReviewerDashboard.jsx
-import React, { useState } from "react";
+import React, { useCallback, useEffect, useState } from "react";
+
+const API_BASE_URL = "http://localhost:8000";
+const PAGE_SIZE = 20;
+const PHASES = ["requirements", "design", "implementation", "testing", "deployment", "maintenance"];
+const WEAK_PHASE_SCORE = 60;
+
+// A report from GET /reports, in the shape the page shows
+const toBundle = (report) => ({
+  bundleId: report.id,
+  projectName: `Verification report ${report.id.slice(0, 8)}`,
+  modelName: `Overall score ${Math.round(report.overallScore)}%`,
+  domain: `${report.filesAnalyzed.length} file${report.filesAnalyzed.length !== 1 ? "s" : ""} analyzed`,
+  status: ["approved", "rejected"].includes(report.status) ? "REVIEWED" : "PENDING",
+  sharedAt: report.timestamp,
+  userId: "project team",
+  notes: "",
+  pdfUrl: `${API_BASE_URL}/reports/${report.id}/pdf`,
+  sharedFiles: report.filesAnalyzed.map((name, i) => ({
+    id: `${report.id}-${i}`,
+    name,
+    type: "Analyzed file",
+  })),
+});
 
 export default function ReviewerDashboard() {
   const reviewerId =
@@ -44,12 +67,45 @@ export default function ReviewerDashboard() {
     },
   ];
 
-  const [tasks] = useState(demoBundles);
+  const [tasks, setTasks] = useState(demoBundles);
   const [selectedBundleId, setSelectedBundleId] = useState(
     demoBundles[0].bundleId
   );
   const selectedBundle = tasks.find((t) => t.bundleId === selectedBundleId);
 
+  // Reports submitted through /send-to-reviewer; the demo data stays if the backend is down
+  const [isLive, setIsLive] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [weakPhase, setWeakPhase] = useState("");
+
+  const loadReports = useCallback(
+    async (cursor = null) => {
+      const params = new URLSearchParams({ limit: PAGE_SIZE });
+      if (cursor) params.set("cursor", cursor);
+      if (weakPhase) {
+        params.set("phase", weakPhase);
+        params.set("max_phase_score", WEAK_PHASE_SCORE);
+      }
+      try {
+        const res = await fetch(`${API_BASE_URL}/reports?${params}`);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        const data = await res.json();
+        const bundles = data.reports.map(toBundle);
+        setTasks((prev) => (cursor ? [...prev, ...bundles] : bundles));
+        setNextCursor(data.nextCursor);
+        setIsLive(true);
+        if (!cursor && bundles.length > 0) setSelectedBundleId(bundles[0].bundleId);
+      } catch (error) {
+        console.warn("Could not load reports, showing demo data:", error);
+      }
+    },
+    [weakPhase]
+  );
+
+  useEffect(() => {
+    loadReports();
+  }, [loadReports]);
+
   // Review state: keep it simple and human
   const [feeling, setFeeling] = useState("good");
   const [isComfortable, setIsComfortable] = useState(true);
@@ -68,7 +124,7 @@ export default function ReviewerDashboard() {
       timeStyle: "short",
     });
 
-  const handleSubmit = () => {
+  const handleSubmit = async () => {
     if (!comment.trim()) {
       alert("Please add a short comment so your feedback is useful 🙂");
       return;
@@ -83,7 +139,26 @@ export default function ReviewerDashboard() {
       comment: comment.trim(),
     };
 
-    console.log("Review submitted (demo):", payload);
+    if (isLive) {
+      try {
+        const res = await fetch(`${API_BASE_URL}/reports/${selectedBundle.bundleId}/status`, {
+          method: "PATCH",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ status: isComfortable ? "approved" : "rejected" }),
+        });
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+      } catch (error) {
+        alert(`Could not save your review: ${error.message}`);
+        return;
+      }
+      setTasks((prev) =>
+        prev.map((t) =>
+          t.bundleId === selectedBundle.bundleId ? { ...t, status: "REVIEWED" } : t
+        )
+      );
+    } else {
+      console.log("Review submitted (demo):", payload);
+    }
     alert("Thanks for your review. This will help improve the framework.");
     setComment("");
   };
@@ -130,6 +205,24 @@ export default function ReviewerDashboard() {
               </span>
             </div>
 
+            {isLive && (
+              <label className="flex items-center gap-2 mb-3 text-[11px] text-slate-500">
+                Weak in
+                <select
+                  value={weakPhase}
+                  onChange={(e) => setWeakPhase(e.target.value)}
+                  className="flex-1 rounded-lg border border-slate-200 bg-white px-2 py-1 text-xs text-slate-700"
+                >
+                  <option value="">any phase</option>
+                  {PHASES.map((phase) => (
+                    <option key={phase} value={phase}>
+                      {phase} (≤ {WEAK_PHASE_SCORE}%)
+                    </option>
+                  ))}
+                </select>
+              </label>
+            )}
+
             <div className="space-y-2 max-h-[360px] overflow-y-auto pr-1">
               {tasks.map((task) => {
                 const isSelected = task.bundleId === selectedBundleId;
@@ -172,8 +265,21 @@ export default function ReviewerDashboard() {
                   </button>
                 );
               })}
+              {isLive && tasks.length === 0 && (
+                <p className="text-xs text-slate-500">No reports match.</p>
+              )}
             </div>
 
+            {nextCursor && (
+              <button
+                type="button"
+                onClick={() => loadReports(nextCursor)}
+                className="mt-2 w-full text-xs px-2.5 py-1.5 rounded-lg bg-slate-100 text-slate-700 hover:bg-slate-200"
+              >
+                Load more
+              </button>
+            )}
+
             <p className="mt-3 text-[11px] text-slate-500">
               You don’t need to write a “perfect” review. Simple comments like
               “this felt clear” or “I got lost here” are very helpful.
@@ -207,6 +313,14 @@ export default function ReviewerDashboard() {
                       </p>
                     </div>
                     <div className="text-right text-xs text-slate-500">
+                      {selectedBundle.pdfUrl && (
+                        <a
+                          href={selectedBundle.pdfUrl}
+                          className="inline-block mb-1 px-2.5 py-1 rounded-lg bg-indigo-500 text-white hover:bg-indigo-400"
+                        >
+                          Download report PDF
+                        </a>
+                      )}
                       <p>Domain: {selectedBundle.domain}</p>
                       <p>
                         Model: {demoVerificationRun.modelName} (
@@ -32,6 +32,7 @@ function SDLCAnalyzer() {
   const [showChat, setShowChat] = useState(false);
   const [chatInput, setChatInput] = useState("");
   const [chatLoading, setChatLoading] = useState(false);
+  const [chatSessionId, setChatSessionId] = useState(null);
   const [expandedCard, setExpandedCard] = useState(null);
   const [pdfGenerating, setPdfGenerating] = useState(false);
   const [sendingToReviewer, setSendingToReviewer] = useState(false);
@@ -145,7 +146,8 @@ function SDLCAnalyzer() {
         body: JSON.stringify({
           analysisResults: analysisResults,
           overallScore: overallScore(),
-          filesAnalyzed: serverFiles
+          filesAnalyzed: serverFiles,
+          timestamp: analysisResults?.analyzed_at
         }),
       });
       
@@ -208,22 +210,69 @@ function SDLCAnalyzer() {
     setChatInput("");
     setChatLoading(true);
 
+    const formatAiText = (text) => text.replace(/(\d+\.\s)/g, "\n$1");
+    const setLastAiMessage = (content) =>
+      setMessages((prev) => [
+        ...prev.slice(0, -1),
+        { role: "ai", content: formatAiText(content) },
+      ]);
+
     try {
       const fd = new FormData();
       fd.append("message", userMessage.content);
+      if (chatSessionId) fd.append("session_id", chatSessionId);
 
-      const res = await fetch(`${API_BASE_URL}/chat`, {
+      // Server-Sent Events: render tokens as soon as they arrive
+      const res = await fetch(`${API_BASE_URL}/chat/stream`, {
         method: "POST",
         body: fd,
       });
 
-      const data = await res.json();
-      const aiText = (data?.response || data?.message || "No response").replace(
-        /(\d+\.\s)/g,
-        "\n$1"
-      );
+      if (!res.ok || !res.body) {
+        const data = await res.json().catch(() => null);
+        throw new Error(data?.message || "Chat request failed");
+      }
 
-      setMessages((prev) => [...prev, { role: "ai", content: aiText }]);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let aiText = "";
+      let started = false;
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop();
+        for (const frame of frames) {
+          const event = frame.match(/^event: (.*)$/m)?.[1];
+          const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || "{}");
+          if (event === "token") {
+            aiText += data.text;
+            if (!started) {
+              started = true;
+              setChatLoading(false);
+              setMessages((prev) => [...prev, { role: "ai", content: "" }]);
+            }
+            setLastAiMessage(aiText);
+          } else if (event === "done") {
+            if (data.session_id) setChatSessionId(data.session_id);
+          } else if (event === "error") {
+            aiText = data.message || "Sorry, something went wrong.";
+            if (!started) {
+              started = true;
+              setMessages((prev) => [...prev, { role: "ai", content: "" }]);
+            }
+            setLastAiMessage(aiText);
+          }
+        }
+      }
+
+      if (!started) {
+        setMessages((prev) => [...prev, { role: "ai", content: "No response" }]);
+      }
     } catch {
       setMessages((prev) => [
         ...prev,